@@ -0,0 +1,242 @@
+"""
+Реєстр API-ключів (multi-tenant).
+
+Ключі індексуються за sha256(key): lookup — один dict.get по дайджесту, сам
+секрет ні з чим посимвольно не порівнюється (timing по префіксу не витікає),
+а у файлі/БД можна тримати лише хеші.
+
+Джерела (API_KEYS_PATH):
+- *.json:   {"keys": [{"key_sha256": "<hex>", "tenant": "acme", "plan": "pro",
+                       "rate_limit_per_min": 600, "routes": ["/v1/vrf"], "server_timing": false,
+                       "admin": false}]}
+            замість key_sha256 можна вказати "key" відкритим текстом (dev);
+- *.db / *.sqlite: таблиця api_keys з тими самими колонками
+            (routes — через кому, порожньо = всі роути).
+
+Перезавантаження — у фоні при зміні mtime: новий індекс будується в потоці
+й підміняється одним присвоєнням (copy-on-write), шлях запиту не бере локів.
+Невідомий ключ коштує рівно стільки ж, скільки відомий (sha256 + dict.get),
+і нічого не додає в памʼять — окремий кеш невдалих спроб не потрібен.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.apikeys")
+
+AUTH = REGISTRY.counter("r4_auth_total", "API key checks", ("result",))
+KEYS = REGISTRY.gauge("r4_api_keys", "API keys loaded in the registry")
+RELOADS = REGISTRY.counter("r4_api_keys_reload_total", "Key registry reloads", ("result",))
+
+
+def key_digest(raw: str) -> bytes:
+    return hashlib.sha256(raw.encode()).digest()
+
+
+class ApiKey:
+    __slots__ = ("key_id", "tenant", "plan", "rate_limit_per_min", "routes", "server_timing", "admin")
+
+    def __init__(
+        self,
+        key_id: str,
+        tenant: str,
+        plan: str = "dev",
+        rate_limit_per_min: Optional[int] = None,
+        routes: Optional[FrozenSet[str]] = None,
+        server_timing: bool = False,
+        admin: bool = False,
+    ):
+        # key_id — префікс дайджесту: безпечно для логів / метрик
+        self.key_id = key_id
+        self.tenant = tenant
+        self.plan = plan
+        self.rate_limit_per_min = rate_limit_per_min
+        self.routes = routes
+        self.server_timing = server_timing
+        self.admin = admin
+
+    def allows(self, route: str) -> bool:
+        return self.routes is None or route in self.routes
+
+    def public(self) -> dict:
+        return {
+            "key_id": self.key_id,
+            "tenant": self.tenant,
+            "plan": self.plan,
+            "rate_limit_per_min": self.rate_limit_per_min,
+            "routes": sorted(self.routes) if self.routes is not None else None,
+        }
+
+
+def _routes(value) -> Optional[FrozenSet[str]]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    out = frozenset(r.strip() for r in value if r.strip())
+    return out or None
+
+
+def _entry(rec: dict) -> "tuple[bytes, ApiKey]":
+    if rec.get("key_sha256"):
+        digest = bytes.fromhex(rec["key_sha256"])
+    elif rec.get("key"):
+        digest = key_digest(rec["key"])
+    else:
+        raise ValueError("key_sha256 or key is required")
+    if len(digest) != 32:
+        raise ValueError("key_sha256 must be 64 hex chars")
+    limit = rec.get("rate_limit_per_min")
+    return digest, ApiKey(
+        key_id=digest.hex()[:12],
+        tenant=str(rec.get("tenant") or digest.hex()[:12]),
+        plan=str(rec.get("plan") or "dev"),
+        rate_limit_per_min=int(limit) if limit not in (None, "") else None,
+        routes=_routes(rec.get("routes")),
+        server_timing=bool(rec.get("server_timing")),
+        admin=bool(rec.get("admin")),
+    )
+
+
+def _read_json(path: str) -> List[dict]:
+    with open(path, "rb") as f:
+        data = json.load(f)
+    return data["keys"] if isinstance(data, dict) else data
+
+
+def _read_sqlite(path: str) -> List[dict]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        # колонка disabled необовʼязкова — фільтр у _build
+        rows = conn.execute("SELECT * FROM api_keys").fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+class KeyRegistry:
+    def __init__(
+        self,
+        path: str = "",
+        static_keys: Iterable[str] = (),
+        admin_keys: Iterable[str] = (),
+        server_timing_keys: Iterable[str] = (),
+        reload_interval: float = 5.0,
+    ):
+        self.path = path
+        self.static_keys = [k for k in static_keys if k]
+        self.admin_keys = [k for k in admin_keys if k]
+        st = set(server_timing_keys)
+        self._timing_all = "*" in st
+        self._timing_digests = {key_digest(k) for k in st if k != "*"}
+        self.reload_interval = reload_interval
+
+        self._index: Dict[bytes, ApiKey] = {}
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at = 0.0
+        self._swap(self._build())
+
+    # ---- побудова індексу (може виконуватись у потоці) ----
+
+    def _source_mtime(self) -> Optional[float]:
+        if not self.path:
+            return None
+        # SQLite у WAL-режимі змінює спершу -wal файл
+        return max(
+            (os.stat(p).st_mtime for p in (self.path, self.path + "-wal") if os.path.exists(p)),
+            default=None,
+        )
+
+    def _build(self) -> Dict[bytes, ApiKey]:
+        index: Dict[bytes, ApiKey] = {}
+        for raw in self.static_keys:
+            d = key_digest(raw)
+            index[d] = ApiKey(key_id=d.hex()[:12], tenant="public")
+        for raw in self.admin_keys:
+            d = key_digest(raw)
+            index[d] = ApiKey(key_id=d.hex()[:12], tenant="admin", plan="admin", admin=True)
+
+        if self.path:
+            self._mtime = self._source_mtime()
+            if self.path.endswith((".db", ".sqlite", ".sqlite3")):
+                records = _read_sqlite(self.path)
+            else:
+                records = _read_json(self.path)
+            for rec in records:
+                if rec.get("disabled"):
+                    continue
+                digest, key = _entry(rec)
+                index[digest] = key
+
+        for digest, key in index.items():
+            if self._timing_all or digest in self._timing_digests:
+                key.server_timing = True
+        return index
+
+    def _swap(self, index: Dict[bytes, ApiKey]) -> None:
+        self._index = index
+        self.loaded_at = time.time()
+        KEYS.set(len(index))
+
+    # ---- шлях запиту ----
+
+    def lookup(self, raw: Optional[str]) -> Optional[ApiKey]:
+        if not raw:
+            AUTH.inc(result="missing")
+            return None
+        key = self._index.get(key_digest(raw))
+        if key is None:
+            AUTH.inc(result="invalid")
+            return None
+        AUTH.inc(result="ok")
+        return key
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    # ---- hot reload ----
+
+    async def reload_if_changed(self) -> bool:
+        if not self.path or self._source_mtime() == self._mtime:
+            return False
+        try:
+            index = await asyncio.to_thread(self._build)
+        except Exception:
+            # лишаємо попередній індекс: битий файл не повинен вимкнути auth
+            RELOADS.inc(result="error")
+            log.exception("api key registry reload failed; keeping %d keys", len(self._index))
+            self._mtime = self._source_mtime()
+            return False
+        self._swap(index)
+        RELOADS.inc(result="ok")
+        log.info("api key registry reloaded: %d keys", len(index))
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload_if_changed()
+
+    def start(self) -> None:
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,135 @@
+"""
+Обмежена черга + фоновий writer, що скидає записи пачками.
+
+Хендлер лише кладе запис у чергу (O(1), без await); фоновий task збирає
+пачку до batch_size записів або до flush_interval і викликає flush(batch).
+Якщо writer відстає і черга повна, запис губиться за політикою overflow
+(drop_newest / drop_oldest) — запит клієнта ніколи не чекає на диск.
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.batching")
+
+QUEUE_DEPTH = REGISTRY.gauge("r4_batch_queue_depth", "Records waiting to be flushed", ("queue",))
+DROPPED = REGISTRY.counter("r4_batch_dropped_total", "Records dropped because the queue was full", ("queue",))
+FLUSHED = REGISTRY.counter("r4_batch_flushed_total", "Records flushed", ("queue",))
+FLUSH_MS = REGISTRY.histogram("r4_batch_flush_ms", "Batch flush duration in milliseconds", ("queue",))
+
+
+class BatchQueue:
+    name = "batch"
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.2,
+        overflow: str = "drop_newest",
+    ):
+        if overflow not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._task: Optional[asyncio.Task] = None
+        # уже вийняті з черги, але ще не скинуті записи
+        self._pending: List = []
+        self._collecting = False
+        self._closing = False
+
+    def submit(self, record) -> bool:
+        """Покласти запис у чергу; False, якщо якийсь запис довелось викинути."""
+        q = self.queue
+        try:
+            q.put_nowait(record)
+            QUEUE_DEPTH.set(q.qsize(), queue=self.name)
+            return True
+        except asyncio.QueueFull:
+            DROPPED.inc(queue=self.name)
+            if self.overflow == "drop_oldest":
+                q.get_nowait()
+                q.put_nowait(record)
+            return False
+
+    async def flush(self, batch: List) -> None:
+        raise NotImplementedError
+
+    async def _collect(self) -> None:
+        q = self.queue
+        batch = self._pending
+        if not batch:
+            batch.append(await q.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if q.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(q.get_nowait())
+
+    async def _flush_batch(self, batch: List) -> None:
+        t0 = time.perf_counter()
+        try:
+            await self.flush(batch)
+        except Exception:
+            log.exception("%s: flush of %d records failed", self.name, len(batch))
+            DROPPED.inc(len(batch), queue=self.name)
+            return
+        FLUSH_MS.observe((time.perf_counter() - t0) * 1000.0, queue=self.name)
+        FLUSHED.inc(len(batch), queue=self.name)
+        QUEUE_DEPTH.set(self.queue.qsize(), queue=self.name)
+
+    async def _run(self) -> None:
+        while not self._closing:
+            self._collecting = True
+            try:
+                await self._collect()
+            finally:
+                self._collecting = False
+            batch, self._pending = self._pending, []
+            # flush не скасовується: stop() чекає, поки пачка допишеться
+            await self._flush_batch(batch)
+
+    async def on_start(self) -> None:
+        pass
+
+    async def on_stop(self) -> None:
+        pass
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.on_start()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Зупинити writer і дописати все, що лишилось у черзі."""
+        if self._task is None:
+            return
+        self._closing = True
+        if self._collecting:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        rest, self._pending = self._pending, []
+        while not self.queue.empty():
+            rest.append(self.queue.get_nowait())
+        for i in range(0, len(rest), self.batch_size):
+            await self._flush_batch(rest[i:i + self.batch_size])
+        await self.on_stop()
@@ -0,0 +1,206 @@
+"""
+Потокова масова перевірка підписів: NDJSON на вході -> NDJSON на виході.
+
+Тіло запиту читається напряму з ASGI receive і ріжеться на рядки по ходу
+завантаження; рядки групуються в чанки, чанки перевіряються в пулі
+процесів (recovery — чистий CPU, тож GIL інакше обмежив би нас одним
+ядром). У польоті не більше window чанків: поки найстаріший не
+повернувся, нові байти не читаються, тож пам'ять стала, а повільний
+клієнт/повільний пул гальмують завантаження через TCP.
+
+Рядок входу — ті самі поля, що й у POST /v1/verify. Рядок виходу:
+    {"line": 1, "ok": true, "match": true, "recovered": "0x...", "expected": "0x...", "signer": "vrf-eu-1", "v_used": 0}
+    {"line": 2, "ok": false, "error": "v must be 0/1 or 27/28"}
+Індекс довірених підписантів (app/signers.py) — кілька 20-байтних ключів —
+їде в пул разом з кожним чанком, тож reload реєстру видно з наступного чанка.
+Останній рядок — підсумок:
+    {"summary": {"records": 2, "matched": 1, "errors": 1, "elapsed_ms": 3.1, "records_per_s": 645.2}}
+"""
+
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.responses import Response
+
+from .metrics import REGISTRY
+from .signers import UNTRUSTED, SignerRegistry, count as count_signers
+from .sigverify import VerifyInputError, VerifyRequest, verify_request
+
+
+RECORDS = REGISTRY.counter("r4_verify_stream_records_total", "Records processed by /v1/verify_stream", ("result",))
+ACTIVE = REGISTRY.gauge("r4_verify_stream_active", "Open /v1/verify_stream uploads")
+CHUNKS_INFLIGHT = REGISTRY.gauge("r4_verify_stream_chunks_inflight", "Chunks submitted to the verify pool")
+CHUNK_MS = REGISTRY.histogram("r4_verify_stream_chunk_ms", "Verify pool round trip per chunk in milliseconds")
+THROUGHPUT = REGISTRY.gauge("r4_verify_stream_records_per_s", "Throughput of the last finished stream")
+
+
+def _verify_line(line: bytes, trusted: Mapping[bytes, str]) -> dict:
+    try:
+        return verify_request(VerifyRequest.model_validate_json(line), trusted)
+    except ValidationError as e:
+        err = e.errors()[0]
+        loc = ".".join(str(p) for p in err["loc"]) or "line"
+        return {"ok": False, "error": f"{loc}: {err['msg']}"}
+    except VerifyInputError as e:
+        return {"ok": False, "error": str(e)}
+
+
+def verify_chunk(
+    lines: List[Tuple[int, bytes]], trusted: Mapping[bytes, str]
+) -> Tuple[bytes, int, int, Dict[str, int]]:
+    """Виконується у воркері пулу: (NDJSON, matched, errors, {signer: n})."""
+    out = []
+    matched = errors = 0
+    signers: Dict[str, int] = {}
+    for i, line in lines:
+        res = _verify_line(line, trusted)
+        if res["ok"]:
+            matched += res["match"]
+            signer = res["signer"] or UNTRUSTED
+            signers[signer] = signers.get(signer, 0) + 1
+        else:
+            errors += 1
+        out.append(json.dumps({"line": i, **res}, separators=(",", ":")))
+    out.append("")
+    return "\n".join(out).encode(), matched, errors, signers
+
+
+class VerifyPool:
+    """Лінивий ProcessPoolExecutor (spawn: не форкаємо процес з event loop і потоками)."""
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(self, lines: List[Tuple[int, bytes]], trusted: Mapping[bytes, str]) -> "asyncio.Future":
+        return asyncio.wrap_future(self._get().submit(verify_chunk, lines, trusted))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class VerifyStreamResponse(Response):
+    """
+    Response, що сам читає тіло запиту: StreamingResponse паралельно слухає
+    receive() заради http.disconnect і з'їв би частину завантаження.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        pool: VerifyPool,
+        trusted: Optional[SignerRegistry] = None,
+        chunk_lines: int = 256,
+        window: int = 0,
+        max_line_bytes: int = 16384,
+    ):
+        super().__init__(media_type=self.media_type)
+        del self.headers["content-length"]
+        self.pool = pool
+        self.trusted = trusted
+        self.chunk_lines = chunk_lines
+        self.window = window or pool.workers * 2
+        self.max_line_bytes = max_line_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        inflight: collections.deque = collections.deque()
+        records = matched = errors = 0
+        t0 = time.perf_counter()
+
+        async def drain_one() -> None:
+            nonlocal records, matched, errors
+            t_sub, n, fut = inflight.popleft()
+            try:
+                payload, m, e, signers = await fut
+            finally:
+                CHUNKS_INFLIGHT.inc(-1)
+            CHUNK_MS.observe((time.perf_counter() - t_sub) * 1000.0)
+            records += n
+            matched += m
+            errors += e
+            RECORDS.inc(n - e, result="ok")
+            RECORDS.inc(e, result="error")
+            count_signers(signers)
+            await send({"type": "http.response.body", "body": payload, "more_body": True})
+
+        async def submit(lines: List[Tuple[int, bytes]]) -> None:
+            while len(inflight) >= self.window:
+                await drain_one()
+            trusted = self.trusted.index if self.trusted is not None else {}
+            inflight.append((time.perf_counter(), len(lines), self.pool.submit(lines, trusted)))
+            CHUNKS_INFLIGHT.inc()
+
+        ACTIVE.inc()
+        try:
+            buf = b""
+            lines: List[Tuple[int, bytes]] = []
+            line_no = 0
+            too_long = None
+            more = True
+            while more:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                more = message.get("more_body", False)
+                buf += message.get("body", b"")
+                parts = buf.split(b"\n")
+                buf = parts.pop() if more else b""
+                for part in parts:
+                    line_no += 1
+                    if part.strip():
+                        lines.append((line_no, part))
+                        if len(lines) >= self.chunk_lines:
+                            await submit(lines)
+                            lines = []
+                if len(buf) > self.max_line_bytes:
+                    # рядок без кінця — дочитувати його в пам'ять не будемо
+                    too_long = line_no + 1
+                    break
+            if lines:
+                await submit(lines)
+            while inflight:
+                await drain_one()
+            if too_long is not None:
+                err = {"line": too_long, "ok": False, "error": f"line exceeds {self.max_line_bytes} bytes"}
+                await send({"type": "http.response.body", "body": json.dumps(err).encode() + b"\n", "more_body": True})
+        finally:
+            ACTIVE.inc(-1)
+            for _, _, fut in inflight:
+                fut.cancel()
+                CHUNKS_INFLIGHT.inc(-1)
+
+        elapsed = time.perf_counter() - t0
+        rate = records / elapsed if elapsed > 0 else 0.0
+        THROUGHPUT.set(round(rate, 1))
+        summary = {
+            "records": records,
+            "matched": matched,
+            "errors": errors,
+            "elapsed_ms": round(elapsed * 1000.0, 3),
+            "records_per_s": round(rate, 1),
+        }
+        await send({
+            "type": "http.response.body",
+            "body": json.dumps({"summary": summary}).encode() + b"\n",
+            "more_body": False,
+        })
+
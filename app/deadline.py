@@ -0,0 +1,120 @@
+"""
+Клієнтські дедлайни та скасування upstream-роботи.
+
+Клієнт може передати свій бюджет часу:
+    X-Request-Timeout: 1.5        – секунд від моменту прийому запиту (або "1500ms")
+    X-Request-Deadline: <epoch>   – абсолютний дедлайн, Unix time у мс (або с з дробом)
+
+Gateway обрізає upstream-таймаут під цей бюджет, передає залишок далі в
+core/VRF тими ж заголовками і знімає upstream-запит, щойно вийшов час або
+клієнт відʼєднався.
+"""
+
+import asyncio
+import math
+import time
+from typing import Awaitable, Optional
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def _parse_timeout(raw: str) -> Optional[float]:
+    raw = raw.strip().lower()
+    try:
+        if raw.endswith("ms"):
+            v = float(raw[:-2]) / 1000.0
+        else:
+            v = float(raw[:-1] if raw.endswith("s") else raw)
+    except ValueError:
+        return None
+    # inf / nan / 1e400 — не бюджет; далі з ними падає арифметика заголовків
+    return v if math.isfinite(v) else None
+
+
+def _parse_epoch(raw: str) -> Optional[float]:
+    try:
+        v = float(raw.strip())
+    except ValueError:
+        return None
+    if not math.isfinite(v):
+        return None
+    # 1e11 мс ~ 1973 рік, 1e11 с ~ 5000 рік: все, що більше, — мілісекунди
+    return v / 1000.0 if v > 1e11 else v
+
+
+class Deadline:
+    """Дедлайн у time.monotonic(); None-дедлайн означає «лише дефолтні таймаути»."""
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    def upstream_headers(self) -> dict:
+        rem = max(0.0, self.remaining())
+        return {
+            "X-Request-Timeout": "%.3f" % rem,
+            "X-Request-Deadline": str(int((time.time() + rem) * 1000)),
+        }
+
+    @classmethod
+    def from_headers(cls, headers) -> Optional["Deadline"]:
+        budgets = []
+        raw = headers.get("x-request-timeout")
+        if raw:
+            t = _parse_timeout(raw)
+            if t is not None:
+                budgets.append(t)
+        raw = headers.get("x-request-deadline")
+        if raw:
+            epoch = _parse_epoch(raw)
+            if epoch is not None:
+                budgets.append(epoch - time.time())
+        if not budgets:
+            return None
+        return cls(time.monotonic() + min(budgets))
+
+
+async def _wait_disconnect(receive) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_bounded(receive, work: Awaitable, budget: float):
+    """
+    Виконати work не довше budget секунд; зняти його, якщо клієнт пішов.
+
+    receive — ASGI receive запиту (request.receive). Тіло на цей момент уже
+    прочитане FastAPI, тож далі від нього може прийти лише http.disconnect.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        done, _ = await asyncio.wait(
+            (task, watcher), timeout=budget, return_when=asyncio.FIRST_COMPLETED
+        )
+    except BaseException:
+        task.cancel()
+        watcher.cancel()
+        raise
+
+    if task in done:
+        watcher.cancel()
+        return task.result()
+
+    task.cancel()
+    if watcher in done:
+        raise ClientDisconnected()
+    watcher.cancel()
+    raise DeadlineExceeded()
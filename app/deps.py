@@ -1,6 +1,45 @@
-from fastapi import Header, HTTPException, status
-from .settings import settings
+import time
+from typing import Optional
 
-async def require_api_key(x_api_key: str | None = Header(default=None)):
-    if not x_api_key or x_api_key != settings.DEMO_API_KEY:
+from fastapi import Depends, Header, HTTPException, Request, status
+
+from .apikeys import ApiKey
+from .upstream import PhaseTimer
+
+
+async def require_api_key(
+    request: Request,
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+) -> ApiKey:
+    """
+    Авторизація через реєстр ключів (request.app.state.key_registry):
+    - API key може прийти або з заголовка X-API-Key,
+    - або як query параметр ?api_key=...
+
+    Заодно заводить request.state.timer (фази запиту для Server-Timing / метрик)
+    і request.state.api_key (метадані ключа: tenant, plan, ліміти).
+    """
+    t0 = time.perf_counter()
+    raw = x_api_key or request.query_params.get("api_key")
+
+    key = request.app.state.key_registry.lookup(raw)
+    if key is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
+
+    # шаблон роуту (/v1/proofs/{msg_hash}), а не конкретний path
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    if not key.allows(route):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="route_not_allowed")
+
+    timer = PhaseTimer(route=route, expose=key.server_timing)
+    timer.add("auth", (time.perf_counter() - t0) * 1000.0)
+    request.state.timer = timer
+    request.state.api_key = key
+    return key
+
+
+async def require_admin_key(key: ApiKey = Depends(require_api_key)) -> ApiKey:
+    """Лише ключі з admin=true (ADMIN_API_KEY або "admin": true у реєстрі)."""
+    if not key.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin_only")
+    return key
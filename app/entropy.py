@@ -0,0 +1,189 @@
+"""
+Джерела ентропії для /v1/random (ENTROPY_SOURCE).
+
+- "http" (за замовчуванням) — core за CORE_URL/random, як і раніше:
+  /v1/random проксіює відповідь core як є, а read() наповнює резервуар
+  (app/reservoir.py).
+- in-process — байти генеруються в процесі gateway і викликаються напряму,
+  без HTTP-хопу й серіалізації:
+    "drbg"                    — HMAC-DRBG (SP 800-90A, SHA-256), референсна
+                                реалізація з тим самим контрактом, що й
+                                core-dev/main.py (n ∈ 1..4096, hex / json);
+    "module:pkg.mod:func"     — func(n) -> bytes з довільного Python-модуля;
+    "lib:/path/libx.so:sym"   — int sym(uint8_t *buf, size_t n) зі спільної
+                                бібліотеки через ctypes (0 — успіх), напр.
+                                "lib:libc.so.6:getentropy" (n ≤ 256).
+
+In-process джерела синхронні й швидкі (мікросекунди) — їх викликають прямо
+в event loop, без потоків.
+"""
+
+import hmac
+import importlib
+import os
+from typing import Callable, Optional
+
+from .metrics import REGISTRY
+
+
+# той самий ліміт, що й у core-dev: /random?n= ∈ 1..4096
+MAX_N = 4096
+
+GENERATED = REGISTRY.counter(
+    "r4_entropy_source_bytes_total", "Random bytes produced by in-process entropy sources", ("source",)
+)
+
+
+class EntropyError(RuntimeError):
+    pass
+
+
+class EntropySource:
+    name = "base"
+    in_process = False
+
+    def random_bytes(self, n: int) -> bytes:
+        raise NotImplementedError
+
+    async def read(self, n: int) -> bytes:
+        return self.random_bytes(n)
+
+
+class HttpEntropySource(EntropySource):
+    name = "http"
+
+    def __init__(self, upstream, url: str, api_key: str, timeout: float = 10.0):
+        self.upstream = upstream
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    async def read(self, n: int) -> bytes:
+        r = await self.upstream.get(
+            "core",
+            self.url,
+            params={"n": n, "fmt": "hex"},
+            headers={"X-API-Key": self.api_key},
+            timeout=self.timeout,
+        )
+        r.raise_for_status()
+        return bytes.fromhex(r.text.strip())
+
+
+class InProcessSource(EntropySource):
+    in_process = True
+
+    def __init__(self, name: str, fn: Callable[[int], bytes]):
+        self.name = name
+        self._fn = fn
+
+    def random_bytes(self, n: int) -> bytes:
+        out = self._fn(n)
+        if len(out) != n:
+            raise EntropyError(f"{self.name} returned {len(out)} bytes, expected {n}")
+        GENERATED.inc(n, source=self.name)
+        return out
+
+
+class HmacDrbg:
+    """
+    HMAC_DRBG (NIST SP 800-90A rev.1, SHA-256) без prediction resistance.
+    Сід — os.urandom; reseed кожні reseed_interval викликів generate() і
+    після fork (інакше воркери app.serve видавали б однаковий потік).
+    """
+
+    OUTLEN = 32
+    # SP 800-90A, табл. 2: не більше 2^19 біт за один generate
+    MAX_BYTES_PER_REQUEST = 1 << 16
+
+    def __init__(self, personalization: bytes = b"r4-gateway", reseed_interval: int = 1 << 16):
+        self.personalization = personalization
+        self.reseed_interval = reseed_interval
+        self._pid = -1
+        self._key = b""
+        self._v = b""
+        self._counter = 0
+
+    def _update(self, provided: bytes = b"") -> None:
+        k = hmac.digest(self._key, self._v + b"\x00" + provided, "sha256")
+        v = hmac.digest(k, self._v, "sha256")
+        if provided:
+            k = hmac.digest(k, v + b"\x01" + provided, "sha256")
+            v = hmac.digest(k, v, "sha256")
+        self._key, self._v = k, v
+
+    def instantiate(self, entropy: Optional[bytes] = None, nonce: Optional[bytes] = None) -> None:
+        # entropy / nonce задаються явно лише для known-answer тестів (NIST CAVP)
+        self._key = b"\x00" * self.OUTLEN
+        self._v = b"\x01" * self.OUTLEN
+        self._update((entropy or os.urandom(32)) + (nonce or os.urandom(16)) + self.personalization)
+        self._counter = 1
+        self._pid = os.getpid()
+
+    def reseed(self, additional: bytes = b"") -> None:
+        self._update(os.urandom(32) + additional)
+        self._counter = 1
+
+    def generate(self, n: int) -> bytes:
+        if self._pid != os.getpid():
+            self.instantiate()
+        elif self._counter > self.reseed_interval:
+            self.reseed()
+        if n > self.MAX_BYTES_PER_REQUEST:
+            raise EntropyError(f"drbg request too large: {n} bytes")
+        key, v = self._key, self._v
+        out = bytearray()
+        while len(out) < n:
+            v = hmac.digest(key, v, "sha256")
+            out += v
+        self._v = v
+        self._update()
+        self._counter += 1
+        return bytes(out[:n])
+
+
+def _load_module(target: str) -> Callable[[int], bytes]:
+    module, _, attr = target.rpartition(":")
+    if not module or not attr:
+        raise ValueError(f"expected module:pkg.mod:func, got module:{target}")
+    fn = getattr(importlib.import_module(module), attr)
+    if not callable(fn):
+        raise ValueError(f"{target} is not callable")
+    return fn
+
+
+def _load_library(target: str) -> Callable[[int], bytes]:
+    path, _, symbol = target.rpartition(":")
+    if not path or not symbol:
+        raise ValueError(f"expected lib:/path/lib.so:symbol, got lib:{target}")
+    import ctypes  # лише для lib: — не на холодному старті
+
+    fn = getattr(ctypes.CDLL(path), symbol)
+    fn.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    fn.restype = ctypes.c_int
+
+    def random_bytes(n: int) -> bytes:
+        buf = ctypes.create_string_buffer(n)
+        rc = fn(buf, n)
+        if rc != 0:
+            raise EntropyError(f"{symbol}() returned {rc}")
+        return buf.raw
+
+    return random_bytes
+
+
+def load_source(spec: str, http: Optional[HttpEntropySource] = None) -> EntropySource:
+    """ENTROPY_SOURCE → джерело; помилка конфігурації — ValueError на старті."""
+    spec = spec.strip()
+    if spec in ("", "http"):
+        if http is None:
+            raise ValueError("http entropy source needs an upstream")
+        return http
+    if spec == "drbg":
+        return InProcessSource("drbg", HmacDrbg().generate)
+    kind, _, target = spec.partition(":")
+    if kind == "module":
+        return InProcessSource(spec, _load_module(target))
+    if kind == "lib":
+        return InProcessSource(spec, _load_library(target))
+    raise ValueError(f"unknown ENTROPY_SOURCE: {spec!r} (http | drbg | module:... | lib:...)")
@@ -0,0 +1,129 @@
+"""
+Фоновий health-prober для core / VRF.
+
+Раз на interval б'є в <upstream>/health через спільний пул (тим самим
+тримаючи keep-alive з'єднання теплими) і кешує результат уже серіалізованим
+JSON, тож /v1/health?deep=1 і /v1/ready віддаються з пам'яті.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from .metrics import REGISTRY
+from .upstream import Upstream
+
+
+log = logging.getLogger("r4.health")
+
+UPSTREAM_UP = REGISTRY.gauge("r4_upstream_up", "1 if the last health probe succeeded", ("upstream",))
+PROBE_LATENCY_MS = REGISTRY.histogram(
+    "r4_health_probe_ms", "Upstream health probe latency in milliseconds", ("upstream",)
+)
+
+
+class HealthProber:
+    def __init__(
+        self,
+        upstream: Upstream,
+        targets: Dict[str, str],
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        headers: Optional[dict] = None,
+    ):
+        self.upstream = upstream
+        self.targets = targets
+        self.interval = interval
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.results: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ready = False
+        self._checked_at = 0.0
+        self._body_ok = b""
+        self._body_fail = b""
+        self._render()
+
+    async def _probe(self, name: str, url: str) -> dict:
+        t0 = time.perf_counter()
+        try:
+            r = await self.upstream.client.get(url, headers=self.headers, timeout=self.timeout)
+            ok = r.status_code == 200
+            err = None if ok else f"http_{r.status_code}"
+        except httpx.HTTPError as e:
+            ok, err = False, f"{type(e).__name__}: {e!s}"
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+
+        prev = self.results.get(name, {})
+        UPSTREAM_UP.set(1 if ok else 0, upstream=name)
+        if ok:
+            PROBE_LATENCY_MS.observe(latency_ms, upstream=name)
+        elif prev.get("ok", True):
+            log.warning("upstream %s unhealthy: %s", name, err)
+        return {
+            "ok": ok,
+            "latency_ms": round(latency_ms, 3),
+            "checked_at": int(time.time()),
+            "error": err,
+            "consecutive_failures": 0 if ok else prev.get("consecutive_failures", 0) + 1,
+        }
+
+    async def probe_once(self) -> None:
+        names = list(self.targets)
+        results = await asyncio.gather(*(self._probe(n, self.targets[n]) for n in names))
+        self.results = dict(zip(names, results))
+        self._checked_at = time.monotonic()
+        self._ready = all(r["ok"] for r in results)
+        self._render()
+
+    def _render(self) -> None:
+        # серіалізуємо один раз на probe, а не на кожен запит
+        base = {"upstreams": self.results, "probe_interval_s": self.interval}
+        self._body_ok = json.dumps({"ok": True, **base}).encode()
+        self._body_fail = json.dumps({"ok": False, **base}).encode()
+
+    def is_ready(self) -> bool:
+        # результат старший за 3 інтервали вважаємо невідомим
+        fresh = time.monotonic() - self._checked_at < self.interval * 3
+        return self._ready and fresh
+
+    def deep_body(self) -> bytes:
+        return self._body_ok if self.is_ready() else self._body_fail
+
+    async def warm(self, connections: int) -> None:
+        """Відкрити connections з'єднань до кожного upstream до першого запиту клієнта."""
+        if connections <= 0:
+            return
+        await asyncio.gather(
+            *(
+                self.upstream.client.get(url, headers=self.headers, timeout=self.timeout)
+                for url in self.targets.values()
+                for _ in range(connections)
+            ),
+            return_exceptions=True,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except Exception:
+                log.exception("health probe failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
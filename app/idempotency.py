@@ -0,0 +1,354 @@
+"""
+Idempotency-Key для роутів, що підписують новий VRF-доказ.
+
+Клієнт, який не дочекався відповіді, повторює запит з тим самим
+Idempotency-Key і отримує ТОЙ САМИЙ доказ, а VRF нода не підписує другий:
+- завершені відповіді лежать в обмеженому TTL-кеші — повтор коштує один
+  dict.get;
+- single-flight: поки перший виклик upstream ще йде, повтори чекають на
+  нього ж (join), а не шлють свій. Спільний виклик не прив'язаний до
+  клієнта-ініціатора: якщо той відвалився, виклик доходить до кінця й
+  результат кешується для повтору.
+
+Ключ кешу — (тенант, роут, Idempotency-Key), тож тенанти не бачать
+відповідей одне одного. Той самий ключ з іншими параметрами upstream — 422.
+Кешуються лише 200; помилки й таймаути не кешуються, повтор іде заново.
+
+Межі пам'яті: max_entries і max_bytes (сума тіл + накладні на запис); понад
+них витісняються найстаріші записи. Копія зі спільного шару живе лише
+залишок свого TTL, тож найстаріший запис не завжди протерміновується першим:
+_expire чистить голову черги, а begin ще й перевіряє expires знайденого
+запису. Тіла понад max_entry_bytes не кешуються.
+
+Під app.serve повтор часто приходить в інший воркер, тож кеш у пам'яті
+процесу — лише L1. Спільний шар — SharedStore (SQLite у WAL, по файлу на
+master): завершена відповідь пишеться туди, а single-flight між воркерами
+тримається на оренді — рядку без тіла, який вставляє воркер-лідер. Інші
+воркери опитують рядок, поки лідер не запише тіло; якщо лідер упав або
+виклик не вдався, оренда зникає / спливає й виклик бере наступний.
+Читання — у event loop (мікросекунди, як у proofstore), запис — у потоці.
+"""
+
+import asyncio
+import collections
+import json
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .metrics import REGISTRY
+
+
+REQUESTS = REGISTRY.counter(
+    "r4_idempotency_requests_total", "Requests with an Idempotency-Key by outcome", ("result",)
+)
+EVICTIONS = REGISTRY.counter("r4_idempotency_evictions_total", "Idempotency cache evictions", ("reason",))
+ENTRIES = REGISTRY.gauge("r4_idempotency_entries", "Completed responses in the idempotency cache")
+BYTES = REGISTRY.gauge("r4_idempotency_bytes", "Approximate idempotency cache size in bytes")
+
+# dict-запис, кортеж ключа, StoredResponse — грубо, але стабільно
+ENTRY_OVERHEAD = 256
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """Той самий ключ уже використано з іншими параметрами."""
+
+
+class StoredResponse:
+    """Те, що _proxy читає з httpx.Response: status_code, content, headers."""
+
+    __slots__ = ("status_code", "content", "headers", "fingerprint", "expires", "size", "replayed")
+
+    def __init__(self, status_code: int, content: bytes, content_type: str, fingerprint: Hashable):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"content-type": content_type}
+        self.fingerprint = fingerprint
+        self.expires = 0.0
+        self.size = len(content) + ENTRY_OVERHEAD
+        # True — відповідь узята з результату іншого воркера, а не з власного виклику
+        self.replayed = False
+
+
+def valid_key(key: str) -> bool:
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    k            TEXT PRIMARY KEY,
+    fingerprint  TEXT NOT NULL,
+    status       INTEGER,
+    content_type TEXT,
+    body         BLOB,
+    expires      REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+SQL_GET = "SELECT fingerprint, status, content_type, body, expires FROM idempotency WHERE k = ?"
+# оренда: новий рядок або заміна простроченого (упала оренда / сплив TTL відповіді)
+SQL_CLAIM = (
+    "INSERT INTO idempotency (k, fingerprint, expires) VALUES (?, ?, ?)"
+    " ON CONFLICT (k) DO UPDATE SET fingerprint = excluded.fingerprint, expires = excluded.expires,"
+    " status = NULL, content_type = NULL, body = NULL WHERE idempotency.expires < ?"
+)
+SQL_PUT = "UPDATE idempotency SET status = ?, content_type = ?, body = ?, expires = ? WHERE k = ?"
+SQL_RELEASE = "DELETE FROM idempotency WHERE k = ? AND body IS NULL"
+SQL_CLEANUP = "DELETE FROM idempotency WHERE expires < ?"
+
+
+class SharedStore:
+    """
+    Спільний між воркерами шар кешу. Час — wall clock (time.time()): рядки
+    читають різні процеси. З'єднання відкриваються ліниво — вже у воркері,
+    а не в master під час preload.
+    """
+
+    def __init__(self, path: str, lease: float = 60.0, poll_interval: float = 0.02, cleanup_interval: float = 60.0):
+        self.path = path
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+        self._reader: Optional[sqlite3.Connection] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._next_cleanup = 0.0
+
+    def _open(self) -> None:
+        writer = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        writer.execute("PRAGMA journal_mode = WAL")
+        writer.execute("PRAGMA synchronous = NORMAL")
+        writer.execute("PRAGMA busy_timeout = 5000")
+        writer.executescript(SCHEMA)
+        reader = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        reader.execute("PRAGMA busy_timeout = 5000")
+        self._writer, self._reader = writer, reader
+
+    def get(self, key: str) -> Optional[tuple]:
+        if self._reader is None:
+            with self._write_lock:
+                if self._reader is None:
+                    self._open()
+        return self._reader.execute(SQL_GET, (key,)).fetchone()
+
+    # ---- запис (у потоці) ----
+
+    def _write(self, sql: str, args: tuple) -> int:
+        with self._write_lock:
+            if self._writer is None:
+                self._open()
+            return self._writer.execute(sql, args).rowcount
+
+    def claim(self, key: str, fingerprint: str) -> bool:
+        now = time.time()
+        return self._write(SQL_CLAIM, (key, fingerprint, now + self.lease, now)) == 1
+
+    def put(self, key: str, status: int, content_type: str, body: bytes, ttl: float) -> None:
+        now = time.time()
+        self._write(SQL_PUT, (status, content_type, body, now + ttl, key))
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + self.cleanup_interval
+            self._write(SQL_CLEANUP, (now,))
+
+    def release(self, key: str) -> None:
+        self._write(SQL_RELEASE, (key,))
+
+    def close(self) -> None:
+        with self._write_lock:
+            for conn in (self._reader, self._writer):
+                if conn is not None:
+                    conn.close()
+            self._reader = self._writer = None
+
+
+def _shared_key(key: Hashable) -> str:
+    return json.dumps(key, separators=(",", ":"))
+
+
+def _from_row(row: tuple, fingerprint: Hashable) -> StoredResponse:
+    # expires у рядку — wall clock; у L1 — monotonic на залишок того ж TTL
+    entry = StoredResponse(row[1], row[3], row[2] or "", fingerprint)
+    entry.expires = time.monotonic() + (row[4] - time.time())
+    return entry
+
+
+class IdempotencyCache:
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        max_entries: int = 100_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 64 * 1024,
+        shared: Optional[SharedStore] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.shared = shared
+        self._done: "collections.OrderedDict[Hashable, StoredResponse]" = collections.OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[Hashable, asyncio.Task]] = {}
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    # ---- шлях запиту ----
+
+    def begin(
+        self,
+        key: Hashable,
+        fingerprint: Hashable,
+        start: Callable[[], Awaitable],
+    ) -> Tuple[Awaitable, str]:
+        """
+        -> (awaitable з відповіддю, outcome): "hit" — з кешу, "joined" — чекає
+        на вже запущений у цьому воркері виклик, "miss" — цей запит запустив
+        задачу; якщо виклик уже вів інший воркер, відповідь має replayed=True.
+        Awaitable можна скасувати (таймаут / disconnect клієнта) — сам виклик
+        upstream від цього не зупиняється.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._done.get(key)
+        if entry is not None and entry.expires <= now:
+            self._drop(key)
+            EVICTIONS.inc(reason="ttl")
+            ENTRIES.set(len(self._done))
+            BYTES.set(self._bytes)
+            entry = None
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                REQUESTS.inc(result="mismatch")
+                raise IdempotencyKeyReused()
+            REQUESTS.inc(result="hit")
+            fut = asyncio.get_running_loop().create_future()
+            fut.set_result(entry)
+            return fut, "hit"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] != fingerprint:
+                REQUESTS.inc(result="mismatch")
+                raise IdempotencyKeyReused()
+            REQUESTS.inc(result="joined")
+            return asyncio.shield(inflight[1]), "joined"
+
+        if self.shared is not None:
+            row = self.shared.get(_shared_key(key))
+            if row is not None and row[4] > time.time():
+                if row[0] != repr(fingerprint):
+                    REQUESTS.inc(result="mismatch")
+                    raise IdempotencyKeyReused()
+                if row[3] is not None:
+                    # завершено в іншому воркері — копія в L1 на залишок TTL
+                    entry = _from_row(row, fingerprint)
+                    self._store(key, entry)
+                    REQUESTS.inc(result="hit")
+                    fut = asyncio.get_running_loop().create_future()
+                    fut.set_result(entry)
+                    return fut, "hit"
+                # інший воркер уже веде виклик: задача дочекається його результату
+                # (і позначить його replayed) або, якщо він не впорається, поведе сама
+                REQUESTS.inc(result="joined")
+            else:
+                REQUESTS.inc(result="miss")
+        else:
+            REQUESTS.inc(result="miss")
+        task = asyncio.ensure_future(self._lead(key, fingerprint, start))
+        # ніхто може й не дочекатися (усі клієнти пішли) — не лишаємо
+        # "Task exception was never retrieved" у логах
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = (fingerprint, task)
+        return asyncio.shield(task), "miss"
+
+    async def _lead(self, key: Hashable, fingerprint: Hashable, start: Callable[[], Awaitable]):
+        try:
+            if self.shared is not None:
+                r = await self._lead_shared(key, fingerprint, start)
+            else:
+                r = await start()
+        finally:
+            self._inflight.pop(key, None)
+        if isinstance(r, StoredResponse):
+            stored = r
+        else:
+            stored = StoredResponse(r.status_code, r.content, r.headers.get("content-type", ""), fingerprint)
+        if r.status_code == 200:
+            self._store(key, stored)
+        return stored
+
+    async def _lead_shared(self, key: Hashable, fingerprint: Hashable, start: Callable[[], Awaitable]):
+        shared = self.shared
+        skey, sfp = _shared_key(key), repr(fingerprint)
+        while True:
+            if await asyncio.to_thread(shared.claim, skey, sfp):
+                try:
+                    r = await start()
+                except BaseException:
+                    await asyncio.shield(asyncio.to_thread(shared.release, skey))
+                    raise
+                size = len(r.content) + ENTRY_OVERHEAD
+                if r.status_code == 200 and size <= self.max_entry_bytes:
+                    await asyncio.to_thread(
+                        shared.put, skey, r.status_code, r.headers.get("content-type", ""), r.content, self.ttl
+                    )
+                else:
+                    await asyncio.to_thread(shared.release, skey)
+                return r
+            # оренда в іншого воркера — чекаємо на його результат
+            while True:
+                row = shared.get(skey)
+                if row is None or row[4] <= time.time():
+                    break  # лідер не впорався / оренда спливла — пробуємо самі
+                if row[0] != sfp:
+                    raise IdempotencyKeyReused()
+                if row[3] is not None:
+                    stored = _from_row(row, fingerprint)
+                    stored.replayed = True
+                    return stored
+                await asyncio.sleep(shared.poll_interval)
+
+    # ---- кеш ----
+
+    def _store(self, key: Hashable, entry: StoredResponse) -> None:
+        if entry.size > self.max_entry_bytes:
+            EVICTIONS.inc(reason="too_large")
+            return
+        now = time.monotonic()
+        if not entry.expires:
+            entry.expires = now + self.ttl
+        # заміна: старий запис віднімаємо, новий — у хвіст черги
+        self._drop(key)
+        self._done[key] = entry
+        self._bytes += entry.size
+        self._expire(now)
+        while self._done and (len(self._done) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._done.popitem(last=False)
+            self._bytes -= old.size
+            EVICTIONS.inc(reason="capacity")
+        ENTRIES.set(len(self._done))
+        BYTES.set(self._bytes)
+
+    def _drop(self, key: Hashable) -> None:
+        old = self._done.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def _expire(self, now: float) -> None:
+        done = self._done
+        expired = 0
+        while done:
+            key, entry = next(iter(done.items()))
+            if entry.expires > now:
+                break
+            del done[key]
+            self._bytes -= entry.size
+            expired += 1
+        if expired:
+            EVICTIONS.inc(expired, reason="ttl")
+            ENTRIES.set(len(done))
+            BYTES.set(self._bytes)
@@ -0,0 +1,107 @@
+"""
+Append-only журнал виданих VRF-доказів (JSONL).
+
+На шляху запиту — лише submit() сирого тіла відповіді VRF у чергу.
+JSON парситься, пишеться і fsync-иться вже у фоні, пачками (один fsync на
+пачку). Файли ротуються за розміром / віком, закриті файли можна стискати
+gzip-ом.
+
+Файл: <dir>/proofs-<UTC timestamp>-<pid>-<seq>.jsonl, рядок на доказ:
+    {"ts": 1762571001123, "route": "/v1/vrf", "request_id": "...", "sig": "ecdsa", "proof": {...}}
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import time
+from typing import List, Optional
+
+from .batching import BatchQueue
+
+
+class ProofJournal(BatchQueue):
+    name = "journal"
+
+    def __init__(
+        self,
+        directory: str,
+        rotate_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 3600.0,
+        compress: bool = False,
+        fsync: bool = True,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.fsync = fsync
+        self._fh = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._seq = 0
+
+    def record(self, route: str, request_id: str, sig: str, body: bytes) -> bool:
+        # без парсингу на шляху запиту: лише tuple у чергу
+        return self.submit((int(time.time() * 1000), route, request_id, sig, body))
+
+    # ---- фон (у потоці, поза event loop) ----
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        # seq: кілька ротацій за одну секунду не повинні писати в той самий файл
+        self._seq += 1
+        name = f"proofs-{stamp}-{os.getpid()}-{self._seq:06d}.jsonl"
+        self._path = os.path.join(self.directory, name)
+        self._fh = open(self._path, "ab")
+        self._opened_at = time.monotonic()
+        self._size = self._fh.tell()
+
+    def _close(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        path, self._fh, self._path = self._path, None, None
+        if self.compress and os.path.getsize(path) > 0:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+
+    def _needs_rotation(self) -> bool:
+        return (
+            self._size >= self.rotate_bytes
+            or time.monotonic() - self._opened_at >= self.rotate_seconds
+        )
+
+    @staticmethod
+    def _encode(item) -> bytes:
+        ts, route, request_id, sig, body = item
+        rec = {"ts": ts, "route": route, "request_id": request_id, "sig": sig}
+        try:
+            rec["proof"] = json.loads(body)
+        except ValueError:
+            rec["proof_raw"] = body.decode("utf-8", "replace")
+        return json.dumps(rec, separators=(",", ":")).encode() + b"\n"
+
+    def _write_batch(self, batch: List) -> None:
+        if self._fh is not None and self._needs_rotation():
+            self._close()
+        if self._fh is None:
+            self._open()
+        data = b"".join(self._encode(item) for item in batch)
+        self._fh.write(data)
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+        self._size += len(data)
+
+    async def flush(self, batch: List) -> None:
+        await asyncio.to_thread(self._write_batch, batch)
+
+    async def on_stop(self) -> None:
+        await asyncio.to_thread(self._close)
@@ -0,0 +1,244 @@
+"""
+Адаптивний ліміт паралельних запитів (AIMD) і скидання навантаження.
+
+Для кожної групи роутів (random / vrf / verify) тримаємо ліміт in-flight
+запитів, який підлаштовується під латентність обслуговування (для проксі —
+це фактично round trip до core/VRF):
+
+- короткий EWMA латентності (останні ~short_window запитів) у межах
+  baseline * tolerance  ->  limit += 1 / limit; baseline — довгий EWMA
+  (~baseline_window запитів), що росте повільно і лише поза перевантаженням,
+  а падає одразу
+- короткий EWMA вищий, або upstream віддав 5xx  ->  limit *= backoff
+  (не частіше, ніж раз на max(поточна латентність, baseline), щоб один
+  сплеск — чи потік миттєвих помилок — не обвалив ліміт до мінімуму)
+
+Сигнал перевантаження ставить сам обробник у scope["state"], а не статус
+відповіді: 504 з вичерпаного клієнтського дедлайну чи 499 від клієнта, що
+пішов, — не провина upstream, і один клієнт не повинен так душити всю групу.
+- state[CONGESTED] = True — upstream відповів 502/503/504, недоступний або
+  не вклався в дефолтний таймаут роуту;
+- state[SKIP] = True — запит обірвав сам gateway (дедлайн, disconnect):
+  слот звільняється, але семпл латентності не враховується.
+
+Порівнюються згладжені середні, а не окремий семпл з мінімумом вікна:
+звичайний джитер (p99 у 2-3 рази вище медіани) не є перевантаженням, а
+черга в upstream піднімає короткий EWMA швидше, ніж довгий.
+
+Понад ліміт запити чекають у короткій FIFO-черзі обмеженого розміру; якщо
+черга повна або час очікування вийшов — одразу 503 + Retry-After. Роути, що
+не входять у жодну групу (health / meta / metrics), ліміт оминають.
+"""
+
+import asyncio
+import collections
+import json
+import math
+import time
+from typing import Dict, Optional
+
+from .metrics import REGISTRY
+
+
+LIMIT = REGISTRY.gauge("r4_concurrency_limit", "Current adaptive concurrency limit", ("group",))
+INFLIGHT = REGISTRY.gauge("r4_concurrency_inflight", "Requests holding a concurrency slot", ("group",))
+QUEUED = REGISTRY.gauge("r4_concurrency_queued", "Requests waiting for a concurrency slot", ("group",))
+SHED = REGISTRY.counter("r4_load_shed_total", "Requests rejected with 503", ("group", "reason"))
+
+# ключі scope["state"] (request.state.<key>), які читає ConcurrencyLimitMiddleware
+CONGESTED = "upstream_congested"
+SKIP = "limiter_skip"
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        group: str,
+        initial: int = 64,
+        min_limit: int = 4,
+        max_limit: int = 1024,
+        queue_size: int = 128,
+        queue_timeout: float = 0.1,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        baseline_window: int = 500,
+        short_window: int = 20,
+    ):
+        self.group = group
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.backoff = backoff
+
+        self.inflight = 0
+        self._waiters: collections.deque = collections.deque()
+
+        # short_ms — короткий EWMA; baseline — повільний EWMA від short_ms (~baseline_window
+        # запитів угору, одразу вниз)
+        self.baseline_ms: Optional[float] = None
+        self.short_ms: Optional[float] = None
+        self._long_alpha = 2.0 / (baseline_window + 1)
+        self._short_alpha = 2.0 / (short_window + 1)
+        self._last_decrease = 0.0
+        self._export()
+
+    def _export(self) -> None:
+        LIMIT.set(int(self.limit), group=self.group)
+        INFLIGHT.set(self.inflight, group=self.group)
+        QUEUED.set(len(self._waiters), group=self.group)
+
+    async def acquire(self) -> None:
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            INFLIGHT.set(self.inflight, group=self.group)
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            SHED.inc(group=self.group, reason="queue_full")
+            raise Overloaded("queue_full")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        QUEUED.set(len(self._waiters), group=self.group)
+        try:
+            # слот передається через fut у release(); inflight уже враховано там
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            SHED.inc(group=self.group, reason="queue_timeout")
+            raise Overloaded("queue_timeout")
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # слот уже був переданий, але нас скасували — повертаємо його
+                self._release_slot()
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+            QUEUED.set(len(self._waiters), group=self.group)
+
+    def _release_slot(self) -> None:
+        # віддаємо слот першому живому waiter-у, інакше звільняємо
+        while self._waiters and self.inflight <= int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.inflight -= 1
+
+    def release(self, latency_ms: Optional[float], congested: bool = False) -> None:
+        # latency_ms=None — семпл не враховується, лише звільняється слот
+        if latency_ms is not None:
+            self._update(latency_ms, congested)
+        self._release_slot()
+        self._export()
+
+    def _update(self, latency_ms: float, congested: bool) -> None:
+        if self.baseline_ms is None:
+            self.baseline_ms = self.short_ms = latency_ms
+        elif not congested:
+            # латентність помилки (миттєвий 502 чи таймаут) — не латентність
+            # обслуговування: EWMA рахуємо лише з успішних відповідей
+            self.short_ms += self._short_alpha * (latency_ms - self.short_ms)
+            slow = self.short_ms > self.baseline_ms * self.tolerance
+            if self.short_ms < self.baseline_ms:
+                # upstream відпустило — baseline одразу йде вниз за коротким EWMA
+                self.baseline_ms = self.short_ms
+            elif not slow or self.limit <= self.min_limit:
+                # під чергою baseline не підтягується за нею; на мінімумі різати
+                # вже нічого — нова латентність стає нормою
+                self.baseline_ms += self._long_alpha * (self.short_ms - self.baseline_ms)
+
+        if congested or self.short_ms > self.baseline_ms * self.tolerance:
+            now = time.monotonic()
+            if (now - self._last_decrease) * 1000.0 >= max(latency_ms, self.baseline_ms):
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif self.inflight >= self.limit / 2:
+            # ростемо лише коли ліміт реально використовується
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def retry_after(self) -> int:
+        # грубо: скільки триватиме черга з поточною латентністю, мінімум 1 с
+        est = (self.baseline_ms or 0.0) * self.tolerance * (len(self._waiters) + 1) / max(1.0, self.limit)
+        return max(1, math.ceil(est / 1000.0))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued": len(self._waiters),
+            "baseline_ms": self.baseline_ms,
+            "short_ms": self.short_ms,
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Pure-ASGI обгортка: path -> група -> AdaptiveLimiter.
+
+    Латентність міряється від отримання слота до http.response.start;
+    перевантаження й пропуск семпла — з scope["state"] (CONGESTED / SKIP).
+    """
+
+    def __init__(self, app, limiters: Dict[str, AdaptiveLimiter], routes: Dict[str, str]):
+        self.app = app
+        self.limiters = limiters
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        group = self.routes.get(scope["path"]) if scope["type"] == "http" else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[group]
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            await self._reject(send, group, e.reason, limiter.retry_after())
+            return
+
+        t0 = time.perf_counter()
+        latency_ms: Optional[float] = None
+
+        async def send_and_measure(message):
+            nonlocal latency_ms
+            if message["type"] == "http.response.start":
+                latency_ms = (time.perf_counter() - t0) * 1000.0
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            state = scope.get("state") or {}
+            if state.get(SKIP):
+                limiter.release(None)
+            else:
+                if latency_ms is None:
+                    latency_ms = (time.perf_counter() - t0) * 1000.0
+                limiter.release(latency_ms, congested=bool(state.get(CONGESTED)))
+
+    @staticmethod
+    async def _reject(send, group: str, reason: str, retry_after: int) -> None:
+        body = json.dumps({"detail": "overloaded", "group": group, "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
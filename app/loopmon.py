@@ -0,0 +1,140 @@
+"""
+Монітор затримок event loop і семплюючий профайлер.
+
+LoopMonitor:
+- task у loop спить interval і міряє, наскільки пізніше прокинувся —
+  це і є lag (гістограма r4_event_loop_lag_ms);
+- watchdog-потік стежить за «серцебиттям» цього task-а; якщо loop не
+  відповідає довше за slow_threshold, потік знімає стек потоку loop
+  (sys._current_frames) і логує його — видно саме той callback, що блокує
+  (recovery підпису, великий json.dumps тощо), а не лише факт затримки.
+  Один лог на одну зупинку.
+
+sample_stacks() — семплюючий профайлер без залежностей: N разів на секунду
+знімає стеки потрібних потоків і повертає collapsed stacks
+("frame;frame;frame count"), які напряму їдять flamegraph.pl / speedscope.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.loopmon")
+
+LOOP_LAG_MS = REGISTRY.histogram(
+    "r4_event_loop_lag_ms",
+    "Event loop scheduling lag in milliseconds",
+    buckets=(0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+STALLS = REGISTRY.counter("r4_event_loop_stalls_total", "Event loop stalls longer than the slow threshold")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.05, slow_threshold: float = 0.1, stack_depth: int = 20):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.stack_depth = stack_depth
+        self.loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._reported_beat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def _run(self) -> None:
+        interval = self.interval
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._beat = now
+            LOOP_LAG_MS.observe(max(0.0, now - t0 - interval) * 1000.0)
+
+    def _watch(self) -> None:
+        limit = self.interval + self.slow_threshold
+        while not self._stop.wait(self.slow_threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled < limit or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+            STALLS.inc()
+            frame = sys._current_frames().get(self.loop_thread_id)
+            # лише найглибші фрейми: корінь (uvicorn / click / runpy) завжди однаковий
+            stack = (
+                "".join(traceback.format_stack(frame, limit=self.stack_depth))
+                if frame is not None
+                else "<no frame>\n"
+            )
+            log.warning("event loop blocked for %.0f ms; loop thread stack:\n%s", stalled * 1000.0, stack)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="r4-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, hz: int = 100, thread_id: Optional[int] = None) -> str:
+    """
+    Семплювати стеки протягом seconds (блокує — викликати через asyncio.to_thread).
+    thread_id=None — усі потоки, крім самого семплера; перший фрейм — ім'я потоку.
+    """
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Dict[str, int] = collections.Counter()
+    period = 1.0 / hz
+    deadline = time.monotonic() + seconds
+    next_at = time.monotonic()
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        for tid, frame in sys._current_frames().items():
+            if tid == me or (thread_id is not None and tid != thread_id):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(tid) or f"thread-{tid}")
+            counts[";".join(reversed(stack))] += 1
+        next_at += period
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # не встигаємо — не намагаємось наздогнати пропущені семпли
+            next_at = time.monotonic()
+
+    return "".join(f"{stack} {n}\n" for stack, n in sorted(counts.items()))
@@ -1,22 +1,75 @@
+import asyncio
+import json
+import logging
 import os
-import binascii
+import threading
+import time
+from contextlib import asynccontextmanager
 from typing import Optional
 
+# перший імпорт застосунку — до fastapi / httpx, щоб звіт старту бачив їхню вартість
+from .startup import STARTUP
+
 from fastapi import (
     FastAPI,
-    Header,
     HTTPException,
     Depends,
     Request,
+    WebSocket,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, Response
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+from pydantic import ValidationError
 import httpx
 
-from eth_keys import keys
-from eth_account import Account
+STARTUP.mark("import_framework")
+
+from .apikeys import ApiKey, KeyRegistry
+from .bulkverify import VerifyPool, VerifyStreamResponse
+from .deadline import ClientDisconnected, Deadline, DeadlineExceeded, run_bounded
+from .deps import require_admin_key, require_api_key
+from .entropy import MAX_N as RANDOM_MAX_N, EntropyError, HttpEntropySource, load_source
+from .health import HealthProber
+from .idempotency import (
+    IdempotencyCache,
+    IdempotencyKeyReused,
+    SharedStore as IdempotencySharedStore,
+    valid_key as valid_idempotency_key,
+)
+from .journal import ProofJournal
+from .limiter import (
+    CONGESTED as LIMITER_CONGESTED,
+    SKIP as LIMITER_SKIP,
+    AdaptiveLimiter,
+    ConcurrencyLimitMiddleware,
+)
+from .loopmon import LoopMonitor, sample_stacks
+from .metrics import REGISTRY, merge_rendered
+from .middleware import ServiceHeadersMiddleware
+from .proofcodec import (
+    MEDIA_TYPES,
+    CodecError,
+    FormatUnavailable,
+    available_formats,
+    check_format,
+    encode_proof,
+)
+from .proofstore import ProofStore
+from .reservoir import EntropyReservoir
+from .shm import WorkerPublisher
+from .signers import UNTRUSTED, SignerRegistry, VERIFIED as SIGNER_VERIFIED
+from .sigverify import (
+    VerifyInputError,
+    VerifyRequest,
+    decode_hex_32,
+    verify_request,
+    warm as warm_crypto,
+)
+from .upstream import Upstream
+from .usage import UsageMeter, UsageMiddleware
+from .ws import WsError, WsSession
 
+STARTUP.mark("import_app")
 
 # -------------------------------------------------------------------
 # Config from environment
@@ -29,6 +82,10 @@ def _clean_env(name: str, default: str) -> str:
     return raw.strip()
 
 
+def _env_flag(name: str, default: str = "0") -> bool:
+    return _clean_env(name, default).lower() in ("1", "true", "yes", "on")
+
+
 # За замовчуванням — локалка; у проді все одно переїде в ENV з r4-prod
 CORE_URL = _clean_env("CORE_URL", "http://localhost:8080").rstrip("/")
 VRF_URL = _clean_env("VRF_URL", "http://localhost:8081").rstrip("/")
@@ -41,15 +98,291 @@ INTERNAL_R4_API_KEY = _clean_env("INTERNAL_R4_API_KEY", PUBLIC_API_KEY)
 GATEWAY_VERSION = _clean_env("GATEWAY_VERSION", "v0.1.7")
 LOG_LEVEL = _clean_env("LOG_LEVEL", "info")
 
+# логери підсистем (r4.*): формат як у uvicorn, рівень — LOG_LEVEL
+_log = logging.getLogger("r4")
+_log.setLevel(LOG_LEVEL.upper())
+if not _log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s: %(message)s"))
+    _log.addHandler(_handler)
+    _log.propagate = False
+
+# Server-Timing лише для цих ключів (через кому); "*" — для всіх, порожньо — ні для кого
+SERVER_TIMING_KEYS = {
+    k.strip() for k in _clean_env("SERVER_TIMING_KEYS", "").split(",") if k.strip()
+}
+
+# Адмін-ключ для /v1/admin/* (порожньо — лише ключі з "admin": true у реєстрі)
+ADMIN_API_KEY = _clean_env("ADMIN_API_KEY", "")
+
+# Реєстр клієнтських ключів (JSON або SQLite); PUBLIC_API_KEY додається завжди, якщо не порожній
+API_KEYS_PATH = _clean_env("API_KEYS_PATH", "")
+API_KEYS_RELOAD_INTERVAL_S = float(_clean_env("API_KEYS_RELOAD_INTERVAL_S", "5"))
+
+# Довірені підписанти VRF для /v1/verify без expected_signer (адреси через кому + JSON-файл)
+TRUSTED_SIGNERS = [a.strip() for a in _clean_env("TRUSTED_SIGNERS", "").split(",") if a.strip()]
+TRUSTED_SIGNERS_PATH = _clean_env("TRUSTED_SIGNERS_PATH", "")
+TRUSTED_SIGNERS_RELOAD_INTERVAL_S = float(_clean_env("TRUSTED_SIGNERS_RELOAD_INTERVAL_S", "5"))
+
+# Пул з'єднань до core/vrf
+UPSTREAM_MAX_CONNECTIONS = int(_clean_env("UPSTREAM_MAX_CONNECTIONS", "200"))
+UPSTREAM_MAX_KEEPALIVE = int(_clean_env("UPSTREAM_MAX_KEEPALIVE", "50"))
+
+# Клієнтські дедлайни: запас на відправку відповіді після upstream
+DEADLINE_MARGIN_S = float(_clean_env("DEADLINE_MARGIN_MS", "5")) / 1000.0
+
+# Адаптивні таймаути: p99 upstream * factor, в межах [min, дефолт роуту]
+ADAPTIVE_TIMEOUTS = _env_flag("ADAPTIVE_TIMEOUTS")
+ADAPTIVE_TIMEOUT_FACTOR = float(_clean_env("ADAPTIVE_TIMEOUT_FACTOR", "3"))
+ADAPTIVE_TIMEOUT_MIN_S = float(_clean_env("ADAPTIVE_TIMEOUT_MIN_MS", "250")) / 1000.0
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(_clean_env("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "200"))
+
+# Фоновий health-prober і прогрів пулу на старті
+HEALTH_PROBE_INTERVAL_S = float(_clean_env("HEALTH_PROBE_INTERVAL_S", "5"))
+HEALTH_PROBE_TIMEOUT_S = float(_clean_env("HEALTH_PROBE_TIMEOUT_S", "2"))
+CORE_HEALTH_PATH = _clean_env("CORE_HEALTH_PATH", "/health")
+VRF_HEALTH_PATH = _clean_env("VRF_HEALTH_PATH", "/health")
+UPSTREAM_WARM_CONNECTIONS = int(_clean_env("UPSTREAM_WARM_CONNECTIONS", "4"))
+
+# Журнал виданих VRF-доказів (порожній JOURNAL_DIR — вимкнено)
+JOURNAL_DIR = _clean_env("JOURNAL_DIR", "")
+JOURNAL_MAX_QUEUE = int(_clean_env("JOURNAL_MAX_QUEUE", "10000"))
+JOURNAL_BATCH_SIZE = int(_clean_env("JOURNAL_BATCH_SIZE", "256"))
+JOURNAL_FLUSH_INTERVAL_S = float(_clean_env("JOURNAL_FLUSH_INTERVAL_MS", "200")) / 1000.0
+JOURNAL_ROTATE_BYTES = int(float(_clean_env("JOURNAL_ROTATE_MB", "64")) * 1024 * 1024)
+JOURNAL_ROTATE_SECONDS = float(_clean_env("JOURNAL_ROTATE_SECONDS", "3600"))
+JOURNAL_COMPRESS = _env_flag("JOURNAL_COMPRESS")
+JOURNAL_FSYNC = _env_flag("JOURNAL_FSYNC", "1")
+JOURNAL_OVERFLOW = _clean_env("JOURNAL_OVERFLOW", "drop_newest")
+
+# Локальне сховище доказів для GET /v1/proofs (порожній PROOF_STORE_PATH — вимкнено)
+PROOF_STORE_PATH = _clean_env("PROOF_STORE_PATH", "")
+PROOF_STORE_RETENTION_S = float(_clean_env("PROOF_STORE_RETENTION_DAYS", "30")) * 86400
+PROOF_STORE_COMPACT_INTERVAL_S = float(_clean_env("PROOF_STORE_COMPACT_INTERVAL_S", "600"))
+PROOF_STORE_RANGE_LIMIT = int(_clean_env("PROOF_STORE_RANGE_LIMIT", "1000"))
+
+# Потокова масова перевірка (/v1/verify_stream); 0 воркерів = за кількістю ядер
+VERIFY_STREAM_WORKERS = int(_clean_env("VERIFY_STREAM_WORKERS", "0"))
+VERIFY_STREAM_CHUNK_LINES = int(_clean_env("VERIFY_STREAM_CHUNK_LINES", "256"))
+VERIFY_STREAM_WINDOW = int(_clean_env("VERIFY_STREAM_WINDOW", "0"))
+VERIFY_STREAM_MAX_LINE_BYTES = int(_clean_env("VERIFY_STREAM_MAX_LINE_BYTES", "16384"))
+
+# Облік використання: sink — *.db (SQLite) або JSONL; порожньо — лише в пам'яті
+USAGE_SINK = _clean_env("USAGE_SINK", "")
+USAGE_FLUSH_INTERVAL_S = float(_clean_env("USAGE_FLUSH_INTERVAL_S", "10"))
+USAGE_BUCKET_S = int(_clean_env("USAGE_BUCKET_S", "3600"))
+
+# /v1/ws: скільки запитів одного з'єднання може бути в роботі одночасно
+WS_MAX_INFLIGHT = int(_clean_env("WS_MAX_INFLIGHT", "32"))
+
+# Монітор event loop: період семплу lag і поріг, після якого логуємо стек
+LOOP_MONITOR_ENABLED = _env_flag("LOOP_MONITOR_ENABLED", "1")
+LOOP_LAG_INTERVAL_S = float(_clean_env("LOOP_LAG_INTERVAL_MS", "50")) / 1000.0
+LOOP_SLOW_THRESHOLD_S = float(_clean_env("LOOP_SLOW_THRESHOLD_MS", "100")) / 1000.0
+ADMIN_PROFILE_MAX_S = float(_clean_env("ADMIN_PROFILE_MAX_S", "60"))
+
+# Імпорт eth_keys / eth_utils у фоні після старту (інакше — на першому /v1/verify)
+CRYPTO_WARMUP = _env_flag("CRYPTO_WARMUP", "1")
+
+# Idempotency-Key на /v1/vrf, /v1/random_dual, /v1/random_dual_full: скільки
+# тримати завершені відповіді й межі пам'яті L1-кешу (на воркер). Спільний
+# між воркерами шар — SQLite у IDEMPOTENCY_PATH; під app.serve з кількома
+# воркерами без нього master підставляє тимчасовий файл (R4_IDEMPOTENCY_PATH)
+IDEMPOTENCY_PATH = _clean_env("IDEMPOTENCY_PATH", "") or os.getenv("R4_IDEMPOTENCY_PATH", "")
+IDEMPOTENCY_TTL_S = float(_clean_env("IDEMPOTENCY_TTL_S", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(_clean_env("IDEMPOTENCY_MAX_ENTRIES", "100000"))
+IDEMPOTENCY_MAX_BYTES = int(float(_clean_env("IDEMPOTENCY_MAX_MB", "64")) * 1024 * 1024)
+IDEMPOTENCY_MAX_ENTRY_BYTES = int(float(_clean_env("IDEMPOTENCY_MAX_ENTRY_KB", "64")) * 1024)
+
+# Джерело ентропії для /v1/random: http (core за CORE_URL) | drbg (in-process
+# HMAC-DRBG) | module:pkg.mod:func | lib:/path/lib.so:symbol — див. app/entropy.py
+ENTROPY_SOURCE = _clean_env("ENTROPY_SOURCE", "http")
+
+# Резервуар ентропії для /v1/random (KB на воркер, 0 = вимкнено): core
+# наповнює його порціями по ENTROPY_RESERVOIR_CHUNK байтів, коли заповненість
+# падає нижче LOW_WATERMARK; запити з n понад MAX_N ідуть у core напряму
+ENTROPY_RESERVOIR_KB = float(_clean_env("ENTROPY_RESERVOIR_KB", "0"))
+ENTROPY_RESERVOIR_CHUNK = int(_clean_env("ENTROPY_RESERVOIR_CHUNK", "4096"))
+ENTROPY_RESERVOIR_LOW_WATERMARK = float(_clean_env("ENTROPY_RESERVOIR_LOW_WATERMARK", "0.5"))
+ENTROPY_RESERVOIR_MAX_N = int(_clean_env("ENTROPY_RESERVOIR_MAX_N", "4096"))
+
+# Під app.serve: як часто воркер публікує знімок метрик / usage у спільну пам'ять
+CLUSTER_PUBLISH_INTERVAL_S = float(_clean_env("CLUSTER_PUBLISH_INTERVAL_S", "1"))
+
+# Адаптивний ліміт паралельних запитів на групу роутів (503 + Retry-After понад нього)
+CONCURRENCY_LIMIT_ENABLED = _env_flag("CONCURRENCY_LIMIT_ENABLED", "1")
+CONCURRENCY_LIMIT_INITIAL = int(_clean_env("CONCURRENCY_LIMIT_INITIAL", "64"))
+CONCURRENCY_LIMIT_MIN = int(_clean_env("CONCURRENCY_LIMIT_MIN", "4"))
+CONCURRENCY_LIMIT_MAX = int(_clean_env("CONCURRENCY_LIMIT_MAX", "1024"))
+CONCURRENCY_QUEUE_SIZE = int(_clean_env("CONCURRENCY_QUEUE_SIZE", "128"))
+CONCURRENCY_QUEUE_TIMEOUT_S = float(_clean_env("CONCURRENCY_QUEUE_TIMEOUT_MS", "100")) / 1000.0
+CONCURRENCY_LATENCY_TOLERANCE = float(_clean_env("CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+
 
 # -------------------------------------------------------------------
 # FastAPI app + CORS
 # -------------------------------------------------------------------
 
+upstream = Upstream(
+    max_connections=UPSTREAM_MAX_CONNECTIONS,
+    max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+)
+
+http_entropy = HttpEntropySource(upstream, f"{CORE_URL}/random", INTERNAL_R4_API_KEY)
+entropy_source = load_source(ENTROPY_SOURCE, http_entropy)
+
+prober = HealthProber(
+    upstream,
+    targets={
+        "core": CORE_URL + CORE_HEALTH_PATH,
+        "vrf": VRF_URL + VRF_HEALTH_PATH,
+    },
+    interval=HEALTH_PROBE_INTERVAL_S,
+    timeout=HEALTH_PROBE_TIMEOUT_S,
+    headers={"X-API-Key": INTERNAL_R4_API_KEY},
+)
+
+journal = (
+    ProofJournal(
+        JOURNAL_DIR,
+        rotate_bytes=JOURNAL_ROTATE_BYTES,
+        rotate_seconds=JOURNAL_ROTATE_SECONDS,
+        compress=JOURNAL_COMPRESS,
+        fsync=JOURNAL_FSYNC,
+        max_queue=JOURNAL_MAX_QUEUE,
+        batch_size=JOURNAL_BATCH_SIZE,
+        flush_interval=JOURNAL_FLUSH_INTERVAL_S,
+        overflow=JOURNAL_OVERFLOW,
+    )
+    if JOURNAL_DIR
+    else None
+)
+
+proof_store = (
+    ProofStore(
+        PROOF_STORE_PATH,
+        retention_seconds=PROOF_STORE_RETENTION_S,
+        compact_interval=PROOF_STORE_COMPACT_INTERVAL_S,
+        max_queue=JOURNAL_MAX_QUEUE,
+        batch_size=JOURNAL_BATCH_SIZE,
+        flush_interval=JOURNAL_FLUSH_INTERVAL_S,
+        overflow=JOURNAL_OVERFLOW,
+    )
+    if PROOF_STORE_PATH
+    else None
+)
+
+verify_pool = VerifyPool(VERIFY_STREAM_WORKERS)
+
+idempotency = IdempotencyCache(
+    ttl=IDEMPOTENCY_TTL_S,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+    max_bytes=IDEMPOTENCY_MAX_BYTES,
+    max_entry_bytes=IDEMPOTENCY_MAX_ENTRY_BYTES,
+    shared=IdempotencySharedStore(IDEMPOTENCY_PATH) if IDEMPOTENCY_PATH else None,
+)
+
+usage_meter = UsageMeter(USAGE_SINK, interval=USAGE_FLUSH_INTERVAL_S, bucket_seconds=USAGE_BUCKET_S)
+
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL_S, LOOP_SLOW_THRESHOLD_S)
+profile_lock = asyncio.Lock()
+
+key_registry = KeyRegistry(
+    API_KEYS_PATH,
+    static_keys=[PUBLIC_API_KEY],
+    admin_keys=[ADMIN_API_KEY],
+    server_timing_keys=SERVER_TIMING_KEYS,
+    reload_interval=API_KEYS_RELOAD_INTERVAL_S,
+)
+
+signer_registry = SignerRegistry(
+    TRUSTED_SIGNERS_PATH,
+    static=TRUSTED_SIGNERS,
+    reload_interval=TRUSTED_SIGNERS_RELOAD_INTERVAL_S,
+)
+
+STARTUP.mark("init")
+
+background_tasks = set()
+
+# спільна пам'ять між воркерами app.serve; None під звичайним `uvicorn app.main:app`
+cluster: Optional[WorkerPublisher] = None
+reservoir: Optional[EntropyReservoir] = None
+
+
+def _cluster_snapshot() -> dict:
+    return {"metrics": REGISTRY.render(), "usage": usage_meter.export()}
+
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global cluster, reservoir
+    # від кінця імпорту app.main до lifespan — налаштування сервера
+    STARTUP.mark("server_setup")
+    with STARTUP.phase("upstream_warm"):
+        upstream.open()
+        # з'єднання відкриваються до першого клієнта, а не на ньому
+        await prober.warm(UPSTREAM_WARM_CONNECTIONS)
+    with STARTUP.phase("lifespan"):
+        if LOOP_MONITOR_ENABLED:
+            loop_monitor.start()
+        prober.start()
+        if journal is not None:
+            await journal.start()
+        if proof_store is not None:
+            await proof_store.start()
+        key_registry.start()
+        signer_registry.start()
+        usage_meter.start()
+        # після fork: індекс воркера відомий лише тут, не під час preload в майстрі
+        cluster = WorkerPublisher.from_env(_cluster_snapshot, interval=CLUSTER_PUBLISH_INTERVAL_S)
+        if cluster is not None:
+            cluster.start()
+        # резервуар економить HTTP-хоп до core; in-process джерелу він не потрібен
+        if ENTROPY_RESERVOIR_KB > 0 and not entropy_source.in_process:
+            reservoir = EntropyReservoir.from_env(
+                EntropyReservoir.capacity_from_kb(ENTROPY_RESERVOIR_KB),
+                chunk=ENTROPY_RESERVOIR_CHUNK,
+                low_watermark=ENTROPY_RESERVOIR_LOW_WATERMARK,
+            )
+            reservoir.start(http_entropy.read)
+    STARTUP.finish()
+    if CRYPTO_WARMUP:
+        # не чекаємо: порт відкривається одразу, крипто догружається паралельно
+        task = asyncio.create_task(asyncio.to_thread(warm_crypto))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+    yield
+    await key_registry.stop()
+    await signer_registry.stop()
+    await usage_meter.stop()
+    await prober.stop()
+    if journal is not None:
+        await journal.stop()
+    if proof_store is not None:
+        await proof_store.stop()
+    if idempotency.shared is not None:
+        idempotency.shared.close()
+    verify_pool.shutdown()
+    await upstream.aclose()
+    await loop_monitor.stop()
+    if cluster is not None:
+        await cluster.stop()
+        cluster = None
+    if reservoir is not None:
+        await reservoir.stop()
+        reservoir = None
+
+
 app = FastAPI(
     title="RE4CTOR SaaS API Gateway",
     version=GATEWAY_VERSION,
+    lifespan=lifespan,
 )
+# app.deps.require_api_key читає реєстр звідси
+app.state.key_registry = key_registry
 
 CORS_ORIGINS = [
     "https://re4ctor.com",
@@ -61,103 +394,60 @@ CORS_ORIGINS = [
     "http://127.0.0.1:8082",
 ]
 
+# -------------------------------------------------------------------
+# Load shedding (всередині CORS, щоб 503 теж мали CORS-заголовки).
+# Health / meta / metrics у жодну групу не входять — пріоритетна смуга.
+# -------------------------------------------------------------------
+
+LIMITED_ROUTES = {
+    "/v1/random": "random",
+    "/v1/vrf": "vrf",
+    "/v1/random_dual": "vrf",
+    "/v1/random_dual_full": "vrf",
+    "/v1/verify": "verify",
+}
+
+limiters = {
+    group: AdaptiveLimiter(
+        group,
+        initial=CONCURRENCY_LIMIT_INITIAL,
+        min_limit=CONCURRENCY_LIMIT_MIN,
+        max_limit=CONCURRENCY_LIMIT_MAX,
+        queue_size=CONCURRENCY_QUEUE_SIZE,
+        queue_timeout=CONCURRENCY_QUEUE_TIMEOUT_S,
+        tolerance=CONCURRENCY_LATENCY_TOLERANCE,
+    )
+    for group in sorted(set(LIMITED_ROUTES.values()))
+}
+
+# облік — найглибше: бачить request.state.api_key і шаблон роуту
+app.add_middleware(UsageMiddleware, meter=usage_meter)
+
+if CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware, limiters=limiters, routes=LIMITED_ROUTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-R4-Response-Time-Ms", "Server-Timing", "Retry-After", "Idempotent-Replayed"],
 )
 
 
 # -------------------------------------------------------------------
-# Middleware: service headers
+# Middleware: service headers (pure ASGI, поверх CORS)
 # -------------------------------------------------------------------
 
-@app.middleware("http")
-async def add_svc_headers(request: Request, call_next):
-    resp = await call_next(request)
-    resp.headers["X-R4-Gateway-Version"] = GATEWAY_VERSION
-    resp.headers["X-R4-Core-URL"] = CORE_URL
-    resp.headers["X-R4-VRF-URL"] = VRF_URL
-    return resp
-
-
-# -------------------------------------------------------------------
-# Simple API-key auth
-# -------------------------------------------------------------------
-
-async def require_api_key(
-    request: Request,
-    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
-):
-    """
-    Проста dev-авторизація:
-    - API key може прийти або з заголовка X-API-Key,
-    - або як query параметр ?api_key=...
-    """
-    query_key = request.query_params.get("api_key")
-    api_key = x_api_key or query_key
-
-    if api_key != PUBLIC_API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-
-    return api_key
-
-
-# -------------------------------------------------------------------
-# Models
-# -------------------------------------------------------------------
-
-class VerifyRequest(BaseModel):
-    msg_hash: str
-    r: str
-    s: str
-    v: int
-    expected_signer: str
-
-
-# -------------------------------------------------------------------
-# Helpers
-# -------------------------------------------------------------------
-
-HEX_CHARS = set("0123456789abcdef")
-
-
-def _clean_hex_64(s: str, field: str) -> str:
-    if s is None:
-        raise HTTPException(status_code=400, detail=f"{field} is required")
-
-    raw = s.strip().lower()
-    if raw.startswith("0x"):
-        raw = raw[2:]
-
-    if len(raw) != 64 or any(c not in HEX_CHARS for c in raw):
-        raise HTTPException(
-            status_code=400,
-            detail="msg_hash/r/s must be 64-hex (no 0x)",
-        )
-    return raw
-
-
-def _normalize_v(v: int) -> int:
-    if v in (27, 28):
-        return v - 27
-    if v in (0, 1):
-        return v
-    raise HTTPException(
-        status_code=400,
-        detail="v must be 0/1 or 27/28",
-    )
-
-
-def _normalize_address(addr: str) -> str:
-    if not addr:
-        return ""
-    a = addr.strip()
-    if not a.startswith("0x"):
-        a = "0x" + a
-    return a.lower()
+app.add_middleware(
+    ServiceHeadersMiddleware,
+    headers={
+        "X-R4-Gateway-Version": GATEWAY_VERSION,
+        "X-R4-Core-URL": CORE_URL,
+        "X-R4-VRF-URL": VRF_URL,
+    },
+)
 
 
 # -------------------------------------------------------------------
@@ -926,14 +1216,37 @@ curl -s -H "X-API-Key: demo" \\
 # Routes
 # -------------------------------------------------------------------
 
+HOMEPAGE_BYTES = HOMEPAGE_HTML.encode()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def landing_page():
-    return HTMLResponse(content=HOMEPAGE_HTML)
+    return HTMLResponse(content=HOMEPAGE_BYTES)
 
 
 @app.get("/v1/health")
-async def health():
-    return {"ok": True}
+async def health(deep: bool = False):
+    """
+    Liveness. З ?deep=1 — ще й стан core/VRF з кешу фонового prober-а
+    (503, якщо якийсь upstream недоступний).
+    """
+    if not deep:
+        return {"ok": True}
+    return Response(
+        content=prober.deep_body(),
+        status_code=200 if prober.is_ready() else 503,
+        media_type="application/json",
+    )
+
+
+@app.get("/v1/ready")
+async def ready():
+    """Readiness для балансувальника: 200 лише коли core і VRF відповідають."""
+    return Response(
+        content=prober.deep_body(),
+        status_code=200 if prober.is_ready() else 503,
+        media_type="application/json",
+    )
 
 
 @app.get("/v1/meta")
@@ -942,9 +1255,28 @@ async def meta():
         "gateway_version": GATEWAY_VERSION,
         "core_url": CORE_URL,
         "vrf_url": VRF_URL,
+        "proof_formats": available_formats(),
+        "entropy_source": entropy_source.name,
+        "trusted_signers": signer_registry.public(),
+        # для клієнтів (r4client): куди можна зливати дрібні паралельні виклики
+        "batch": {"random_max_n": RANDOM_MAX_N, "verify_stream": True},
+        "startup_ms": STARTUP.as_dict(),
     }
 
 
+@app.get("/v1/metrics", response_class=PlainTextResponse)
+async def metrics(local: bool = False):
+    """
+    Під app.serve — метрики всіх воркерів з лейблом worker (local=1 —
+    лише воркер, що відповідає); інакше — метрики процесу.
+    """
+    text = REGISTRY.render()
+    if cluster is not None and not local:
+        parts = [(cluster.index, text)] + [(s["worker"], s["metrics"]) for s in cluster.collect()]
+        text = merge_rendered(sorted(parts))
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/v1/env_debug")
 async def env_debug():
     return {
@@ -956,80 +1288,215 @@ async def env_debug():
     }
 
 
+DEADLINE_OUTCOMES = REGISTRY.counter(
+    "r4_deadline_outcomes_total",
+    "Proxied requests cut short by a client deadline or disconnect",
+    ("upstream", "outcome"),
+)
+
+
+def _upstream_timeout(name: str, url: str, default: float) -> float:
+    if not ADAPTIVE_TIMEOUTS:
+        return default
+    p99_ms = upstream.latency_quantile(name, url, 0.99, ADAPTIVE_TIMEOUT_MIN_SAMPLES)
+    if p99_ms is None:
+        return default
+    return min(default, max(ADAPTIVE_TIMEOUT_MIN_S, p99_ms / 1000.0 * ADAPTIVE_TIMEOUT_FACTOR))
+
+
+def _record_proof(route: str, request_id: str, sig: str, body: bytes, tenant: str) -> None:
+    if journal is not None:
+        journal.record(route, request_id, sig, body)
+    if proof_store is not None:
+        proof_store.record(route, sig, body, tenant)
+
+
+async def _proxy(
+    request: Request,
+    name: str,
+    url: str,
+    params: dict,
+    timeout: float,
+    default_media_type: str,
+    record_proof: bool = False,
+    proof_fmt: str = "json",
+    idempotent: bool = False,
+) -> Response:
+    idem_key = request.headers.get("idempotency-key") if idempotent else None
+    if idem_key is not None and not valid_idempotency_key(idem_key):
+        raise HTTPException(status_code=400, detail="invalid_idempotency_key")
+
+    headers = {"X-API-Key": INTERNAL_R4_API_KEY}
+    timeout = shared_timeout = _upstream_timeout(name, url, timeout)
+
+    # таймаут за клієнтським бюджетом — не ознака перевантаження upstream
+    client_bound = False
+    deadline = Deadline.from_headers(request.headers)
+    if deadline is not None:
+        # upstream має закінчити трохи раніше, ніж клієнт перестане чекати
+        deadline = Deadline(deadline.at - DEADLINE_MARGIN_S)
+        budget = deadline.remaining()
+        if budget <= 0:
+            DEADLINE_OUTCOMES.inc(upstream=name, outcome="expired_on_arrival")
+            setattr(request.state, LIMITER_SKIP, True)
+            raise HTTPException(status_code=504, detail="deadline_exceeded")
+        if budget > timeout:
+            # далі дефолтного таймауту роуту ніхто чекати не буде — і upstream теж
+            deadline = Deadline(time.monotonic() + timeout)
+        else:
+            timeout = budget
+            client_bound = True
+        headers.update(deadline.upstream_headers())
+
+    timer = getattr(request.state, "timer", None)
+    replayed = False
+    if idem_key is None:
+        work = upstream.get(name, url, params=params, headers=headers, timeout=timeout, timer=timer)
+    else:
+        # спільний виклик переживає дедлайн / disconnect ініціатора — результат
+        # дістанеться повтору, тож без дедлайн-заголовків і з повним таймаутом
+        try:
+            work, outcome = idempotency.begin(
+                (request.state.api_key.tenant, request.url.path, idem_key),
+                tuple(sorted(params.items())),
+                lambda: upstream.get(
+                    name, url, params=params, headers={"X-API-Key": INTERNAL_R4_API_KEY},
+                    timeout=shared_timeout, timer=timer,
+                ),
+            )
+        except IdempotencyKeyReused:
+            raise HTTPException(status_code=422, detail="idempotency_key_reused")
+        replayed = outcome != "miss"
+    try:
+        r = await run_bounded(request.receive, work, timeout)
+    except DeadlineExceeded:
+        DEADLINE_OUTCOMES.inc(upstream=name, outcome="timeout")
+        setattr(request.state, LIMITER_SKIP if client_bound else LIMITER_CONGESTED, True)
+        raise HTTPException(status_code=504, detail=f"{name}_timeout")
+    except ClientDisconnected:
+        # відповідати вже нікому; 499 лише для логів / метрик
+        DEADLINE_OUTCOMES.inc(upstream=name, outcome="client_disconnected")
+        setattr(request.state, LIMITER_SKIP, True)
+        return Response(status_code=499)
+    except IdempotencyKeyReused:
+        # ключ з іншими параметрами в іншому воркері видно лише зі спільного шару
+        raise HTTPException(status_code=422, detail="idempotency_key_reused")
+    except httpx.TimeoutException as e:
+        setattr(request.state, LIMITER_SKIP if client_bound else LIMITER_CONGESTED, True)
+        raise HTTPException(status_code=504, detail=f"{name}_timeout: {e!s}")
+    except httpx.HTTPError as e:
+        setattr(request.state, LIMITER_CONGESTED, True)
+        raise HTTPException(status_code=502, detail=f"{name}_unreachable: {e!s}")
+    if r.status_code in (502, 503, 504):
+        setattr(request.state, LIMITER_CONGESTED, True)
+    # доказ, виданий через інший воркер, той уже записав у журнал / сховище
+    replayed = replayed or getattr(r, "replayed", False)
+
+    if record_proof and r.status_code == 200 and not replayed:
+        _record_proof(
+            request.url.path, getattr(request.state, "request_id", ""), params.get("sig", ""), r.content,
+            request.state.api_key.tenant,
+        )
+
+    content = r.content
+    media_type = r.headers.get("content-type", default_media_type)
+    if proof_fmt != "json" and r.status_code == 200:
+        try:
+            content = encode_proof(content, proof_fmt)
+        except CodecError as e:
+            raise HTTPException(status_code=502, detail=f"{name}_bad_proof: {e}")
+        media_type = MEDIA_TYPES[proof_fmt]
+
+    response = Response(content=content, status_code=r.status_code, media_type=media_type)
+    if idem_key is not None:
+        response.headers["Idempotent-Replayed"] = "true" if replayed else "false"
+    return response
+
+
+def _check_proof_fmt(fmt: str) -> None:
+    # до запиту в upstream: не витрачаємо доказ, який не зможемо віддати
+    try:
+        check_format(fmt)
+    except FormatUnavailable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _random_in_process(n: int) -> bytes:
+    # контракт core /random: n ∈ 1..4096
+    if not 0 < n <= RANDOM_MAX_N:
+        raise ValueError(f"n must be between 1 and {RANDOM_MAX_N}")
+    return entropy_source.random_bytes(n)
+
+
 @app.get("/v1/random")
 async def random_proxy(
+    request: Request,
     n: int,
     fmt: str = "hex",
-    api_key: str = Depends(require_api_key),
+    api_key: ApiKey = Depends(require_api_key),
 ):
-    upstream = f"{CORE_URL}/random"
-    params = {"n": n, "fmt": fmt}
-    headers = {"X-API-Key": INTERNAL_R4_API_KEY}
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(upstream, params=params, headers=headers)
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"core_unreachable: {e!s}")
-
-    return Response(
-        content=r.content,
-        status_code=r.status_code,
-        media_type=r.headers.get("content-type", "text/plain"),
+    request.state.entropy_bytes = n
+    if entropy_source.in_process:
+        try:
+            raw = _random_in_process(n)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except EntropyError as e:
+            raise HTTPException(status_code=503, detail=f"entropy_unavailable: {e}")
+        if fmt.lower() == "hex":
+            return PlainTextResponse(raw.hex())
+        return {"hex": raw.hex(), "n": n, "source": entropy_source.name}
+    if reservoir is not None and fmt == "hex" and 0 < n <= ENTROPY_RESERVOIR_MAX_N:
+        out = reservoir.take_hex(n)
+        if out is not None:
+            return PlainTextResponse(out)
+    return await _proxy(
+        request, "core", f"{CORE_URL}/random", {"n": n, "fmt": fmt}, 10.0, "text/plain"
     )
 
 
 @app.get("/v1/vrf")
 async def vrf_proxy(
+    request: Request,
     sig: str,
-    api_key: str = Depends(require_api_key),
+    fmt: str = "json",
+    api_key: ApiKey = Depends(require_api_key),
 ):
-    upstream = f"{VRF_URL}/random_dual"
-    params = {"sig": sig}
-    headers = {"X-API-Key": INTERNAL_R4_API_KEY}
-
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            r = await client.get(upstream, params=params, headers=headers)
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"vrf_unreachable: {e!s}")
-
-    return Response(
-        content=r.content,
-        status_code=r.status_code,
-        media_type=r.headers.get("content-type", "application/json"),
+    """
+    fmt: json (як є від VRF ноди) | abi | msgpack | cbor — див. app/proofcodec.py.
+    """
+    _check_proof_fmt(fmt)
+    return await _proxy(
+        request, "vrf", f"{VRF_URL}/random_dual", {"sig": sig}, 15.0, "application/json",
+        record_proof=True, proof_fmt=fmt, idempotent=True,
     )
 
 
 @app.get("/v1/random_dual")
 async def random_dual_proxy(
+    request: Request,
     sig: str,
-    api_key: str = Depends(require_api_key),
+    fmt: str = "json",
+    api_key: ApiKey = Depends(require_api_key),
 ):
     """
     Alias до того ж бекенду, що й /v1/vrf – короткий шлях для dual-sig VRF.
     """
-    upstream = f"{VRF_URL}/random_dual"
-    params = {"sig": sig}
-    headers = {"X-API-Key": INTERNAL_R4_API_KEY}
-
-    try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            r = await client.get(upstream, params=params, headers=headers)
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"vrf_unreachable: {e!s}")
-
-    return Response(
-        content=r.content,
-        status_code=r.status_code,
-        media_type=r.headers.get("content-type", "application/json"),
+    _check_proof_fmt(fmt)
+    return await _proxy(
+        request, "vrf", f"{VRF_URL}/random_dual", {"sig": sig}, 15.0, "application/json",
+        record_proof=True, proof_fmt=fmt, idempotent=True,
     )
 
 
 @app.get("/v1/random_dual_full")
 async def random_dual_full_proxy(
+    request: Request,
     sig: str,
-    api_key: str = Depends(require_api_key),
+    fmt: str = "json",
+    api_key: ApiKey = Depends(require_api_key),
 ):
     """
     Повний dual-sig об'єкт із VRF ноди:
@@ -1038,21 +1505,111 @@ async def random_dual_full_proxy(
     - ECDSA (v,r,s)
     - ML-DSA-65 sig (base64)
     - PQ public key
+
+    fmt: json | abi | msgpack | cbor (abi — лише ECDSA-частина).
     """
-    upstream = f"{VRF_URL}/random_dual_full"
-    params = {"sig": sig}
-    headers = {"X-API-Key": INTERNAL_R4_API_KEY}
+    _check_proof_fmt(fmt)
+    return await _proxy(
+        request, "vrf", f"{VRF_URL}/random_dual_full", {"sig": sig}, 20.0, "application/json",
+        record_proof=True, proof_fmt=fmt, idempotent=True,
+    )
+
+
+@app.get("/v1/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(
+    seconds: float = 10.0,
+    hz: int = 100,
+    all_threads: bool = False,
+    api_key: ApiKey = Depends(require_admin_key),
+):
+    """
+    Семплюючий профайлер на живому процесі: collapsed stacks для flamegraph.pl /
+    speedscope. За замовчуванням — лише потік event loop.
+    """
+    if not 0 < seconds <= ADMIN_PROFILE_MAX_S:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {ADMIN_PROFILE_MAX_S:g}]")
+    if not 1 <= hz <= 1000:
+        raise HTTPException(status_code=400, detail="hz must be in [1, 1000]")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="profile_in_progress")
+
+    thread_id = None if all_threads else threading.get_ident()
+    async with profile_lock:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, hz, thread_id)
+    return PlainTextResponse(stacks, headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
 
-    try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            r = await client.get(upstream, params=params, headers=headers)
-    except httpx.HTTPError as e:
-        raise HTTPException(status_code=502, detail=f"vrf_unreachable: {e!s}")
 
+@app.get("/v1/usage")
+async def usage(api_key: ApiKey = Depends(require_api_key)):
+    """
+    Використання тенанта ключа з моменту старту процесу: по ключах і роутах
+    (під app.serve — сума всіх воркерів). Довгострокові дані для білінгу — у USAGE_SINK.
+    """
+    peers = [s["usage"] for s in cluster.collect()] if cluster is not None else ()
+    return {"plan": api_key.plan, **usage_meter.usage(api_key.tenant, peers)}
+
+
+def _require_proof_store() -> ProofStore:
+    if proof_store is None or not proof_store.ready:
+        raise HTTPException(status_code=404, detail="proof_store_disabled")
+    return proof_store
+
+
+@app.get("/v1/proofs/{msg_hash}")
+async def get_proof(
+    msg_hash: str,
+    api_key: ApiKey = Depends(require_api_key),
+):
+    """
+    Повторно віддати вже виданий доказ за msg_hash (64 hex, з 0x або без).
+    Тіло — рівно те, що повернула VRF нода. Лише докази tenant-а цього ключа.
+    """
+    store = _require_proof_store()
+    try:
+        key = decode_hex_32(msg_hash, "msg_hash")
+    except VerifyInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = store.get(key, api_key.tenant)
+    if body is None:
+        raise HTTPException(status_code=404, detail="proof_not_found")
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/v1/proofs")
+async def list_proofs(
+    since: int,
+    until: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    api_key: ApiKey = Depends(require_api_key),
+):
+    """
+    Range scan за часом видачі (Unix ms, [since, until)) для звірок — лише
+    докази tenant-а цього ключа. Далі гортати з тими ж since/until і
+    cursor=next_cursor ("<ts>:<msg_hash hex>").
+    """
+    store = _require_proof_store()
+    limit = max(1, min(limit, PROOF_STORE_RANGE_LIMIT))
+    until = until if until is not None else int(time.time() * 1000) + 1
+    after = (since, b"")
+    if cursor:
+        try:
+            ts, h = cursor.split(":", 1)
+            after = max(after, (int(ts), bytes.fromhex(h)))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+    rows = await store.range(api_key.tenant, after, until, limit)
+
+    # тіла доказів уже JSON — склеюємо без повторного парсингу
+    items = b",".join(
+        b'{"ts":%d,"route":%s,"proof":%s}' % (ts, json.dumps(route).encode(), body)
+        for ts, _, route, body in rows
+    )
+    next_cursor = "%d:%s" % (rows[-1][0], rows[-1][1].hex()) if len(rows) == limit else None
     return Response(
-        content=r.content,
-        status_code=r.status_code,
-        media_type=r.headers.get("content-type", "application/json"),
+        content=b'{"proofs":[' + items + b'],"next_cursor":' + json.dumps(next_cursor).encode() + b"}",
+        media_type="application/json",
     )
 
 
@@ -1061,48 +1618,119 @@ async def verify_signature(req: VerifyRequest):
     """
     Перевірка ECDSA підпису (secp256k1) по вже готовому msg_hash (32 байти).
     msg_hash, r, s – у hex (з 0x або без), v – 0/1 або 27/28.
-    expected_signer – очікувана адреса "0x..." (чутлива до checksum / ні – не важливо).
+    expected_signer – очікувана адреса "0x..." (чутлива до checksum / ні – не важливо);
+    без неї match = підписав довірений підписант (TRUSTED_SIGNERS), signer — його ім'я.
     """
-    msg_hex = _clean_hex_64(req.msg_hash, "msg_hash")
-    r_hex = _clean_hex_64(req.r, "r")
-    s_hex = _clean_hex_64(req.s, "s")
-    v_norm = _normalize_v(req.v)
-
     try:
-        msg_bytes = binascii.unhexlify(msg_hex)
-    except binascii.Error as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"invalid msg_hash hex: {e}",
-        )
+        res = verify_request(req, signer_registry.index)
+    except VerifyInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    SIGNER_VERIFIED.inc(signer=res["signer"] or UNTRUSTED)
+    return res
 
-    r_int = int(r_hex, 16)
-    s_int = int(s_hex, 16)
 
-    try:
-        sig = keys.Signature(vrs=(v_norm, r_int, s_int))
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"signature_init_failed: {type(e).__name__}: {e}",
-        )
+@app.post("/v1/verify_stream")
+async def verify_stream(api_key: ApiKey = Depends(require_api_key)):
+    """
+    Масова перевірка: NDJSON з полями VerifyRequest на вході, NDJSON
+    результатів на виході — стрімиться ще під час завантаження.
+    """
+    return VerifyStreamResponse(
+        verify_pool,
+        trusted=signer_registry,
+        chunk_lines=VERIFY_STREAM_CHUNK_LINES,
+        window=VERIFY_STREAM_WINDOW,
+        max_line_bytes=VERIFY_STREAM_MAX_LINE_BYTES,
+    )
+
 
+# -------------------------------------------------------------------
+# WebSocket: один handshake + auth, далі дрібні ID-tagged запити
+# -------------------------------------------------------------------
+
+async def _ws_upstream(name: str, url: str, params: dict, timeout: float) -> httpx.Response:
+    timeout = _upstream_timeout(name, url, timeout)
     try:
-        recovered = Account.recover_hash(msg_bytes, signature=sig.to_bytes())
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"recover_failed: {type(e).__name__}: {e}",
+        r = await upstream.get(
+            name, url, params=params, headers={"X-API-Key": INTERNAL_R4_API_KEY}, timeout=timeout
         )
+    except httpx.TimeoutException:
+        raise WsError(504, f"{name}_timeout")
+    except httpx.HTTPError as e:
+        raise WsError(502, f"{name}_unreachable: {e!s}")
+    if r.status_code != 200:
+        raise WsError(r.status_code, r.text[:200])
+    return r
 
-    recovered_norm = _normalize_address(recovered)
-    expected_norm = _normalize_address(req.expected_signer)
-    match = recovered_norm == expected_norm
 
-    return {
-        "ok": True,
-        "match": match,
-        "recovered": recovered,
-        "expected": req.expected_signer,
-        "v_used": v_norm,
-    }
+async def _ws_random(msg: dict, key: ApiKey):
+    try:
+        n = int(msg.get("n", 32))
+    except (TypeError, ValueError):
+        raise WsError(400, "n must be an integer")
+    fmt = str(msg.get("fmt", "hex"))
+    if entropy_source.in_process:
+        try:
+            raw = _random_in_process(n)
+        except ValueError as e:
+            raise WsError(422, str(e))
+        except EntropyError as e:
+            raise WsError(503, f"entropy_unavailable: {e}")
+        if fmt.lower() == "hex":
+            return json.dumps(raw.hex()), n
+        return json.dumps({"hex": raw.hex(), "n": n, "source": entropy_source.name}), n
+    r = await _ws_upstream("core", f"{CORE_URL}/random", {"n": n, "fmt": fmt}, 10.0)
+    if "json" in r.headers.get("content-type", ""):
+        return r.text, n
+    return json.dumps(r.text), n
+
+
+async def _ws_vrf(msg: dict, key: ApiKey):
+    sig = str(msg.get("sig", "ecdsa"))
+    full = bool(msg.get("full"))
+    path, timeout = ("/random_dual_full", 20.0) if full else ("/random_dual", 15.0)
+    r = await _ws_upstream("vrf", f"{VRF_URL}{path}", {"sig": sig}, timeout)
+    _record_proof("/v1/ws", "", sig, r.content, key.tenant)
+    return r.text, 0
+
+
+async def _ws_verify(msg: dict, key: ApiKey):
+    try:
+        res = verify_request(VerifyRequest.model_validate(msg), signer_registry.index)
+    except ValidationError as e:
+        err = e.errors()[0]
+        raise WsError(422, f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}")
+    except VerifyInputError as e:
+        raise WsError(400, str(e))
+    SIGNER_VERIFIED.inc(signer=res["signer"] or UNTRUSTED)
+    return json.dumps(res), 0
+
+
+WS_OPS = {"random": _ws_random, "vrf": _ws_vrf, "verify": _ws_verify}
+# дозволи ключа (routes) для op — ті самі, що й для HTTP-роутів, які він дублює
+WS_ROUTES = {
+    "random": lambda msg: "/v1/random",
+    "vrf": lambda msg: "/v1/random_dual_full" if msg.get("full") else "/v1/vrf",
+    "verify": lambda msg: "/v1/verify",
+}
+
+
+@app.websocket("/v1/ws")
+async def ws_channel(websocket: WebSocket):
+    """
+    Ключ — у X-API-Key або ?api_key= на handshake (браузерам лишається query).
+    Невалідний ключ — handshake відхиляється (HTTP 403); кожен op додатково
+    перевіряється за дозволами ключа на відповідний HTTP-роут.
+    """
+    raw = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+    key = key_registry.lookup(raw)
+    if key is None or not key.allows("/v1/ws"):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    await WsSession(
+        websocket, key, WS_OPS, max_inflight=WS_MAX_INFLIGHT, meter=usage_meter, routes=WS_ROUTES
+    ).run()
+
+
+STARTUP.mark("routes")
@@ -0,0 +1,211 @@
+"""
+Мінімальні in-process метрики (Prometheus text format).
+
+Без зовнішніх залежностей: Counter / Gauge / Histogram з лейблами, один
+глобальний REGISTRY, який віддає /v1/metrics. Оновлення — O(1) операції над
+dict/list без локів (усе живе в одному event loop).
+"""
+
+import bisect
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+
+# мілісекунди: від сотень мікросекунд до десятків секунд
+DEFAULT_MS_BUCKETS = (
+    0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+)
+
+
+def _escape(value: str) -> str:
+    # text format: у значенні лейбла екрануються \\, " і перенос рядка — інакше
+    # значення з запиту (шлях, ім'я) може дописати у вивід власні семпли
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if isinstance(v, int) or float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: Optional[Dict[str, str]]) -> Tuple[str, ...]:
+        if not self.label_names:
+            return ()
+        labels = labels or {}
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        super().__init__(name, doc, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        k = self._key(labels)
+        self.values[k] = self.values.get(k, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def render(self) -> Iterable[str]:
+        yield from self.header()
+        for k, v in self.values.items():
+            yield f"{self.name}{_fmt_labels(self.label_names, k)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_MS_BUCKETS,
+    ):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [counts per bucket (+Inf last), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = self._key(labels)
+        s = self.series.get(k)
+        if s is None:
+            s = self.series[k] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1] += value
+        s[2] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Оцінка квантиля за бакетами (верхня межа бакета), None якщо даних немає."""
+        s = self.series.get(self._key(labels))
+        if not s or not s[2]:
+            return None
+        target = q * s[2]
+        seen = 0
+        for i, c in enumerate(s[0]):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def count(self, **labels) -> int:
+        s = self.series.get(self._key(labels))
+        return s[2] if s else 0
+
+    def render(self) -> Iterable[str]:
+        yield from self.header()
+        for k, (counts, total, n) in self.series.items():
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le_label = f'le="{_fmt_value(le)}"'
+                yield f"{self.name}_bucket{_fmt_labels(self.label_names, k, le_label)} {acc}"
+            yield f"{self.name}_sum{_fmt_labels(self.label_names, k)} {_fmt_value(total)}"
+            yield f"{self.name}_count{_fmt_labels(self.label_names, k)} {n}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, doc, labels))
+
+    def gauge(self, name: str, doc: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, doc, labels))
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_MS_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for m in self.metrics.values():
+            lines.extend(m.render())
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _with_label(sample: str, label: str) -> str:
+    # ім'я метрики закінчується на '{' або пробілі; значення лейблів можуть містити пробіли
+    i = next(i for i, ch in enumerate(sample) if ch in "{ ")
+    if sample[i] == "{":
+        return f"{sample[:i + 1]}{label},{sample[i + 1:]}"
+    return f"{sample[:i]}{{{label}}}{sample[i:]}"
+
+
+def merge_rendered(parts: Sequence[Tuple[str, str]], label: str = "worker") -> str:
+    """
+    Злити тексти render() кількох процесів в один: кожен семпл отримує
+    лейбл label="<id>", семпли однієї метрики йдуть підряд під одним
+    HELP/TYPE (як вимагає text format).
+    """
+    families: Dict[str, list] = {}
+    for ident, text in parts:
+        tag = f'{label}="{_escape(str(ident))}"'
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                name = line.split(" ", 3)[2]
+                family = families.get(name)
+                if family is None:
+                    family = families[name] = [[], []]
+                if len(family[0]) < 2:
+                    family[0].append(line)
+            elif family is not None:
+                family[1].append(_with_label(line, tag))
+    lines = []
+    for header, samples in families.values():
+        lines.extend(header)
+        lines.extend(samples)
+    lines.append("")
+    return "\n".join(lines)
+
+
+REGISTRY = Registry()
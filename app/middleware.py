@@ -0,0 +1,83 @@
+"""
+Pure-ASGI middleware для gateway.
+
+На відміну від @app.middleware("http") (BaseHTTPMiddleware), тут немає
+додаткових task-ів і проміжного стріму: заголовки дописуються прямо в
+повідомлення http.response.start, тіло відповіді йде далі без буферизації.
+"""
+
+import secrets
+import time
+from typing import Iterable, Tuple
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+RESPONSE_TIME_HEADER = b"x-r4-response-time-ms"
+SERVER_TIMING_HEADER = b"server-timing"
+
+# вхідний X-Request-ID приймаємо лише «адекватний»: друкований ASCII, до 128 байт
+_MAX_REQUEST_ID = 128
+
+
+def _incoming_request_id(headers: Iterable[Tuple[bytes, bytes]]) -> bytes:
+    for name, value in headers:
+        if name == REQUEST_ID_HEADER:
+            if 0 < len(value) <= _MAX_REQUEST_ID and all(0x21 <= b <= 0x7E for b in value):
+                return value
+            break
+    return secrets.token_hex(8).encode()
+
+
+class ServiceHeadersMiddleware:
+    """
+    X-R4-* сервісні заголовки, X-Request-ID і час до першого байта відповіді.
+
+    request_id кладеться у scope["state"], тож у хендлерах він доступний
+    як request.state.request_id. Якщо хендлер поклав request.state.timer,
+    сюди ж додається Server-Timing, а після останнього chunk-а тіла фази
+    йдуть у метрики.
+    """
+
+    def __init__(self, app, headers: dict):
+        self.app = app
+        self.static_headers = [
+            (k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        t_start = t0
+        request_id = _incoming_request_id(scope["headers"])
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id.decode("latin-1")
+
+        static_headers = self.static_headers
+
+        async def send_with_headers(message):
+            nonlocal t_start
+            if message["type"] == "http.response.start":
+                t_start = time.perf_counter()
+                elapsed_ms = (t_start - t0) * 1000.0
+                headers = list(message.get("headers", ()))
+                headers.extend(static_headers)
+                headers.append((REQUEST_ID_HEADER, request_id))
+                headers.append((RESPONSE_TIME_HEADER, b"%.3f" % elapsed_ms))
+                # PhaseTimer (app.upstream) кладуть хендлери проксі
+                timer = state.get("timer")
+                if timer is not None and timer.expose:
+                    headers.append((SERVER_TIMING_HEADER, timer.server_timing(elapsed_ms)))
+                message["headers"] = headers
+                await send(message)
+                return
+
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                timer = state.get("timer")
+                if timer is not None:
+                    timer.record((time.perf_counter() - t_start) * 1000.0)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,169 @@
+"""
+Компактні формати VRF-доказу для /v1/vrf, /v1/random_dual, /v1/random_dual_full.
+
+JSON від VRF ноди парситься один раз (orjson, якщо встановлений) і одразу
+кодується в потрібний формат:
+
+- abi     — Solidity ABI static tuple
+            (uint256 randomness, bytes32 msg_hash, uint8 v, bytes32 r, bytes32 s, address signer),
+            рівно 6 * 32 = 192 байти; on-chain: abi.decode(data, (uint256, bytes32, uint8, bytes32, bytes32, address));
+- msgpack — ті самі поля, що й у JSON, але hex / base64 поля як сирі байти;
+- cbor    — те саме в CBOR (RFC 8949).
+
+msgpack / cbor2 — опційні залежності: без них відповідний fmt віддає 406.
+"""
+
+import base64
+import binascii
+import json
+from typing import Callable, Dict, Optional
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "abi": "application/octet-stream",
+    "msgpack": "application/msgpack",
+    "cbor": "application/cbor",
+}
+
+# поля, що в JSON ідуть як 0x-hex / base64, а в бінарних форматах — як bytes;
+# для hex — розмір у байтах
+HEX_FIELDS = {"msg_hash": 32, "r": 32, "s": 32, "signer_addr": 20}
+B64_FIELDS = ("sig_pq", "pq_pubkey")
+
+
+class CodecError(ValueError):
+    """Доказ від upstream не вдалося перекодувати."""
+
+
+class FormatUnavailable(Exception):
+    """fmt відомий, але бібліотека для нього не встановлена."""
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"fmt must be one of: {', '.join(MEDIA_TYPES)}")
+    if (fmt == "msgpack" and msgpack is None) or (fmt == "cbor" and cbor2 is None):
+        raise FormatUnavailable(f"fmt={fmt} is not available on this gateway")
+
+
+def available_formats() -> list:
+    out = []
+    for fmt in MEDIA_TYPES:
+        try:
+            check_format(fmt)
+        except FormatUnavailable:
+            continue
+        out.append(fmt)
+    return out
+
+
+def _hex_bytes(value, field: str, size: Optional[int] = None) -> bytes:
+    if not isinstance(value, str):
+        raise CodecError(f"{field} must be a hex string")
+    raw = value[2:] if value[:2] in ("0x", "0X") else value
+    # нода віддає числа без ведучих нулів ("0x7a3…" на 63 символи) — доповнюємо
+    # зліва, як scripts/test_vrf_verify.sh і proofstore._msg_hash_of
+    if size is not None and len(raw) < size * 2:
+        raw = raw.rjust(size * 2, "0")
+    elif len(raw) % 2:
+        raw = "0" + raw
+    try:
+        out = bytes.fromhex(raw)
+    except ValueError:
+        raise CodecError(f"{field} is not valid hex") from None
+    if size is not None and len(out) != size:
+        raise CodecError(f"{field} must be {size} bytes")
+    return out
+
+
+def _uint(value, field: str) -> int:
+    if isinstance(value, bool):
+        raise CodecError(f"{field} must be an integer")
+    if isinstance(value, int):
+        out = value
+    elif isinstance(value, str):
+        try:
+            out = int(value, 16) if value[:2] in ("0x", "0X") else int(value)
+        except ValueError:
+            raise CodecError(f"{field} must be an integer") from None
+    else:
+        raise CodecError(f"{field} must be an integer")
+    if not 0 <= out < 1 << 256:
+        raise CodecError(f"{field} out of uint256 range")
+    return out
+
+
+def abi_encode(proof: dict) -> bytes:
+    try:
+        randomness = _uint(proof["random"], "random")
+        msg_hash = _hex_bytes(proof["msg_hash"], "msg_hash", 32)
+        v = _uint(proof["v"], "v")
+        r = _hex_bytes(proof["r"], "r", 32)
+        s = _hex_bytes(proof["s"], "s", 32)
+        signer = _hex_bytes(proof["signer_addr"], "signer_addr", 20)
+    except KeyError as e:
+        raise CodecError(f"missing field {e.args[0]}") from None
+    if v in (0, 1):
+        # ecrecover в Solidity очікує 27/28
+        v += 27
+    if v > 255:
+        raise CodecError("v out of uint8 range")
+    return b"".join((
+        randomness.to_bytes(32, "big"),
+        msg_hash,
+        v.to_bytes(32, "big"),
+        r,
+        s,
+        signer.rjust(32, b"\0"),
+    ))
+
+
+def compact(proof: dict) -> dict:
+    """Копія доказу з hex / base64 полями, перетвореними на bytes."""
+    out = dict(proof)
+    for field, size in HEX_FIELDS.items():
+        if isinstance(out.get(field), str):
+            out[field] = _hex_bytes(out[field], field, size)
+    for field in B64_FIELDS:
+        if isinstance(out.get(field), str):
+            try:
+                out[field] = base64.b64decode(out[field], validate=True)
+            except binascii.Error:
+                raise CodecError(f"{field} is not valid base64") from None
+    return out
+
+
+_ENCODERS: Dict[str, Callable[[dict], bytes]] = {
+    "abi": abi_encode,
+    "msgpack": lambda p: msgpack.packb(compact(p), use_bin_type=True),
+    "cbor": lambda p: cbor2.dumps(compact(p)),
+}
+
+
+def encode_proof(body: bytes, fmt: str) -> bytes:
+    """Сире JSON-тіло від VRF ноди -> fmt (для "json" тіло повертається як є)."""
+    if fmt == "json":
+        return body
+    try:
+        proof = _loads(body)
+    except ValueError:
+        raise CodecError("upstream proof is not valid JSON") from None
+    if not isinstance(proof, dict):
+        raise CodecError("upstream proof is not a JSON object")
+    return _ENCODERS[fmt](proof)
@@ -0,0 +1,221 @@
+"""
+Локальне індексоване сховище виданих доказів (SQLite, WAL).
+
+- запис: той самий шлях, що й у журналі — сире тіло відповіді VRF у чергу,
+  парсинг і INSERT пачками в одній транзакції, у фоновому потоці;
+- кожен доказ належить tenant-у ключа, яким його видали; читання й range
+  scan бачать лише докази свого tenant-а;
+- з'єднання не діляться між потоками без локу: writer (пачки й компакція,
+  обидва в to_thread) — під _write_lock; get — власне read-only з'єднання,
+  яким користується лише event loop; range scan — окреме, під _range_lock;
+- читання за msg_hash: PK-lookup по WITHOUT ROWID таблиці через окреме
+  read-only з'єднання (WAL дозволяє читати паралельно із записом,
+  mmap + кеш підготовлених statement-ів sqlite3), прямо в event loop —
+  це мікросекунди;
+- range scan за часом (для звірок) — у потоці, з лімітом, сторінками за
+  курсором (ts, msg_hash): докази з однаковим ts не губляться на межі сторінки;
+- компакція: періодичне видалення записів, старших за retention.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .batching import BatchQueue
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.proofstore")
+
+LOOKUPS = REGISTRY.counter("r4_proofstore_lookups_total", "Proof lookups by msg_hash", ("result",))
+COMPACTED = REGISTRY.counter("r4_proofstore_compacted_total", "Proofs removed by retention compaction")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proofs (
+    msg_hash BLOB PRIMARY KEY,
+    ts       INTEGER NOT NULL,
+    route    TEXT NOT NULL,
+    sig      TEXT NOT NULL,
+    body     BLOB NOT NULL,
+    tenant   TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS proofs_ts ON proofs (ts);
+"""
+# база, створена до появи tenant: старі докази лишаються з tenant='' і нікому не видні
+SQL_ADD_TENANT = "ALTER TABLE proofs ADD COLUMN tenant TEXT NOT NULL DEFAULT ''"
+SQL_TENANT_INDEX = "CREATE INDEX IF NOT EXISTS proofs_tenant_ts ON proofs (tenant, ts, msg_hash)"
+
+SQL_INSERT = "INSERT OR REPLACE INTO proofs (msg_hash, ts, route, sig, body, tenant) VALUES (?, ?, ?, ?, ?, ?)"
+SQL_GET = "SELECT body FROM proofs WHERE msg_hash = ? AND tenant = ?"
+SQL_RANGE = (
+    "SELECT ts, msg_hash, route, body FROM proofs"
+    " WHERE tenant = ? AND (ts, msg_hash) > (?, ?) AND ts < ?"
+    " ORDER BY ts, msg_hash LIMIT ?"
+)
+SQL_COMPACT = "DELETE FROM proofs WHERE msg_hash IN (SELECT msg_hash FROM proofs WHERE ts < ? LIMIT ?)"
+
+
+def _msg_hash_of(body: bytes) -> Optional[bytes]:
+    try:
+        raw = str(json.loads(body)["msg_hash"]).strip()
+    except (ValueError, KeyError, TypeError):
+        return None
+    if raw[:2] in ("0x", "0X"):
+        raw = raw[2:]
+    try:
+        h = bytes.fromhex(raw.rjust(64, "0"))
+    except ValueError:
+        return None
+    return h if len(h) == 32 else None
+
+
+class ProofStore(BatchQueue):
+    name = "proofstore"
+
+    def __init__(
+        self,
+        path: str,
+        retention_seconds: float = 30 * 86400,
+        compact_interval: float = 600.0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.compact_interval = compact_interval
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._range_reader: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._range_lock = threading.Lock()
+        self._compact_task: Optional[asyncio.Task] = None
+
+    def record(self, route: str, sig: str, body: bytes, tenant: str) -> bool:
+        return self.submit((int(time.time() * 1000), route, sig, body, tenant))
+
+    # ---- з'єднання ----
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        if readonly:
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, cached_statements=64
+            )
+            conn.execute("PRAGMA mmap_size = 268435456")
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            if "tenant" not in {row[1] for row in conn.execute("PRAGMA table_info(proofs)")}:
+                conn.execute(SQL_ADD_TENANT)
+            conn.execute(SQL_TENANT_INDEX)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    async def on_start(self) -> None:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._writer = await asyncio.to_thread(self._connect, False)
+        self._reader = self._connect(True)
+        self._range_reader = self._connect(True)
+        self._compact_task = asyncio.create_task(self._compact_loop())
+
+    async def on_stop(self) -> None:
+        if self._compact_task is not None:
+            self._compact_task.cancel()
+            try:
+                await self._compact_task
+            except asyncio.CancelledError:
+                pass
+        for conn in (self._reader, self._range_reader, self._writer):
+            if conn is not None:
+                conn.close()
+        self._reader = self._range_reader = self._writer = None
+
+    # ---- запис (у потоці) ----
+
+    def _write_batch(self, batch: List) -> None:
+        rows = []
+        for ts, route, sig, body, tenant in batch:
+            h = _msg_hash_of(body)
+            if h is not None:
+                rows.append((h, ts, route, sig, body, tenant))
+        if not rows:
+            return
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(SQL_INSERT, rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                # інакше з'єднання лишається в транзакції, і кожен наступний BEGIN падає
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    async def flush(self, batch: List) -> None:
+        await asyncio.to_thread(self._write_batch, batch)
+
+    # ---- читання ----
+
+    @property
+    def ready(self) -> bool:
+        return self._reader is not None
+
+    def get(self, msg_hash: bytes, tenant: str) -> Optional[bytes]:
+        # чужий доказ — такий самий miss, як відсутній: існування не підтверджуємо
+        row = self._reader.execute(SQL_GET, (msg_hash, tenant)).fetchone()
+        LOOKUPS.inc(result="hit" if row else "miss")
+        return row[0] if row else None
+
+    def _range(
+        self, tenant: str, after: Tuple[int, bytes], until_ms: int, limit: int
+    ) -> List[Tuple[int, bytes, str, bytes]]:
+        with self._range_lock:
+            return self._range_reader.execute(
+                SQL_RANGE, (tenant, after[0], after[1], until_ms, limit)
+            ).fetchall()
+
+    async def range(
+        self, tenant: str, after: Tuple[int, bytes], until_ms: int, limit: int
+    ) -> List[Tuple[int, bytes, str, bytes]]:
+        """
+        Докази tenant-а строго після курсора after = (ts, msg_hash) і до until_ms,
+        у порядку (ts, msg_hash). Перша сторінка — after = (since_ms, b""): будь-який msg_hash більший за b"".
+        """
+        return await asyncio.to_thread(self._range, tenant, after, until_ms, limit)
+
+    # ---- компакція ----
+
+    def _compact(self, chunk: int = 5000) -> int:
+        cutoff = int((time.time() - self.retention_seconds) * 1000)
+        removed = 0
+        while True:
+            # лок на кожен chunk, а не на весь прохід: пачки доказів не чекають компакцію
+            with self._write_lock:
+                cur = self._writer.execute(SQL_COMPACT, (cutoff, chunk))
+            removed += cur.rowcount
+            if cur.rowcount < chunk:
+                break
+        if removed:
+            with self._write_lock:
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    async def _compact_loop(self) -> None:
+        while True:
+            try:
+                removed = await asyncio.to_thread(self._compact)
+                if removed:
+                    COMPACTED.inc(removed)
+                    log.info("proofstore: compacted %d proofs", removed)
+            except Exception:
+                log.exception("proofstore compaction failed")
+            await asyncio.sleep(self.compact_interval)
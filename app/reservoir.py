@@ -0,0 +1,218 @@
+"""
+Резервуар ентропії в спільній пам'яті для /v1/random.
+
+Замість HTTP-запиту до core на кожен /v1/random воркери беруть байти з
+буфера, який наповнює ОДИН refiller (воркер 0) великими порціями з core.
+
+Сегмент multiprocessing.shared_memory поділений на lanes — по одній на
+воркер. Кожна lane — SPSC-кільце (single producer / single consumer):
+- write-курсор пише лише refiller, read-курсор — лише воркер-власник;
+- курсори — монотонні u64 (всього записано / видано байтів), кожен у
+  своїй кеш-лінії; читання/запис — одна вирівняна 8-байтна операція
+  через memoryview.cast("Q"), тож жодних локів і CAS між процесами;
+- байт видається рівно один раз: consumer просуває read лише за вже
+  опублікованим write, producer пише лише у звільнене місце.
+
+take_hex() форматує hex прямо з memoryview сегмента, без проміжних bytes.
+Якщо в lane не вистачає байтів (refiller не встигає / core недоступний) —
+None, і запит іде в core як раніше (r4_entropy_reservoir_requests_total
+{result="miss"} — головний сигнал «конкуренції» за резервуар).
+
+Lane:  [write u64][pad до 64][read u64][pad до 128][data: capacity байтів]
+"""
+
+import asyncio
+import logging
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Awaitable, Callable, List, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.reservoir")
+
+LANE_HEADER = 128
+
+FILL_RATIO = REGISTRY.gauge("r4_entropy_reservoir_fill_ratio", "Entropy reservoir lane occupancy (0..1)", ("lane",))
+REQUESTS = REGISTRY.counter(
+    "r4_entropy_reservoir_requests_total", "/v1/random requests served from the reservoir or missed", ("result",)
+)
+REFILL_BYTES = REGISTRY.counter("r4_entropy_reservoir_refill_bytes_total", "Bytes fetched from core into the reservoir")
+REFILL_ERRORS = REGISTRY.counter("r4_entropy_reservoir_refill_errors_total", "Failed reservoir refills from core")
+REFILL_MS = REGISTRY.histogram("r4_entropy_reservoir_refill_ms", "Core fetch time per reservoir refill chunk")
+
+
+class Lane:
+    __slots__ = ("index", "capacity", "_cursors", "_w", "_r", "_data")
+
+    def __init__(self, buf: memoryview, cursors: memoryview, index: int, capacity: int):
+        base = index * (LANE_HEADER + capacity)
+        self.index = index
+        self.capacity = capacity
+        self._cursors = cursors
+        self._w = base // 8
+        self._r = (base + 64) // 8
+        self._data = buf[base + LANE_HEADER: base + LANE_HEADER + capacity]
+
+    def release(self) -> None:
+        self._data.release()
+
+    def available(self) -> int:
+        return self._cursors[self._w] - self._cursors[self._r]
+
+    def free(self) -> int:
+        return self.capacity - self.available()
+
+    # ---- consumer (воркер-власник) ----
+
+    def take_hex(self, n: int) -> Optional[str]:
+        cur = self._cursors
+        r = cur[self._r]
+        if cur[self._w] - r < n:
+            return None
+        start = r % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out = self._data[start:end].hex()
+        else:
+            out = self._data[start:].hex() + self._data[: end - self.capacity].hex()
+        cur[self._r] = r + n
+        return out
+
+    # ---- producer (refiller) ----
+
+    def put(self, data: bytes) -> int:
+        cur = self._cursors
+        w = cur[self._w]
+        n = min(len(data), self.capacity - (w - cur[self._r]))
+        if n <= 0:
+            return 0
+        start = w % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start: start + first] = data[:first]
+        if n > first:
+            self._data[: n - first] = data[first:n]
+        # публікуємо лише після того, як байти вже в буфері
+        cur[self._w] = w + n
+        return n
+
+
+class EntropyReservoir:
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        lanes: int,
+        capacity: int,
+        index: int,
+        owner: bool,
+        chunk: int = 4096,
+        low_watermark: float = 0.5,
+        interval: float = 0.02,
+    ):
+        self.shm = shm
+        self.capacity = capacity
+        self.index = index
+        self.owner = owner
+        self.chunk = chunk
+        self.low_watermark = low_watermark
+        self.interval = interval
+        self._cursors = shm.buf.cast("Q")
+        self.lanes: List[Lane] = [Lane(shm.buf, self._cursors, i, capacity) for i in range(lanes)]
+        self.lane = self.lanes[index]
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def capacity_from_kb(kb: float) -> int:
+        # кратно 8: сегмент читається як масив u64 (курсори)
+        return max(8, int(kb * 1024) // 8 * 8)
+
+    @staticmethod
+    def segment_size(lanes: int, capacity: int) -> int:
+        return lanes * (LANE_HEADER + capacity)
+
+    @classmethod
+    def create_segment(cls, lanes: int, capacity: int) -> shared_memory.SharedMemory:
+        size = cls.segment_size(lanes, capacity)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        return shm
+
+    @classmethod
+    def from_env(cls, capacity: int, **kwargs) -> "EntropyReservoir":
+        """
+        Під app.serve — lane воркера в сегменті майстра (R4_RESERVOIR_NAME);
+        інакше — власний сегмент на одну lane.
+        """
+        name = os.getenv("R4_RESERVOIR_NAME")
+        if not name:
+            return cls(cls.create_segment(1, capacity), 1, capacity, index=0, owner=True, **kwargs)
+        return cls(
+            shared_memory.SharedMemory(name=name),
+            int(os.environ["R4_WORKERS"]),
+            capacity,
+            index=int(os.environ["R4_WORKER_INDEX"]),
+            owner=False,
+            **kwargs,
+        )
+
+    @property
+    def is_refiller(self) -> bool:
+        return self.index == 0
+
+    def take_hex(self, n: int) -> Optional[str]:
+        out = self.lane.take_hex(n)
+        REQUESTS.inc(result="miss" if out is None else "hit")
+        return out
+
+    # ---- refill (лише воркер 0) ----
+
+    async def _fill(self, lane: Lane, fetch: Callable[[int], Awaitable[bytes]]) -> None:
+        while lane.free() >= min(self.chunk, self.capacity // 4):
+            t0 = time.perf_counter()
+            data = await fetch(min(self.chunk, lane.free()))
+            REFILL_MS.observe((time.perf_counter() - t0) * 1000.0)
+            REFILL_BYTES.inc(lane.put(data))
+
+    async def _run(self, fetch: Callable[[int], Awaitable[bytes]]) -> None:
+        low = self.capacity * self.low_watermark
+        backoff = self.interval
+        while True:
+            needy = [lane for lane in self.lanes if lane.available() < low]
+            for lane in self.lanes:
+                FILL_RATIO.set(round(lane.available() / self.capacity, 3), lane=str(lane.index))
+            if not needy:
+                await asyncio.sleep(self.interval)
+                continue
+            results = await asyncio.gather(*(self._fill(lane, fetch) for lane in needy), return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                REFILL_ERRORS.inc(len(errors))
+                log.warning("entropy reservoir refill failed: %s", errors[0])
+                # core лежить — не довбаємо його в циклі; запити тим часом ідуть напряму
+                backoff = min(backoff * 2, 5.0)
+                await asyncio.sleep(backoff)
+            else:
+                backoff = self.interval
+
+    def start(self, fetch: Callable[[int], Awaitable[bytes]]) -> None:
+        if self._task is None and self.is_refiller:
+            self._task = asyncio.create_task(self._run(fetch))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for lane in self.lanes:
+            lane.release()
+        self.lanes = []
+        self.lane = None
+        self._cursors.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,286 @@
+"""
+Продакшн-запуск gateway: pre-fork майстер + N воркерів uvicorn.
+
+    python -m app.serve [--workers N] [--host 0.0.0.0] [--port 8082] [--reuse-port]
+
+- app.main імпортується в майстрі ДО fork (preload): воркери отримують уже
+  імпортований FastAPI-застосунок copy-on-write, старт воркера — лише
+  lifespan (з'єднання з upstream, фонові задачі), без повторних імпортів.
+  На момент fork у майстрі немає ні event loop, ні потоків — усе, що їх
+  створює, живе в lifespan.
+- Сокет: за замовчуванням майстер сам bind/listen і воркери успадковують
+  один listening socket (accept розподіляє ядро). З --reuse-port кожен
+  воркер відкриває свій сокет з SO_REUSEPORT — ядро балансує з'єднання
+  хешем, без thundering herd на одному accept.
+- uvloop / httptools, якщо встановлені (інакше asyncio / h11).
+- Спільна пам'ять (app.shm): по слоту на воркер; воркер публікує туди знімок
+  метрик і обліку використання, /v1/metrics і /v1/usage зливають усі слоти.
+- З ENTROPY_RESERVOIR_KB майстер створює й сегмент резервуару ентропії
+  (app.reservoir) — по lane на воркер.
+- Майстер перезапускає воркер, що впав (з backoff при crash loop), а на
+  SIGTERM / SIGINT передає SIGTERM воркерам і чекає graceful shutdown
+  (lifespan: flush журналу, usage), після --graceful-timeout — SIGKILL.
+
+`uvicorn app.main:app` як і раніше працює — один процес, без спільної пам'яті.
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+from .reservoir import EntropyReservoir
+from .shm import SharedSlots
+
+
+log = logging.getLogger("r4.serve")
+
+
+def _detect(module: str, preferred: str, fallback: str) -> str:
+    return preferred if importlib.util.find_spec(module) is not None else fallback
+
+
+def _cpu_count() -> int:
+    # CPU, доступні процесу (cpuset контейнера), а не всі CPU хоста
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _bind(host: str, port: int, backlog: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    def __init__(self, args: argparse.Namespace, app, sock: Optional[socket.socket], slots: SharedSlots):
+        self.args = args
+        self.app = app
+        self.sock = sock
+        self.slots = slots
+        self.children: Dict[int, int] = {}  # pid -> індекс воркера
+        self.started: Dict[int, float] = {}  # індекс -> час останнього старту
+        self.stopping = False
+
+    # ---- воркер ----
+
+    @staticmethod
+    def _watch_parent(master_pid: int) -> None:
+        # майстра вбили (-9 / OOM) — воркер не лишається сиротою на порту
+        while os.getppid() == master_pid:
+            time.sleep(1.0)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def _worker(self, index: int, master_pid: int) -> None:
+        import uvicorn
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ["R4_WORKER_INDEX"] = str(index)
+        if not isinstance(self.app, str):
+            from .startup import STARTUP
+
+            # preload → fork: очікування в майстрі (і перезапуски) не рахуємо в server_setup
+            STARTUP.mark("fork")
+        threading.Thread(target=self._watch_parent, args=(master_pid,), name="r4-parent-watch", daemon=True).start()
+        sock = self.sock
+        if sock is None:
+            sock = _bind(self.args.host, self.args.port, self.args.backlog, reuse_port=True)
+
+        config = uvicorn.Config(
+            self.app,
+            loop=self.args.loop,
+            http=self.args.http,
+            lifespan="on",
+            log_level=self.args.log_level,
+            proxy_headers=True,
+            forwarded_allow_ips=self.args.forwarded_allow_ips,
+            timeout_keep_alive=self.args.keep_alive,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+
+    def spawn(self, index: int) -> None:
+        master_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker(index, master_pid)
+            except BaseException:
+                log.exception("worker %d crashed", index)
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        self.started[index] = time.monotonic()
+        log.info("worker %d started (pid %d)", index, pid)
+
+    # ---- майстер ----
+
+    def _on_signal(self, signum, frame) -> None:
+        if not self.stopping:
+            log.info("%s: stopping %d workers", signal.Signals(signum).name, len(self.children))
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self, block: bool) -> bool:
+        try:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            self.children.clear()
+            return False
+        if pid == 0:
+            return False
+        index = self.children.pop(pid, None)
+        if index is None:
+            return True
+        code = os.waitstatus_to_exitcode(status)
+        if self.stopping:
+            log.info("worker %d (pid %d) exited with %d", index, pid, code)
+            return True
+        uptime = time.monotonic() - self.started.get(index, 0.0)
+        log.warning("worker %d (pid %d) exited with %d after %.1fs; restarting", index, pid, code, uptime)
+        if uptime < 1.0:
+            # crash loop (битий конфіг, зайнятий порт) — не палимо CPU
+            time.sleep(1.0)
+        # слот мертвого воркера лишається зі старим ts — читачі відкинуть його як застарілий
+        if not self.stopping:
+            self.spawn(index)
+        return True
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for i in range(self.args.workers):
+            self.spawn(i)
+
+        while self.children and not self.stopping:
+            try:
+                self._reap(block=True)
+            except InterruptedError:
+                pass
+
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            if not self._reap(block=False):
+                time.sleep(0.05)
+        for pid in list(self.children):
+            log.warning("worker pid %d did not stop in %.0fs; killing", pid, self.args.graceful_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while self.children and self._reap(block=True):
+            pass
+        return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="python -m app.serve", description="RE4CTOR gateway launcher")
+    ap.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8082")))
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "0")) or _cpu_count(),
+        help="number of worker processes (WEB_CONCURRENCY, default: available CPUs)",
+    )
+    ap.add_argument(
+        "--reuse-port",
+        action="store_true",
+        default=os.getenv("REUSE_PORT", "0").lower() in ("1", "true", "yes", "on"),
+        help="per-worker sockets with SO_REUSEPORT instead of one shared socket",
+    )
+    ap.add_argument("--backlog", type=int, default=int(os.getenv("BACKLOG", "2048")))
+    ap.add_argument("--loop", default=os.getenv("UVICORN_LOOP") or _detect("uvloop", "uvloop", "asyncio"))
+    ap.add_argument("--http", default=os.getenv("UVICORN_HTTP") or _detect("httptools", "httptools", "h11"))
+    ap.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    ap.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE_S", "5")))
+    ap.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    ap.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT_S", "30")))
+    ap.add_argument(
+        "--shm-slot-kb",
+        type=int,
+        default=int(os.getenv("SHM_SLOT_KB", "1024")),
+        help="shared-memory slot per worker for metrics/usage snapshots",
+    )
+    ap.add_argument("--no-preload", dest="preload", action="store_false", help="import app.main in each worker")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.workers = max(1, args.workers)
+    os.environ["LOG_LEVEL"] = args.log_level
+    # той самий логер "r4", що й в app.main (він не додасть другий handler)
+    r4_log = logging.getLogger("r4")
+    r4_log.setLevel(args.log_level.upper())
+    if not r4_log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s: %(message)s"))
+        r4_log.addHandler(handler)
+        r4_log.propagate = False
+
+    slots = SharedSlots.create(args.workers, args.shm_slot_kb * 1024)
+    # воркери (і app.main у них) під'єднуються до сегмента за цими змінними
+    os.environ["R4_SHM_NAME"] = slots.name
+    os.environ["R4_WORKERS"] = str(args.workers)
+    os.environ["R4_SHM_SLOT_BYTES"] = str(slots.slot_size)
+    # резервуар ентропії: по lane на воркер, наповнює воркер 0 (app/reservoir.py)
+    reservoir = None
+    reservoir_kb = float(os.getenv("ENTROPY_RESERVOIR_KB", "0") or 0)
+    if reservoir_kb > 0 and os.getenv("ENTROPY_SOURCE", "http").strip() in ("", "http"):
+        reservoir = EntropyReservoir.create_segment(args.workers, EntropyReservoir.capacity_from_kb(reservoir_kb))
+        os.environ["R4_RESERVOIR_NAME"] = reservoir.name
+    # Idempotency-Key: повтор може прийти в будь-який воркер — спільний SQLite-шар
+    idem_path = None
+    if args.workers > 1 and not os.getenv("IDEMPOTENCY_PATH", "").strip():
+        idem_path = os.path.join(tempfile.gettempdir(), f"r4-idempotency-{os.getpid()}.db")
+        os.environ["R4_IDEMPOTENCY_PATH"] = idem_path
+
+    try:
+        if args.preload:
+            from .main import app
+        else:
+            app = "app.main:app"
+        sock = None if args.reuse_port else _bind(args.host, args.port, args.backlog, reuse_port=False)
+        log.info(
+            "serving on %s:%d: %d workers, loop=%s http=%s, %s, preload=%s",
+            args.host, args.port, args.workers, args.loop, args.http,
+            "SO_REUSEPORT" if args.reuse_port else "shared socket", args.preload,
+        )
+        return Master(args, app, sock, slots).run()
+    finally:
+        slots.close()
+        if reservoir is not None:
+            reservoir.close()
+            reservoir.unlink()
+        if idem_path is not None:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.unlink(idem_path + suffix)
+                except FileNotFoundError:
+                    pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Спільна пам'ять між воркерами app.serve.
+
+Один сегмент multiprocessing.shared_memory, поділений на слоти фіксованого
+розміру — по слоту на воркер. Кожен слот пише лише його воркер (single
+writer), тож локи не потрібні; читачі (будь-який воркер) бачать узгоджений
+знімок завдяки seqlock: версія непарна, поки йде запис, і читач повторює
+спробу, якщо версія змінилась під час копіювання.
+
+Слот: [seq u64][len u64][payload ...]
+
+WorkerPublisher раз на interval кладе у свій слот JSON-знімок стану
+воркера (метрики, облік використання), а collect() збирає знімки всіх
+живих воркерів — /v1/metrics і /v1/usage показують сумарну картину, а
+шлях запиту як і раніше торкається лише локальних лічильників.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.shm")
+
+HEADER = struct.Struct("<QQ")
+
+PUBLISH_MS = REGISTRY.histogram("r4_cluster_publish_ms", "Worker snapshot publish time in milliseconds")
+PUBLISH_OVERFLOW = REGISTRY.counter(
+    "r4_cluster_publish_overflow_total", "Snapshots that did not fit into the shared-memory slot"
+)
+
+
+class SharedSlots:
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, slot_size: int, owner: bool):
+        self.shm = shm
+        self.slots = slots
+        self.slot_size = slot_size
+        self.owner = owner
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, slots: int, slot_size: int) -> "SharedSlots":
+        shm = shared_memory.SharedMemory(create=True, size=slots * slot_size)
+        shm.buf[: slots * slot_size] = bytes(slots * slot_size)
+        return cls(shm, slots, slot_size, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_size: int) -> "SharedSlots":
+        # воркер успадковує resource_tracker майстра (fork): повторна реєстрація
+        # того самого імені — no-op, а unregister тут зняв би й реєстрацію
+        # майстра, і після kill -9 майстра сегмент лишився б у /dev/shm
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, slots, slot_size, owner=False)
+
+    def write(self, index: int, payload: bytes) -> bool:
+        if len(payload) > self.slot_size - HEADER.size:
+            return False
+        buf = self.shm.buf
+        base = index * self.slot_size
+        seq, _ = HEADER.unpack_from(buf, base)
+        HEADER.pack_into(buf, base, seq + 1, 0)
+        buf[base + HEADER.size: base + HEADER.size + len(payload)] = payload
+        HEADER.pack_into(buf, base, seq + 2, len(payload))
+        return True
+
+    def read(self, index: int, retries: int = 5) -> Optional[bytes]:
+        buf = self.shm.buf
+        base = index * self.slot_size
+        for _ in range(retries):
+            seq, length = HEADER.unpack_from(buf, base)
+            if seq % 2:
+                continue
+            data = bytes(buf[base + HEADER.size: base + HEADER.size + length])
+            if HEADER.unpack_from(buf, base)[0] == seq:
+                return data if length else None
+        return None
+
+    def close(self) -> None:
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class WorkerPublisher:
+    def __init__(
+        self,
+        slots: SharedSlots,
+        index: int,
+        snapshot: Callable[[], dict],
+        interval: float = 1.0,
+        stale_after: float = 10.0,
+    ):
+        self.slots = slots
+        self.index = index
+        self.snapshot = snapshot
+        self.interval = interval
+        self.stale_after = stale_after
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, snapshot: Callable[[], dict], interval: float = 1.0) -> Optional["WorkerPublisher"]:
+        """Під app.serve воркер отримує R4_SHM_* в оточенні; інакше — None."""
+        name = os.getenv("R4_SHM_NAME")
+        if not name:
+            return None
+        slots = SharedSlots.attach(name, int(os.environ["R4_WORKERS"]), int(os.environ["R4_SHM_SLOT_BYTES"]))
+        return cls(slots, int(os.environ["R4_WORKER_INDEX"]), snapshot, interval, stale_after=interval * 10)
+
+    def publish(self) -> None:
+        t0 = time.perf_counter()
+        state = {"worker": self.index, "pid": os.getpid(), "ts": time.time(), **self.snapshot()}
+        if not self.slots.write(self.index, json.dumps(state, separators=(",", ":")).encode()):
+            PUBLISH_OVERFLOW.inc()
+            log.warning("worker %d snapshot does not fit into %d bytes", self.index, self.slots.slot_size)
+        PUBLISH_MS.observe((time.perf_counter() - t0) * 1000.0)
+
+    def collect(self, include_self: bool = False) -> List[dict]:
+        """Свіжі знімки інших воркерів (власний стан — беріть наживо)."""
+        now = time.time()
+        out = []
+        for i in range(self.slots.slots):
+            if i == self.index and not include_self:
+                continue
+            raw = self.slots.read(i)
+            if raw is None:
+                continue
+            try:
+                state = json.loads(raw)
+            except ValueError:
+                continue
+            if now - state.get("ts", 0) <= self.stale_after:
+                out.append(state)
+        return out
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.publish()
+            except Exception:
+                log.exception("worker snapshot publish failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.slots.close()
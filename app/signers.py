@@ -0,0 +1,151 @@
+"""
+Реєстр довірених підписантів VRF (trusted signers).
+
+/v1/verify, /v1/verify_stream і WS verify після recovery дивляться, чи
+відновлена адреса належить довіреній VRF ноді: індекс — dict із сирих
+20 байтів адреси в ім'я підписанта, тож перевірка — один dict.get по
+bytes, без hex / checksum і без expected_signer від клієнта.
+
+Джерела:
+- TRUSTED_SIGNERS — адреси через кому (ім'я = адреса в нижньому регістрі);
+- TRUSTED_SIGNERS_PATH — JSON:
+    {"signers": [{"address": "0x1C90...", "name": "vrf-eu-1"}, "0xabcd..."]}
+  записи з "disabled": true пропускаються.
+
+Перезавантаження — як у app/apikeys.py: при зміні mtime новий індекс
+будується в потоці й підміняється одним присвоєнням; битий файл лишає
+попередній індекс.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.signers")
+
+VERIFIED = REGISTRY.counter(
+    "r4_verify_signer_total", "Recovered signatures by trusted signer (untrusted = not in the registry)", ("signer",)
+)
+SIGNERS = REGISTRY.gauge("r4_trusted_signers", "Trusted signer addresses loaded")
+RELOADS = REGISTRY.counter("r4_trusted_signers_reload_total", "Trusted signer registry reloads", ("result",))
+
+UNTRUSTED = "untrusted"
+
+
+def parse_address(addr: str) -> bytes:
+    """"0x" + 40 hex (будь-який регістр) -> 20 байтів; ValueError інакше."""
+    a = addr.strip()
+    if a[:2] in ("0x", "0X"):
+        a = a[2:]
+    if len(a) != 40:
+        raise ValueError(f"bad address: {addr!r}")
+    try:
+        return bytes.fromhex(a)
+    except ValueError:
+        raise ValueError(f"bad address: {addr!r}") from None
+
+
+def count(results: Mapping[str, int]) -> None:
+    """Лічильники r4_verify_signer_total з {signer: n} (напр. від воркерів пулу)."""
+    for signer, n in results.items():
+        VERIFIED.inc(n, signer=signer)
+
+
+def _read_json(path: str) -> List:
+    with open(path, "rb") as f:
+        data = json.load(f)
+    return data["signers"] if isinstance(data, dict) else data
+
+
+class SignerRegistry:
+    def __init__(self, path: str = "", static: Iterable[str] = (), reload_interval: float = 5.0):
+        self.path = path
+        self.static = [a for a in static if a]
+        self.reload_interval = reload_interval
+        self._index: Dict[bytes, str] = {}
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._swap(self._build())
+
+    # ---- побудова індексу (може виконуватись у потоці) ----
+
+    def _source_mtime(self) -> Optional[float]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        return os.stat(self.path).st_mtime
+
+    def _build(self) -> Dict[bytes, str]:
+        index: Dict[bytes, str] = {}
+        for addr in self.static:
+            raw = parse_address(addr)
+            index[raw] = "0x" + raw.hex()
+        if self.path:
+            self._mtime = self._source_mtime()
+            for rec in _read_json(self.path):
+                if isinstance(rec, str):
+                    rec = {"address": rec}
+                if rec.get("disabled"):
+                    continue
+                raw = parse_address(str(rec["address"]))
+                index[raw] = str(rec.get("name") or "0x" + raw.hex())
+        return index
+
+    def _swap(self, index: Dict[bytes, str]) -> None:
+        self._index = index
+        SIGNERS.set(len(index))
+
+    # ---- шлях запиту ----
+
+    @property
+    def index(self) -> Mapping[bytes, str]:
+        """Поточний індекс; не змінюється на місці (reload підміняє його цілком)."""
+        return self._index
+
+    def lookup(self, addr20: bytes) -> Optional[str]:
+        return self._index.get(addr20)
+
+    def public(self) -> List[dict]:
+        return [{"address": "0x" + raw.hex(), "name": name} for raw, name in self._index.items()]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    # ---- hot reload ----
+
+    async def reload_if_changed(self) -> bool:
+        if not self.path or self._source_mtime() == self._mtime:
+            return False
+        try:
+            index = await asyncio.to_thread(self._build)
+        except Exception:
+            RELOADS.inc(result="error")
+            log.exception("trusted signer registry reload failed; keeping %d signers", len(self._index))
+            self._mtime = self._source_mtime()
+            return False
+        self._swap(index)
+        RELOADS.inc(result="ok")
+        log.info("trusted signer registry reloaded: %d signers", len(index))
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload_if_changed()
+
+    def start(self) -> None:
+        if self._task is None and self.path:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,152 @@
+"""
+Спільний hot path для перевірки ECDSA (secp256k1) підписів.
+
+Використовується /v1/verify і /v1/verify_stream в app/main.py та
+app/verify_route.py, тож валідація і декодування hex живуть в одному місці.
+
+eth_keys / eth_utils імпортуються ліниво (перший виклик або warm()):
+вони потрібні лише для recovery, а на холодному старті коштують ~80 ms.
+"""
+
+from typing import TYPE_CHECKING, Mapping, Optional
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from eth_keys import keys
+
+_keys = None
+_to_checksum_address = None
+
+
+def warm() -> None:
+    """Імпортувати крипто-стек заздалегідь (напр. у фоні після старту)."""
+    global _keys, _to_checksum_address
+    if _keys is None:
+        from eth_keys import keys
+
+        _keys = keys
+    if _to_checksum_address is None:
+        from eth_utils import to_checksum_address
+
+        _to_checksum_address = to_checksum_address
+
+
+HEX64_ERROR = "msg_hash/r/s must be 64-hex (no 0x)"
+
+
+class VerifyInputError(ValueError):
+    """Некоректні поля запиту; текст іде в HTTP detail як є."""
+
+
+class VerifyRequest(BaseModel):
+    msg_hash: str
+    r: str
+    s: str
+    v: int
+    # без expected_signer match = "підписав довірений підписант" (app/signers.py)
+    expected_signer: Optional[str] = None
+
+
+def decode_hex_32(s: str, field: str) -> bytes:
+    """
+    64 hex-символи (з 0x або без) -> 32 байти за один прохід.
+
+    bytes.fromhex сам валідує символи; перевірка довжини результату
+    відсікає пробіли, які fromhex мовчки пропускає між байтами.
+    """
+    if s is None:
+        raise VerifyInputError(f"{field} is required")
+
+    raw = s.strip()
+    if raw[:2] in ("0x", "0X"):
+        raw = raw[2:]
+
+    if len(raw) != 64:
+        raise VerifyInputError(HEX64_ERROR)
+    try:
+        out = bytes.fromhex(raw)
+    except ValueError:
+        raise VerifyInputError(HEX64_ERROR) from None
+    if len(out) != 32:
+        raise VerifyInputError(HEX64_ERROR)
+    return out
+
+
+def normalize_v(v: int) -> int:
+    if v in (27, 28):
+        return v - 27
+    if v in (0, 1):
+        return v
+    raise VerifyInputError("v must be 0/1 or 27/28")
+
+
+def normalize_address(addr: str) -> str:
+    if not addr:
+        return ""
+    a = addr.strip()
+    if not a.startswith("0x"):
+        a = "0x" + a
+    return a.lower()
+
+
+def build_signature(v: int, r: bytes, s: bytes) -> "keys.Signature":
+    if _keys is None:
+        warm()
+    try:
+        return _keys.Signature(vrs=(v, int.from_bytes(r, "big"), int.from_bytes(s, "big")))
+    except Exception as e:
+        raise VerifyInputError(f"signature_init_failed: {type(e).__name__}: {e}") from None
+
+
+def recover_address(msg_hash: bytes, sig: "keys.Signature") -> bytes:
+    """Адреса підписанта як 20 сирих байтів."""
+    try:
+        return sig.recover_public_key_from_msg_hash(msg_hash).to_canonical_address()
+    except Exception as e:
+        raise VerifyInputError(f"recover_failed: {type(e).__name__}: {e}") from None
+
+
+def checksum(addr20: bytes) -> str:
+    if _to_checksum_address is None:
+        warm()
+    return _to_checksum_address(addr20)
+
+
+def _expected_raw(addr: str) -> Optional[bytes]:
+    # невалідна expected_signer — просто не збігається (як і раніше), а не 400
+    a = normalize_address(addr)
+    if len(a) != 42:
+        return None
+    try:
+        return bytes.fromhex(a[2:])
+    except ValueError:
+        return None
+
+
+def verify_request(req: VerifyRequest, trusted: Optional[Mapping[bytes, str]] = None) -> dict:
+    """
+    Повна перевірка одного запиту; VerifyInputError на некоректних полях.
+
+    trusted — індекс довірених підписантів (20 байтів -> ім'я): "signer" у
+    відповіді — ім'я того, хто підписав, або None.
+    """
+    msg_bytes = decode_hex_32(req.msg_hash, "msg_hash")
+    r_bytes = decode_hex_32(req.r, "r")
+    s_bytes = decode_hex_32(req.s, "s")
+    v_norm = normalize_v(req.v)
+    sig = build_signature(v_norm, r_bytes, s_bytes)
+    recovered_raw = recover_address(msg_bytes, sig)
+    signer = trusted.get(recovered_raw) if trusted else None
+    if req.expected_signer is None:
+        match = signer is not None
+    else:
+        match = recovered_raw == _expected_raw(req.expected_signer)
+    return {
+        "ok": True,
+        "match": match,
+        "recovered": checksum(recovered_raw),
+        "expected": req.expected_signer,
+        "signer": signer,
+        "v_used": v_norm,
+    }
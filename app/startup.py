@@ -0,0 +1,80 @@
+"""
+Звіт про холодний старт: скільки коштував кожен етап від запуску процесу
+до готовності приймати запити.
+
+    STARTUP.mark("import_framework")     # час від попередньої позначки
+    with STARTUP.phase("upstream_warm"): # час блоку
+        ...
+    STARTUP.finish()                     # лог + r4_startup_phase_ms{phase}
+
+Перший етап — "before_app": від старту процесу (/proc/self/stat) до імпорту
+цього модуля, тобто інтерпретатор + uvicorn.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.startup")
+
+PHASE_MS = REGISTRY.gauge("r4_startup_phase_ms", "Cold start cost per phase in milliseconds", ("phase",))
+
+
+def process_age() -> Optional[float]:
+    """Секунди від старту процесу (Linux); None, якщо /proc недоступний."""
+    try:
+        with open("/proc/self/stat") as f:
+            # comm може містити пробіли — поля рахуємо після ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupReport:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        age = process_age()
+        if age is not None:
+            self.phases["before_app"] = age * 1000.0
+        self._last = time.perf_counter()
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases[name] = (now - self._last) * 1000.0
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - t0) * 1000.0
+            self._last = time.perf_counter()
+
+    def total_ms(self) -> float:
+        return sum(self.phases.values())
+
+    def finish(self) -> None:
+        for name, ms in self.phases.items():
+            PHASE_MS.set(round(ms, 3), phase=name)
+        PHASE_MS.set(round(self.total_ms(), 3), phase="total")
+        log.info(
+            "startup %.0f ms: %s",
+            self.total_ms(),
+            ", ".join(f"{name} {ms:.1f}" for name, ms in self.phases.items()),
+        )
+
+    def as_dict(self) -> dict:
+        return {name: round(ms, 3) for name, ms in self.phases.items()}
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,179 @@
+"""
+Спільний пул з'єднань до core / VRF і розбивка часу запиту на фази.
+
+Фази:
+    auth     – перевірка API-ключа
+    pool     – від старту запиту в httpx до отримання з'єднання з пулу
+    connect  – TCP (+TLS) connect, якщо з'єднання нове
+    ttfb     – від відправки заголовків до заголовків відповіді upstream
+    body     – дочитування тіла відповіді upstream
+    write    – відправка відповіді клієнту (лише в метрики: на момент
+               заголовків вона ще не відома)
+
+Таймінги upstream беруться з trace-подій httpcore (extensions={"trace": ...}),
+тобто без обгорток над транспортом: одна perf_counter() на подію.
+"""
+
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from .metrics import REGISTRY
+
+
+PHASE_MS = REGISTRY.histogram(
+    "r4_request_phase_ms",
+    "Per-request phase duration in milliseconds",
+    ("route", "phase"),
+)
+UPSTREAM_LATENCY_MS = REGISTRY.histogram(
+    "r4_upstream_latency_ms",
+    "Upstream request latency in milliseconds (successful responses)",
+    ("upstream", "endpoint"),
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "r4_upstream_requests_total",
+    "Upstream requests by upstream and outcome",
+    ("upstream", "status"),
+)
+
+# порядок у Server-Timing
+SERVER_TIMING_PHASES = ("auth", "pool", "connect", "ttfb", "body")
+
+
+class PhaseTimer:
+    """
+    Таймінги одного запиту. Живе в request.state.timer; ServiceHeadersMiddleware
+    додає Server-Timing (якщо expose) і скидає фази в метрики після відповіді.
+    """
+
+    __slots__ = ("route", "expose", "phases", "_marks", "_t_upstream")
+
+    def __init__(self, route: str, expose: bool = False):
+        self.route = route
+        self.expose = expose
+        self.phases: Dict[str, float] = {}
+        self._marks: Dict[str, float] = {}
+        self._t_upstream = 0.0
+
+    def add(self, phase: str, ms: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + ms
+
+    async def trace(self, event: str, info: dict) -> None:
+        # "http11.send_request_headers.started" -> "send_request_headers.started"
+        self._marks[event.partition(".")[2]] = time.perf_counter()
+
+    def start_upstream(self) -> None:
+        self._marks.clear()
+        self._t_upstream = time.perf_counter()
+
+    def finish_upstream(self) -> None:
+        m = self._marks
+        sent = m.get("send_request_headers.started")
+        if sent is None:
+            return
+
+        connect = 0.0
+        for step in ("connect_tcp", "start_tls"):
+            a, b = m.get(step + ".started"), m.get(step + ".complete")
+            if a is not None and b is not None:
+                connect += b - a
+        first_io = m.get("connect_tcp.started", sent)
+
+        self.add("pool", (first_io - self._t_upstream) * 1000.0)
+        if connect:
+            self.add("connect", connect * 1000.0)
+        headers_done = m.get("receive_response_headers.complete")
+        if headers_done is not None:
+            self.add("ttfb", (headers_done - sent) * 1000.0)
+        b0, b1 = m.get("receive_response_body.started"), m.get("receive_response_body.complete")
+        if b0 is not None and b1 is not None:
+            self.add("body", (b1 - b0) * 1000.0)
+
+    def server_timing(self, total_ms: float) -> bytes:
+        parts = [
+            "%s;dur=%.3f" % (p, self.phases[p]) for p in SERVER_TIMING_PHASES if p in self.phases
+        ]
+        parts.append("gw;dur=%.3f" % total_ms)
+        return ", ".join(parts).encode("latin-1")
+
+    def record(self, write_ms: float) -> None:
+        self.add("write", write_ms)
+        route = self.route
+        for phase, ms in self.phases.items():
+            PHASE_MS.observe(ms, route=route, phase=phase)
+
+
+def endpoint_of(url: str) -> str:
+    # "http://vrf:8081/random_dual_full" -> "random_dual_full"
+    return url.rsplit("/", 1)[-1]
+
+
+class Upstream:
+    """Один httpx.AsyncClient на процес замість нового клієнта на кожен запит."""
+
+    def __init__(
+        self,
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+        keepalive_expiry: float = 30.0,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits)
+        return self._client
+
+    def open(self) -> None:
+        # SSL-контекст і пул створюються тут, а не на першому запиті
+        self.client
+
+    async def get(
+        self,
+        name: str,
+        url: str,
+        *,
+        params: dict,
+        headers: dict,
+        timeout: float,
+        timer: Optional[PhaseTimer] = None,
+    ) -> httpx.Response:
+        extensions = None
+        if timer is not None:
+            extensions = {"trace": timer.trace}
+            timer.start_upstream()
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.get(
+                url, params=params, headers=headers, timeout=timeout, extensions=extensions
+            )
+        except httpx.HTTPError:
+            UPSTREAM_REQUESTS.inc(upstream=name, status="error")
+            raise
+        if timer is not None:
+            timer.finish_upstream()
+        UPSTREAM_LATENCY_MS.observe(
+            (time.perf_counter() - t0) * 1000.0, upstream=name, endpoint=endpoint_of(url)
+        )
+        UPSTREAM_REQUESTS.inc(upstream=name, status=str(r.status_code))
+        return r
+
+    def latency_quantile(self, name: str, url: str, q: float, min_samples: int) -> Optional[float]:
+        """Квантиль латентності upstream у мс або None, якщо вибірка ще мала."""
+        endpoint = endpoint_of(url)
+        if UPSTREAM_LATENCY_MS.count(upstream=name, endpoint=endpoint) < min_samples:
+            return None
+        return UPSTREAM_LATENCY_MS.quantile(q, upstream=name, endpoint=endpoint)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,263 @@
+"""
+Облік використання по тенантах / ключах для білінгу.
+
+На шляху запиту — лише інкремент у dict (bucket, tenant, key_id, route) ->
+лічильники, без await і без локів: у процесі один event loop, тож кожен
+воркер — окремий шард зі своїм dict, а сумування шардів відбувається в sink.
+bucket — година (bucket_seconds), у яку запит стався, а не в яку його скинули.
+
+Фоновий task раз на interval забирає накопичені дельти (підміною dict,
+атомарно для event loop) і пише їх у sink у потоці; лише після успішного
+запису вони переходять у in-memory totals для /v1/usage. Якщо запис упав,
+дельти повертаються в чергу й поїдуть наступним flush. Sink:
+- *.db / *.sqlite — таблиця usage, upsert по (bucket, key_id, route), тож
+  кілька воркерів/рестартів коректно сумуються;
+- інакше — JSONL, рядок на дельту.
+Останній flush — на shutdown.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metrics import REGISTRY
+
+
+log = logging.getLogger("r4.usage")
+
+FLUSHES = REGISTRY.counter("r4_usage_flush_total", "Usage sink flushes", ("result",))
+PENDING = REGISTRY.gauge("r4_usage_pending_rows", "Usage rows waiting for the next flush")
+
+# порядок полів у лічильниках
+FIELDS = ("requests", "errors", "bytes_out", "entropy_bytes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    bucket        INTEGER NOT NULL,
+    tenant        TEXT NOT NULL,
+    key_id        TEXT NOT NULL,
+    route         TEXT NOT NULL,
+    requests      INTEGER NOT NULL,
+    errors        INTEGER NOT NULL,
+    bytes_out     INTEGER NOT NULL,
+    entropy_bytes INTEGER NOT NULL,
+    PRIMARY KEY (bucket, key_id, route)
+);
+"""
+
+SQL_UPSERT = """
+INSERT INTO usage (bucket, tenant, key_id, route, requests, errors, bytes_out, entropy_bytes)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket, key_id, route) DO UPDATE SET
+    requests = requests + excluded.requests,
+    errors = errors + excluded.errors,
+    bytes_out = bytes_out + excluded.bytes_out,
+    entropy_bytes = entropy_bytes + excluded.entropy_bytes
+"""
+
+# (bucket, tenant, key_id, route)
+Key = Tuple[int, str, str, str]
+
+
+class UsageMeter:
+    def __init__(self, sink: str = "", interval: float = 10.0, bucket_seconds: int = 3600):
+        self.sink = sink
+        self.interval = interval
+        self.bucket_seconds = bucket_seconds
+        self.since = int(time.time())
+        self._delta: Dict[Key, List[int]] = {}
+        # дельти, що зараз пишуться в sink: ще не в totals, але вже не в _delta
+        self._flushing: Dict[Key, List[int]] = {}
+        self._totals: Dict[str, Dict[Tuple[str, str], List[int]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ---- шлях запиту ----
+
+    def record(self, tenant: str, key_id: str, route: str, error: bool, bytes_out: int, entropy: int) -> None:
+        now = int(time.time())
+        k = (now - now % self.bucket_seconds, tenant, key_id, route)
+        c = self._delta.get(k)
+        if c is None:
+            c = self._delta[k] = [0, 0, 0, 0]
+        c[0] += 1
+        c[1] += error
+        c[2] += bytes_out
+        c[3] += entropy
+
+    def export(self) -> Dict[str, List[list]]:
+        """Усі totals цього процесу (з дельтами) — для знімка в спільній пам'яті."""
+        out: Dict[str, List[list]] = {}
+        for tenant, rows in self._totals.items():
+            out[tenant] = [[key_id, route, *c] for (key_id, route), c in rows.items()]
+        for delta in (self._flushing, self._delta):
+            for (_, tenant, key_id, route), c in delta.items():
+                out.setdefault(tenant, []).append([key_id, route, *c])
+        return out
+
+    def usage(self, tenant: str, peers: Iterable[Dict[str, List[list]]] = ()) -> dict:
+        """
+        Totals тенанта з пам'яті (включно з ще не скинутими дельтами);
+        peers — export() інших воркерів, якщо їх кілька.
+        """
+        merged: Dict[Tuple[str, str], List[int]] = {
+            k: list(v) for k, v in self._totals.get(tenant, {}).items()
+        }
+        rows = [
+            (key_id, route, c)
+            for delta in (self._flushing, self._delta)
+            for (_, t, key_id, route), c in delta.items()
+            if t == tenant
+        ]
+        for peer in peers:
+            rows.extend((row[0], row[1], row[2:]) for row in peer.get(tenant, ()))
+        for key_id, route, c in rows:
+            acc = merged.setdefault((key_id, route), [0, 0, 0, 0])
+            for i, v in enumerate(c):
+                acc[i] += v
+
+        total = [0, 0, 0, 0]
+        keys: Dict[str, Dict[str, dict]] = {}
+        for (key_id, route), c in sorted(merged.items()):
+            keys.setdefault(key_id, {})[route] = dict(zip(FIELDS, c))
+            for i, v in enumerate(c):
+                total[i] += v
+        return {"tenant": tenant, "since": self.since, "total": dict(zip(FIELDS, total)), "keys": keys}
+
+    # ---- flush ----
+
+    def _requeue(self, delta: Dict[Key, List[int]]) -> None:
+        for k, c in delta.items():
+            acc = self._delta.get(k)
+            if acc is None:
+                self._delta[k] = c
+            else:
+                for i, v in enumerate(c):
+                    acc[i] += v
+
+    def _commit(self, delta: Dict[Key, List[int]]) -> None:
+        for (_, tenant, key_id, route), c in delta.items():
+            acc = self._totals.setdefault(tenant, {}).setdefault((key_id, route), [0, 0, 0, 0])
+            for i, v in enumerate(c):
+                acc[i] += v
+
+    def _write(self, delta: Dict[Key, List[int]]) -> None:
+        now = int(time.time())
+        if self.sink.endswith((".db", ".sqlite", ".sqlite3")):
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.sink, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode = WAL")
+                self._conn.execute("PRAGMA busy_timeout = 5000")
+                self._conn.executescript(SCHEMA)
+            rows = [(b, t, k, r, *c) for (b, t, k, r), c in delta.items()]
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(SQL_UPSERT, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        else:
+            lines = [
+                json.dumps(
+                    {"ts": now, "bucket": b, "pid": os.getpid(), "tenant": t, "key_id": k, "route": r,
+                     **dict(zip(FIELDS, c))},
+                    separators=(",", ":"),
+                )
+                for (b, t, k, r), c in delta.items()
+            ]
+            with open(self.sink, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> None:
+        # підміна dict — атомарна для event loop; record() далі пише в новий
+        delta, self._delta = self._delta, {}
+        PENDING.set(0)
+        if not delta:
+            return
+        if not self.sink:
+            self._commit(delta)
+            return
+        self._flushing = delta
+        try:
+            await asyncio.to_thread(self._write, delta)
+        except Exception:
+            # не губимо: дельти повертаються в чергу й підуть наступним flush
+            self._requeue(delta)
+            FLUSHES.inc(result="error")
+            log.exception("usage flush of %d rows failed; will retry", len(delta))
+            return
+        finally:
+            self._flushing = {}
+        self._commit(delta)
+        FLUSHES.inc(result="ok")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            PENDING.set(len(self._delta))
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            if self.sink and os.path.dirname(self.sink):
+                os.makedirs(os.path.dirname(self.sink), exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class UsageMiddleware:
+    """
+    Pure-ASGI: після відповіді записує (тенант, ключ, шаблон роуту, байти).
+    Облікуються лише запити, що пройшли require_api_key (state["api_key"]);
+    entropy_bytes — з state["entropy_bytes"], лише для успішних відповідей.
+    """
+
+    def __init__(self, app, meter: UsageMeter):
+        self.app = app
+        self.meter = meter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 0
+        sent = 0
+
+        async def send_and_count(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            state = scope.get("state") or {}
+            key = state.get("api_key")
+            if key is not None:
+                ok = 0 < status < 400
+                route = getattr(scope.get("route"), "path", scope["path"])
+                self.meter.record(
+                    key.tenant, key.key_id, route, not ok, sent,
+                    state.get("entropy_bytes", 0) if ok else 0,
+                )
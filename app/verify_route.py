@@ -1,7 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from eth_keys import keys
-from eth_utils import keccak, to_checksum_address
+
+from .sigverify import (
+    VerifyInputError,
+    build_signature,
+    checksum,
+    decode_hex_32,
+    normalize_v,
+    recover_address,
+)
 
 router = APIRouter()
 
@@ -12,37 +19,21 @@ class VerifyRequest(BaseModel):
     v: int                 # 27/28 або 0/1
     expected_signer: str   # 0x... (чек-сумний чи ні — не критично)
 
-def _clean_hex64(s: str, field: str) -> str:
-    h = s.lower().lstrip("0x")
-    if len(h) != 64 or any(c not in "0123456789abcdef" for c in h):
-        raise HTTPException(status_code=400, detail="msg_hash/r/s must be 64-hex (no 0x)")
-    return h
-
 @router.post("/v1/verify")
 def verify(req: VerifyRequest):
-    # нормалізація полів
-    msg_hex = _clean_hex64(req.msg_hash, "msg_hash")
-    r_hex   = _clean_hex64(req.r, "r")
-    s_hex   = _clean_hex64(req.s, "s")
-
-    # нормалізуємо v до {0,1}
-    v = int(req.v)
-    if v in (27, 28):
-        v -= 27
-    if v not in (0, 1):
-        raise HTTPException(status_code=400, detail="v must be 0/1 or 27/28")
-
-    # конвертації
-    msg_hash_bytes = bytes.fromhex(msg_hex)
-    r = int(r_hex, 16)
-    s = int(s_hex, 16)
+    # нормалізація полів + конвертації (спільний шлях з app.main)
+    try:
+        msg_hash_bytes = decode_hex_32(req.msg_hash, "msg_hash")
+        r = decode_hex_32(req.r, "r")
+        s = decode_hex_32(req.s, "s")
+        v = normalize_v(int(req.v))
+    except VerifyInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        sig = keys.Signature(vrs=(v, r, s))
-        pub = sig.recover_public_key_from_msg_hash(msg_hash_bytes)
-        recovered_addr = "0x" + keccak(pub.to_bytes())[-20:].hex()
-        recovered_cs   = to_checksum_address(recovered_addr)
-        expected_cs    = to_checksum_address(req.expected_signer)
+        sig = build_signature(v, r, s)
+        recovered_cs = checksum(recover_address(msg_hash_bytes, sig))
+        expected_cs    = checksum(req.expected_signer)
         return {
             "ok": True,
             "match": recovered_cs == expected_cs,
@@ -0,0 +1,144 @@
+"""
+Постійний WebSocket-канал запит/відповідь (/v1/ws).
+
+Клієнт автентифікується один раз на handshake, далі шле дрібні JSON-кадри
+    {"id": 7, "op": "random", "n": 32}
+    {"id": 8, "op": "vrf", "sig": "ecdsa"}
+і отримує відповіді в порядку завершення, а не надсилання:
+    {"id": 8, "ok": true, "result": {...}}
+    {"id": 7, "ok": false, "status": 504, "error": "core_timeout"}
+
+Ключ перевіряється й на кожен запит: op дозволений, лише якщо key.allows()
+пропускає відповідний HTTP-роут (random -> /v1/random, vrf -> /v1/vrf або
+/v1/random_dual_full, verify -> /v1/verify) — інакше status 403, як у HTTP.
+Будь-який непередбачений виняток в op — status 500 з тим самим id, а не
+мовчки загублена відповідь.
+
+Flow control: не більше max_inflight запитів у роботі на з'єднання. Поки
+вікно повне, наступний кадр просто не читається — клієнт упирається у
+TCP-вікно, а пам'ять gateway не росте. Повільний читач так само гальмує
+всіх: відправка серіалізована через один lock.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from starlette.websockets import WebSocket
+
+from .apikeys import ApiKey
+from .metrics import REGISTRY
+from .usage import UsageMeter
+
+
+log = logging.getLogger("r4.ws")
+
+CONNECTIONS = REGISTRY.gauge("r4_ws_connections", "Open /v1/ws connections")
+MESSAGES = REGISTRY.counter("r4_ws_messages_total", "Requests handled over /v1/ws", ("op", "result"))
+OP_MS = REGISTRY.histogram("r4_ws_op_ms", "Per-request handling time over /v1/ws in milliseconds", ("op",))
+
+# op(msg, key) -> (JSON-кодований result, entropy bytes для обліку)
+Op = Callable[[dict, ApiKey], Awaitable[Tuple[str, int]]]
+# route(msg) -> HTTP-роут, дозвіл на який потрібен ключу для цього op
+Route = Callable[[dict], str]
+
+
+class WsError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class WsSession:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        key: ApiKey,
+        ops: Dict[str, Op],
+        max_inflight: int = 32,
+        meter: Optional[UsageMeter] = None,
+        routes: Optional[Dict[str, Route]] = None,
+    ):
+        self.ws = websocket
+        self.key = key
+        self.ops = ops
+        self.routes = routes or {}
+        self.max_inflight = max_inflight
+        self.meter = meter
+        self._send_lock = asyncio.Lock()
+
+    async def _send(self, frame: str) -> None:
+        async with self._send_lock:
+            await self.ws.send_text(frame)
+
+    async def _handle(self, raw: str) -> None:
+        t0 = time.perf_counter()
+        req_id, op = "null", "invalid"
+        entropy = 0
+        try:
+            try:
+                msg = json.loads(raw)
+                req_id = json.dumps(msg.get("id"))
+                op = str(msg.get("op"))
+            except (ValueError, AttributeError):
+                raise WsError(400, "invalid_json_object")
+            handler = self.ops.get(op)
+            if handler is None:
+                op = "unknown"
+                raise WsError(400, "unknown_op")
+            route = self.routes.get(op)
+            if route is not None and not self.key.allows(route(msg)):
+                raise WsError(403, "route_not_allowed")
+            result, entropy = await handler(msg, self.key)
+            # result уже JSON (часто — сире тіло upstream), тож без повторної серіалізації
+            frame = '{"id":%s,"ok":true,"result":%s}' % (req_id, result)
+            ok = True
+        except WsError as e:
+            frame = json.dumps({"ok": False, "status": e.status, "error": e.detail}, separators=(",", ":"))
+            frame = '{"id":%s,%s' % (req_id, frame[1:])
+            ok = False
+        except Exception:
+            log.exception("ws op %s failed", op)
+            frame = '{"id":%s,"ok":false,"status":500,"error":"internal_error"}' % req_id
+            ok = False
+
+        MESSAGES.inc(op=op, result="ok" if ok else "error")
+        OP_MS.observe((time.perf_counter() - t0) * 1000.0, op=op)
+        if self.meter is not None:
+            self.meter.record(
+                self.key.tenant, self.key.key_id, f"/v1/ws:{op}", not ok, len(frame), entropy if ok else 0
+            )
+        await self._send(frame)
+
+    async def run(self) -> None:
+        slots = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+
+        def done(task: asyncio.Task) -> None:
+            tasks.discard(task)
+            slots.release()
+            if not task.cancelled() and task.exception() is not None:
+                log.warning("ws request failed: %r", task.exception())
+
+        CONNECTIONS.inc()
+        try:
+            while True:
+                # вікно повне — не читаємо наступний кадр (backpressure на клієнта)
+                await slots.acquire()
+                message = await self.ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    slots.release()
+                    break
+                raw = message.get("text")
+                if raw is None:
+                    raw = (message.get("bytes") or b"").decode("utf-8", "replace")
+                task = asyncio.create_task(self._handle(raw))
+                tasks.add(task)
+                task.add_done_callback(done)
+        finally:
+            CONNECTIONS.inc(-1)
+            for task in list(tasks):
+                task.cancel()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+r4client проти «звичайного» httpx-коду сервісів.
+
+Піднімає core-dev + gateway (як bench/loadtest.py) або бере вже запущений
+(--gateway-url) і ганяє однакове навантаження — N паралельних воркерів,
+кожен викликає операцію в циклі --duration секунд — у варіантах:
+
+- httpx.per_call   — новий httpx.AsyncClient на кожен виклик (TCP connect щоразу);
+- httpx.pooled     — один httpx.AsyncClient, запит на кожен виклик;
+- r4client         — пул + злиття паралельних викликів у batch-запити;
+- r4client.prefetch — те саме + локальний буфер ентропії (лише random).
+
+Операції (--ops): random — random(32) / GET /v1/random?n=32;
+verify — перевірка одного доказу dev-VRF / POST /v1/verify.
+
+Приклади:
+    python bench/client_bench.py
+    python bench/client_bench.py --ops random --concurrency 1,32 --duration 5
+    python bench/client_bench.py --gateway-url http://127.0.0.1:8082 --json client.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import PERCENTILES, Stack, _int_list, _str_list, percentile  # noqa: E402
+from r4client import AsyncClient  # noqa: E402
+
+
+# -------------------------------------------------------------------
+# Варіанти: make(base_url, api_key, op, proof) -> (call, close)
+# -------------------------------------------------------------------
+
+def _verify_body(proof: dict) -> dict:
+    return {k: proof[k] for k in ("msg_hash", "r", "s", "v")} | {"expected_signer": proof["signer_addr"]}
+
+
+def httpx_per_call(base_url, api_key, op, proof):
+    headers = {"X-API-Key": api_key}
+    body = _verify_body(proof)
+
+    async def call():
+        async with httpx.AsyncClient(base_url=base_url, headers=headers) as c:
+            if op == "random":
+                r = await c.get("/v1/random", params={"n": 32, "fmt": "hex"})
+                r.raise_for_status()
+                return bytes.fromhex(r.text)
+            r = await c.post("/v1/verify", json=body)
+            r.raise_for_status()
+            return r.json()["match"]
+
+    async def close():
+        pass
+
+    return call, close
+
+
+def httpx_pooled(base_url, api_key, op, proof):
+    c = httpx.AsyncClient(
+        base_url=base_url,
+        headers={"X-API-Key": api_key},
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
+    )
+    body = _verify_body(proof)
+
+    async def call():
+        if op == "random":
+            r = await c.get("/v1/random", params={"n": 32, "fmt": "hex"})
+            r.raise_for_status()
+            return bytes.fromhex(r.text)
+        r = await c.post("/v1/verify", json=body)
+        r.raise_for_status()
+        return r.json()["match"]
+
+    return call, c.aclose
+
+
+def _r4client(prefetch: int):
+    def make(base_url, api_key, op, proof):
+        c = AsyncClient(base_url, api_key=api_key, prefetch=prefetch)
+        args = (proof["msg_hash"], proof["r"], proof["s"], proof["v"], proof["signer_addr"])
+
+        async def call():
+            if op == "random":
+                return await c.random(32)
+            return (await c.verify(*args)).match
+
+        return call, c.aclose
+
+    return make
+
+
+VARIANTS = {
+    "httpx.per_call": httpx_per_call,
+    "httpx.pooled": httpx_pooled,
+    "r4client": _r4client(0),
+    "r4client.prefetch": _r4client(64 * 1024),
+}
+
+
+# -------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------
+
+async def _closed_loop(call, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat_ms = sorted(x * 1000.0 for x in latencies)
+    out = {"requests": len(lat_ms), "errors": errors, "rps": round(len(lat_ms) / elapsed, 1)}
+    for name, pct in PERCENTILES:
+        out[f"{name}_ms"] = round(percentile(lat_ms, pct), 3)
+    return out
+
+
+def _upstream_calls(base_url: str) -> int:
+    """Запити gateway до core/VRF — скільки HTTP-викликів дійшло до upstream."""
+    text = httpx.get(f"{base_url}/v1/metrics", params={"local": 1}).text
+    total = 0
+    for line in text.splitlines():
+        if line.startswith("r4_upstream_requests_total{"):
+            total += int(float(line.rsplit(" ", 1)[1]))
+    return total
+
+
+async def run(base_url: str, api_key: str, args) -> list:
+    async with httpx.AsyncClient(base_url=base_url, headers={"X-API-Key": api_key}) as c:
+        proof = (await c.get("/v1/vrf", params={"sig": "ecdsa"})).json()
+
+    rows = []
+    for op in args.ops:
+        for variant in args.variants:
+            if variant.endswith(".prefetch") and op != "random":
+                continue
+            for conc in args.concurrency:
+                call, close = VARIANTS[variant](base_url, api_key, op, proof)
+                try:
+                    await _closed_loop(call, conc, min(1.0, args.duration))  # прогрів
+                    before = _upstream_calls(base_url)
+                    res = await _closed_loop(call, conc, args.duration)
+                    res["upstream_calls"] = _upstream_calls(base_url) - before
+                finally:
+                    await close()
+                row = {"op": op, "variant": variant, "concurrency": conc, **res}
+                rows.append(row)
+                print(
+                    f"{op:<7} {variant:<18} c={conc:<3} {row['rps']:>9.1f} rps  "
+                    f"p50 {row['p50_ms']:>8.3f}  p99 {row['p99_ms']:>8.3f} ms  "
+                    f"upstream {row['upstream_calls']:>6}  err {row['errors']}",
+                    flush=True,
+                )
+    return rows
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--gateway-url", help="вже запущений gateway (інакше піднімається свій стек)")
+    p.add_argument("--api-key", default="demo")
+    p.add_argument("--ops", type=_str_list, default=["random", "verify"])
+    p.add_argument("--variants", type=_str_list, default=list(VARIANTS))
+    p.add_argument("--concurrency", type=_int_list, default=[1, 32])
+    p.add_argument("--duration", type=float, default=5.0)
+    p.add_argument("--json", help="записати результати у файл")
+    args = p.parse_args(argv)
+    unknown = set(args.variants) - set(VARIANTS)
+    if unknown:
+        p.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    if args.gateway_url:
+        rows = asyncio.run(run(args.gateway_url.rstrip("/"), args.api_key, args))
+    else:
+        # /v1/verify рахує recovery прямо в event loop gateway — трейси loopmon про
+        # «зависання» лише засмічують вивід бенчмарка
+        with Stack(args.api_key, {"LOOP_MONITOR_ENABLED": "0"}) as stack:
+            rows = asyncio.run(run(stack.gateway_url, args.api_key, args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
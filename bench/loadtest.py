@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test для RE4CTOR SaaS gateway.
+
+Піднімає core-dev (він же dev-VRF) + gateway через uvicorn, ганяє
+/v1/random, /v1/vrf, /v1/random_dual_full та /v1/verify у двох режимах:
+
+- closed-loop: N паралельних воркерів, кожен шле наступний запит одразу
+  після відповіді (--concurrency);
+- open-loop: запити стартують за розкладом із заданим rps (--rate), незалежно
+  від того, чи повернулись попередні. Латентність міряється від
+  *запланованого* часу старту, тож черги в gateway не ховаються
+  (coordinated omission).
+
+Результат — JSON (--out), який можна порівняти з попереднім прогоном (--compare).
+
+--entropy-source http,drbg піднімає окремий gateway на кожне значення
+ENTROPY_SOURCE (app/entropy.py) і наприкінці друкує таблицю «HTTP-хоп до core
+проти in-process джерела» для однакових точок навантаження.
+
+Приклади:
+    python bench/loadtest.py --duration 10 --concurrency 1,8,32
+    python bench/loadtest.py --rate 100,500 --routes random,vrf --out run.json
+    python bench/loadtest.py --gateway-url http://127.0.0.1:8082 --compare base.json
+    python bench/loadtest.py --routes random --entropy-source http,drbg
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = {
+    "random": ("GET", "/v1/random", {"n": 32, "fmt": "hex"}),
+    "vrf": ("GET", "/v1/vrf", {"sig": "ecdsa"}),
+    "random_dual_full": ("GET", "/v1/random_dual_full", {"sig": "dual"}),
+    "verify": ("POST", "/v1/verify", None),
+}
+
+PERCENTILES = (("p50", 50.0), ("p90", 90.0), ("p99", 99.0), ("p999", 99.9))
+
+
+# -------------------------------------------------------------------
+# Stack: core-dev + gateway
+# -------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up in {timeout:.0f}s")
+
+
+class Stack:
+    """core-dev (core + dev-VRF) і gateway як дочірні uvicorn-процеси."""
+
+    def __init__(self, api_key: str, gateway_env: Optional[dict] = None):
+        self.api_key = api_key
+        self.gateway_env = gateway_env or {}
+        self.procs: list = []
+        self.core_url = ""
+        self.gateway_url = ""
+
+    def _spawn(self, app: str, port: int, cwd: str, env: dict) -> None:
+        cmd = [
+            sys.executable, "-m", "uvicorn", app,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--no-access-log",
+        ]
+        self.procs.append(subprocess.Popen(cmd, cwd=cwd, env={**os.environ, **env}))
+
+    def __enter__(self):
+        core_port, gw_port = _free_port(), _free_port()
+        self.core_url = f"http://127.0.0.1:{core_port}"
+        self.gateway_url = f"http://127.0.0.1:{gw_port}"
+
+        self._spawn("main:app", core_port, os.path.join(ROOT, "core-dev"), {})
+        _wait_http(f"{self.core_url}/health")
+
+        env = {
+            "CORE_URL": self.core_url,
+            "VRF_URL": self.core_url,
+            "PUBLIC_API_KEY": self.api_key,
+            "INTERNAL_R4_API_KEY": self.api_key,
+            **self.gateway_env,
+        }
+        self._spawn("app.main:app", gw_port, ROOT, env)
+        _wait_http(f"{self.gateway_url}/v1/health")
+        return self
+
+    def __exit__(self, *exc):
+        for p in self.procs:
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+# -------------------------------------------------------------------
+# Stats
+# -------------------------------------------------------------------
+
+def percentile(sorted_vals: list, pct: float) -> float:
+    """Nearest-rank percentile по вже відсортованому списку."""
+    if not sorted_vals:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_vals)))
+    return sorted_vals[rank - 1]
+
+
+def summarize(latencies_s: list, errors: int, elapsed_s: float) -> dict:
+    lat_ms = sorted(x * 1000.0 for x in latencies_s)
+    ok = len(lat_ms)
+    out = {
+        "requests": ok + errors,
+        "ok": ok,
+        "errors": errors,
+        "duration_s": round(elapsed_s, 3),
+        "throughput_rps": round(ok / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "latency_ms": {},
+    }
+    for name, pct in PERCENTILES:
+        out["latency_ms"][name] = round(percentile(lat_ms, pct), 3)
+    if lat_ms:
+        out["latency_ms"]["mean"] = round(sum(lat_ms) / ok, 3)
+        out["latency_ms"]["max"] = round(lat_ms[-1], 3)
+    return out
+
+
+# -------------------------------------------------------------------
+# Load generation
+# -------------------------------------------------------------------
+
+class Target:
+    def __init__(self, client: httpx.AsyncClient, route: str, verify_body: Optional[dict]):
+        self.client = client
+        self.method, self.path, self.params = ROUTES[route]
+        self.body = verify_body if route == "verify" else None
+
+    async def fire(self) -> bool:
+        try:
+            if self.method == "POST":
+                r = await self.client.post(self.path, json=self.body)
+            else:
+                r = await self.client.get(self.path, params=self.params)
+            await r.aread()
+            return r.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+
+async def closed_loop(target: Target, concurrency: int, duration: float) -> dict:
+    latencies: list = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            ok = await target.fire()
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - t_start)
+
+
+async def open_loop(
+    target: Target,
+    rate: float,
+    duration: float,
+    arrival: str,
+    max_inflight: int,
+) -> dict:
+    latencies: list = []
+    errors = 0
+    dropped = 0
+    inflight = 0
+    tasks = set()
+
+    async def one(scheduled: float):
+        nonlocal errors, inflight
+        ok = await target.fire()
+        inflight -= 1
+        if ok:
+            # від запланованого старту, а не від фактичного
+            latencies.append(time.perf_counter() - scheduled)
+        else:
+            errors += 1
+
+    t_start = time.perf_counter()
+    next_at = t_start
+    while next_at < t_start + duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if inflight >= max_inflight:
+            # генератор сам не повинен стати вузьким місцем: рахуємо як втрату
+            dropped += 1
+        else:
+            inflight += 1
+            t = asyncio.create_task(one(next_at))
+            tasks.add(t)
+            t.add_done_callback(tasks.discard)
+        gap = 1.0 / rate
+        next_at += random.expovariate(rate) if arrival == "poisson" else gap
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    res = summarize(latencies, errors + dropped, time.perf_counter() - t_start)
+    res["target_rps"] = rate
+    res["dropped_by_generator"] = dropped
+    return res
+
+
+async def fetch_verify_body(client: httpx.AsyncClient) -> dict:
+    r = await client.get("/v1/vrf", params={"sig": "ecdsa"})
+    r.raise_for_status()
+    j = r.json()
+
+    def clean(x) -> str:
+        return str(x).lower().removeprefix("0x").rjust(64, "0")
+
+    return {
+        "msg_hash": clean(j["msg_hash"]),
+        "r": clean(j["r"]),
+        "s": clean(j["s"]),
+        "v": int(j["v"]),
+        "expected_signer": j["signer_addr"],
+    }
+
+
+async def run_suite(args, base_url: str, tags: Optional[dict] = None) -> list:
+    tags = tags or {}
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"X-API-Key": args.api_key},
+        timeout=args.timeout,
+        limits=limits,
+    ) as client:
+        verify_body = await fetch_verify_body(client) if "verify" in args.routes else None
+        results = []
+        for route in args.routes:
+            target = Target(client, route, verify_body)
+            if args.warmup > 0:
+                await closed_loop(target, 4, args.warmup)
+            for c in args.concurrency:
+                res = await closed_loop(target, c, args.duration)
+                results.append({"route": route, **tags, "mode": "closed", "concurrency": c, **res})
+                _print_row(results[-1])
+            for rate in args.rate:
+                res = await open_loop(target, rate, args.duration, args.arrival, args.max_inflight)
+                results.append({"route": route, **tags, "mode": "open", "rate": rate, **res})
+                _print_row(results[-1])
+        return results
+
+
+# -------------------------------------------------------------------
+# Output
+# -------------------------------------------------------------------
+
+def _row_key(row: dict) -> tuple:
+    return (row["route"], row["mode"], row.get("concurrency") or row.get("rate"), row.get("entropy_source"))
+
+
+def _print_row(row: dict) -> None:
+    lat = row["latency_ms"]
+    load = f"c={row['concurrency']}" if row["mode"] == "closed" else f"rps={row['rate']}"
+    source = f"[{row['entropy_source']}] " if row.get("entropy_source") else ""
+    print(
+        f"{source}{row['route']:<18} {row['mode']:<6} {load:<10} "
+        f"{row['throughput_rps']:>9.1f} rps  "
+        f"p50={lat['p50']:.2f} p90={lat['p90']:.2f} p99={lat['p99']:.2f} p999={lat['p999']:.2f} ms  "
+        f"err={row['errors']}",
+        flush=True,
+    )
+
+
+def compare(current: list, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        base = {_row_key(r): r for r in json.load(f)["results"]}
+    print(f"\n== vs {baseline_path} ==")
+    for row in current:
+        old = base.get(_row_key(row))
+        if not old:
+            continue
+
+        def delta(new: float, prev: float) -> str:
+            if not prev or math.isnan(prev) or math.isnan(new):
+                return "   n/a"
+            return f"{(new - prev) / prev * 100.0:+6.1f}%"
+
+        print(
+            f"{row['route']:<18} {row['mode']:<6} {str(_row_key(row)[2]):<8} "
+            f"rps {delta(row['throughput_rps'], old['throughput_rps'])}  "
+            f"p50 {delta(row['latency_ms']['p50'], old['latency_ms']['p50'])}  "
+            f"p99 {delta(row['latency_ms']['p99'], old['latency_ms']['p99'])}  "
+            f"p999 {delta(row['latency_ms']['p999'], old['latency_ms']['p999'])}"
+        )
+
+
+def compare_sources(results: list, sources: list) -> None:
+    """Одна точка навантаження — рядок, джерела ентропії — колонки (rps / p50 / p99)."""
+    points: dict = {}
+    for row in results:
+        key = _row_key(row)[:3]
+        points.setdefault(key, {})[row["entropy_source"]] = row
+    print("\n== entropy sources ==")
+    for (route, mode, load), by_source in points.items():
+        cells = []
+        for src in sources:
+            r = by_source.get(src)
+            if r is None:
+                continue
+            lat = r["latency_ms"]
+            cells.append(f"{src}: {r['throughput_rps']:.0f} rps p50={lat['p50']:.2f} p99={lat['p99']:.2f}")
+        print(f"{route:<18} {mode:<6} {str(load):<8} " + "  |  ".join(cells))
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(s: str) -> list:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def _float_list(s: str) -> list:
+    return [float(x) for x in s.split(",") if x.strip()]
+
+
+def _str_list(s: str) -> list:
+    return [x.strip() for x in s.split(",") if x.strip()]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--gateway-url", help="бити в уже запущений gateway замість підняття core-dev + gateway")
+    p.add_argument("--api-key", default=os.getenv("API_KEY", "demo"))
+    p.add_argument("--routes", default=",".join(ROUTES), help="comma list: " + ",".join(ROUTES))
+    p.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="closed-loop рівні, напр. 1,8,32")
+    p.add_argument("--rate", type=_float_list, default=[], help="open-loop rps, напр. 100,500")
+    p.add_argument("--arrival", choices=("constant", "poisson"), default="constant")
+    p.add_argument("--duration", type=float, default=10.0, help="секунд на кожну точку")
+    p.add_argument("--warmup", type=float, default=1.0)
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--max-inflight", type=int, default=1024, help="стеля open-loop in-flight запитів")
+    p.add_argument("--max-connections", type=int, default=256)
+    p.add_argument("--out", help="куди записати JSON з результатами")
+    p.add_argument("--compare", help="попередній JSON для порівняння")
+    p.add_argument(
+        "--entropy-source",
+        type=_str_list,
+        default=[],
+        help="порівняти значення ENTROPY_SOURCE, напр. http,drbg (окремий gateway на кожне)",
+    )
+    args = p.parse_args(argv)
+    if args.entropy_source and args.gateway_url:
+        p.error("--entropy-source needs spawned gateways, not --gateway-url")
+    args.routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    unknown = [r for r in args.routes if r not in ROUTES]
+    if unknown:
+        p.error(f"unknown routes: {unknown}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.gateway_url:
+        results = asyncio.run(run_suite(args, args.gateway_url.rstrip("/")))
+    elif args.entropy_source:
+        results = []
+        for src in args.entropy_source:
+            with Stack(args.api_key, gateway_env={"ENTROPY_SOURCE": src}) as stack:
+                results += asyncio.run(run_suite(args, stack.gateway_url, {"entropy_source": src}))
+    else:
+        with Stack(args.api_key) as stack:
+            results = asyncio.run(run_suite(args, stack.gateway_url))
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "gateway_url": args.gateway_url or "spawned",
+            "duration_s": args.duration,
+            "arrival": args.arrival,
+            "entropy_sources": args.entropy_source or None,
+        },
+        "results": results,
+    }
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwritten {args.out}")
+    if len(args.entropy_source) > 1:
+        compare_sources(results, args.entropy_source)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
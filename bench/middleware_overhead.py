@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Накладні витрати middleware-стеку gateway на один запит.
+
+Ганяє ASGI-застосунок напряму (без мережі й uvicorn), щоб було видно саме
+вартість middleware:
+
+- bare:       FastAPI без middleware
+- legacy:     CORSMiddleware + @app.middleware("http") (BaseHTTPMiddleware)
+- pure_asgi:  CORSMiddleware + app.middleware.ServiceHeadersMiddleware
+
+    python bench/middleware_overhead.py [--requests 20000] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from app.middleware import ServiceHeadersMiddleware  # noqa: E402
+
+SVC_HEADERS = {
+    "X-R4-Gateway-Version": "bench",
+    "X-R4-Core-URL": "http://core:8080",
+    "X-R4-VRF-URL": "http://vrf:8081",
+}
+
+
+def _routes(app: FastAPI) -> FastAPI:
+    @app.get("/v1/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(16):
+                yield b"x" * 1024
+
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+    return app
+
+
+def _cors(app: FastAPI) -> None:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://re4ctor.com"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+
+def build_bare() -> FastAPI:
+    return _routes(FastAPI())
+
+
+def build_legacy() -> FastAPI:
+    app = _routes(FastAPI())
+    _cors(app)
+
+    @app.middleware("http")
+    async def add_svc_headers(request: Request, call_next):
+        resp = await call_next(request)
+        for k, v in SVC_HEADERS.items():
+            resp.headers[k] = v
+        return resp
+
+    return app
+
+
+def build_pure_asgi() -> FastAPI:
+    app = _routes(FastAPI())
+    _cors(app)
+    app.add_middleware(ServiceHeadersMiddleware, headers=SVC_HEADERS)
+    return app
+
+
+async def drive(app, path: str, n: int) -> float:
+    """Середній час одного запиту, мікросекунд."""
+    scope_tpl = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"origin", b"https://re4ctor.com")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8082),
+    }
+
+    never = asyncio.Event()
+
+    def make_receive():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # як справжній сервер: далі лише чекаємо disconnect
+            await never.wait()
+
+        return receive
+
+    async def send(message):
+        pass
+
+    # прогрів (роутер, кеші Starlette)
+    for _ in range(200):
+        await app(dict(scope_tpl), make_receive(), send)
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope_tpl), make_receive(), send)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+async def run(n: int) -> dict:
+    results = {}
+    for path in ("/v1/health", "/stream"):
+        for name, build in (("bare", build_bare), ("legacy", build_legacy), ("pure_asgi", build_pure_asgi)):
+            us = await drive(build(), path, n)
+            results[f"{path} {name}"] = round(us, 2)
+            print(f"{path:<12} {name:<10} {us:>9.2f} us/req")
+    for path in ("/v1/health", "/stream"):
+        bare = results[f"{path} bare"]
+        legacy = results[f"{path} legacy"] - bare
+        pure = results[f"{path} pure_asgi"] - bare
+        print(f"{path:<12} middleware overhead: legacy {legacy:.2f} us -> pure_asgi {pure:.2f} us")
+    return results
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--requests", type=int, default=20000)
+    p.add_argument("--json", help="записати результати у файл")
+    args = p.parse_args(argv)
+
+    results = asyncio.run(run(args.requests))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark hot path-у /v1/verify: кожна стадія окремо.
+
+Порівнює:
+- legacy app/main.py:        strip/lower + посимвольна перевірка по set + binascii.unhexlify + int(hex, 16)
+- legacy app/verify_route.py: lower/lstrip("0x") + посимвольна перевірка по рядку + bytes.fromhex
+- regex / translate варіанти перевірки hex
+- app.sigverify.decode_hex_32 (спільний шлях: одна bytes.fromhex + перевірка довжини)
+
+та вартість keys.Signature, recover і нормалізації адреси.
+
+    python bench/verify_micro.py [--number 20000] [--json out.json]
+"""
+
+import argparse
+import binascii
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_keys import keys  # noqa: E402
+
+from app import sigverify  # noqa: E402
+
+
+# -------------------------------------------------------------------
+# Legacy реалізації (як були до спільного app/sigverify.py)
+# -------------------------------------------------------------------
+
+HEX_CHARS = set("0123456789abcdef")
+
+
+def legacy_main_clean_hex_64(s: str) -> str:
+    raw = s.strip().lower()
+    if raw.startswith("0x"):
+        raw = raw[2:]
+    if len(raw) != 64 or any(c not in HEX_CHARS for c in raw):
+        raise ValueError("bad hex")
+    return raw
+
+
+def legacy_route_clean_hex64(s: str) -> str:
+    h = s.lower().lstrip("0x")
+    if len(h) != 64 or any(c not in "0123456789abcdef" for c in h):
+        raise ValueError("bad hex")
+    return h
+
+
+def legacy_normalize_address(addr: str) -> str:
+    a = addr.strip()
+    if not a.startswith("0x"):
+        a = "0x" + a
+    return a.lower()
+
+
+# -------------------------------------------------------------------
+# Альтернативні перевірки hex
+# -------------------------------------------------------------------
+
+_HEX64_RE = re.compile(r"(?:0[xX])?([0-9a-fA-F]{64})")
+
+
+def regex_decode(s: str) -> bytes:
+    m = _HEX64_RE.fullmatch(s.strip())
+    if m is None:
+        raise ValueError("bad hex")
+    return bytes.fromhex(m.group(1))
+
+
+_NOT_HEX = str.maketrans("", "", "0123456789abcdefABCDEF")
+
+
+def translate_decode(s: str) -> bytes:
+    raw = s.strip()
+    if raw[:2] in ("0x", "0X"):
+        raw = raw[2:]
+    if len(raw) != 64 or raw.translate(_NOT_HEX):
+        raise ValueError("bad hex")
+    return bytes.fromhex(raw)
+
+
+# -------------------------------------------------------------------
+# Fixture
+# -------------------------------------------------------------------
+
+def make_fixture() -> dict:
+    pk = keys.PrivateKey(b"\x11" * 32)
+    msg = bytes(range(32))
+    sig = pk.sign_msg_hash(msg)
+    return {
+        "msg_hash": "0x" + msg.hex(),
+        "r": "0x" + sig.r.to_bytes(32, "big").hex(),
+        "s": "0x" + sig.s.to_bytes(32, "big").hex(),
+        "v": sig.v + 27,
+        "expected_signer": pk.public_key.to_checksum_address(),
+    }
+
+
+def pipeline_legacy_main(req: dict) -> bool:
+    msg_hex = legacy_main_clean_hex_64(req["msg_hash"])
+    r_hex = legacy_main_clean_hex_64(req["r"])
+    s_hex = legacy_main_clean_hex_64(req["s"])
+    v = req["v"] - 27 if req["v"] in (27, 28) else req["v"]
+    msg = binascii.unhexlify(msg_hex)
+    sig = keys.Signature(vrs=(v, int(r_hex, 16), int(s_hex, 16)))
+    recovered = sig.recover_public_key_from_msg_hash(msg).to_checksum_address()
+    return legacy_normalize_address(recovered) == legacy_normalize_address(req["expected_signer"])
+
+
+def pipeline_shared(req: dict) -> bool:
+    msg = sigverify.decode_hex_32(req["msg_hash"], "msg_hash")
+    r = sigverify.decode_hex_32(req["r"], "r")
+    s = sigverify.decode_hex_32(req["s"], "s")
+    v = sigverify.normalize_v(req["v"])
+    addr = sigverify.recover_address(msg, sigverify.build_signature(v, r, s))
+    return "0x" + addr.hex() == sigverify.normalize_address(req["expected_signer"])
+
+
+# -------------------------------------------------------------------
+# Runner
+# -------------------------------------------------------------------
+
+def bench(fn, number: int, repeat: int = 5) -> float:
+    """Найкращий з repeat прогонів, мікросекунд на виклик."""
+    best = min(timeit.repeat(fn, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--number", type=int, default=20000, help="викликів на прогін для дешевих стадій")
+    p.add_argument("--json", help="записати результати у файл")
+    args = p.parse_args(argv)
+
+    req = make_fixture()
+    h = req["r"]
+    h_plain = h[2:]
+    msg = sigverify.decode_hex_32(req["msg_hash"], "msg_hash")
+    r_b = sigverify.decode_hex_32(req["r"], "r")
+    s_b = sigverify.decode_hex_32(req["s"], "s")
+    v = req["v"] - 27
+    sig = sigverify.build_signature(v, r_b, s_b)
+    addr = sigverify.recover_address(msg, sig)
+    # реєстр довірених підписантів (app/signers.py): сирі 20 байтів -> ім'я
+    trusted = {bytes([i]) * 20: f"node-{i}" for i in range(64)}
+    trusted[addr] = "vrf"
+    assert pipeline_legacy_main(req) and pipeline_shared(req)
+
+    n = args.number
+    n_slow = max(50, n // 200)
+    stages = [
+        ("hex.legacy_main (set, per char)", lambda: legacy_main_clean_hex_64(h), n),
+        ("hex.legacy_verify_route (str, per char)", lambda: legacy_route_clean_hex64(h_plain), n),
+        ("hex.regex + fromhex", lambda: regex_decode(h), n),
+        ("hex.translate + fromhex", lambda: translate_decode(h), n),
+        ("hex.shared decode_hex_32", lambda: sigverify.decode_hex_32(h, "r"), n),
+        ("decode.binascii.unhexlify", lambda: binascii.unhexlify(h_plain), n),
+        ("decode.int(hex, 16)", lambda: int(h_plain, 16), n),
+        ("decode.int.from_bytes", lambda: int.from_bytes(r_b, "big"), n),
+        ("keys.Signature(vrs=...)", lambda: sigverify.build_signature(v, r_b, s_b), n // 10),
+        ("recover_public_key -> address", lambda: sigverify.recover_address(msg, sig), n_slow),
+        ("to_checksum_address", lambda: sigverify.checksum(b"\x11" * 20), n // 10),
+        ("normalize_address", lambda: legacy_normalize_address(req["expected_signer"]), n),
+        ("signer.expected_signer (normalize + str ==)",
+         lambda: "0x" + addr.hex() == sigverify.normalize_address(req["expected_signer"]), n),
+        ("signer.trusted index (dict.get bytes)", lambda: trusted.get(addr), n),
+        ("pipeline.legacy_main", lambda: pipeline_legacy_main(req), n_slow),
+        ("pipeline.shared", lambda: pipeline_shared(req), n_slow),
+    ]
+
+    results = {}
+    for name, fn, number in stages:
+        us = bench(fn, number)
+        results[name] = round(us, 3)
+        print(f"{name:<42} {us:>12.3f} us")
+
+    # ×3: msg_hash, r, s
+    legacy_hex = results["hex.legacy_main (set, per char)"] * 3 + results["decode.binascii.unhexlify"] + results["decode.int(hex, 16)"] * 2
+    shared_hex = results["hex.shared decode_hex_32"] * 3 + results["decode.int.from_bytes"] * 2
+    print(f"\nvalidation+decoding per request: legacy {legacy_hex:.3f} us -> shared {shared_hex:.3f} us "
+          f"({legacy_hex / shared_hex:.1f}x)")
+    results["summary"] = {
+        "validation_decoding_legacy_us": round(legacy_hex, 3),
+        "validation_decoding_shared_us": round(shared_hex, 3),
+        "speedup": round(legacy_hex / shared_hex, 2),
+    }
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
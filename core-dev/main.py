@@ -1,9 +1,21 @@
 from fastapi import FastAPI, Query
 from fastapi.responses import PlainTextResponse, JSONResponse
+from datetime import datetime, timezone
+import os
 import secrets
 
+from eth_keys import keys
+from eth_utils import keccak
+
 app = FastAPI()
 
+# dev-VRF: фіксований ключ, щоб signer_addr був стабільним між рестартами.
+# НЕ для продакшну — лише щоб gateway (/v1/vrf, /v1/verify, бенчмарки) мав з чим говорити.
+DEV_VRF_PRIVKEY = os.getenv("DEV_VRF_PRIVKEY", "11" * 32).strip().removeprefix("0x")
+_vrf_key = keys.PrivateKey(bytes.fromhex(DEV_VRF_PRIVKEY))
+_vrf_addr = _vrf_key.public_key.to_checksum_address()
+
+
 @app.get("/health")
 def health():
     return {"ok": True}
@@ -16,3 +28,35 @@ def random(n: int = Query(32, ge=1, le=4096), fmt: str = Query("hex")):
         return PlainTextResponse(raw.hex(), media_type="text/plain")
     # "json": віддаємо так само, як робить gateway при прозорому режимі
     return JSONResponse({"hex": raw.hex(), "n": n, "source": "core-dev"})
+
+
+def _dev_proof() -> dict:
+    rnd = secrets.randbits(32)
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    msg_hash = keccak(rnd.to_bytes(32, "big") + ts.encode())
+    sig = _vrf_key.sign_msg_hash(msg_hash)
+    return {
+        "random": rnd,
+        "timestamp": ts,
+        "hash_alg": "Keccak-256",
+        "signature_type": "ECDSA(secp256k1)",
+        "v": sig.v + 27,
+        "r": "0x" + sig.r.to_bytes(32, "big").hex(),
+        "s": "0x" + sig.s.to_bytes(32, "big").hex(),
+        "msg_hash": "0x" + msg_hash.hex(),
+        "signer_addr": _vrf_addr,
+        "pq_scheme": None,
+    }
+
+
+@app.get("/random_dual")
+def random_dual(sig: str = Query("ecdsa")):
+    # dev-VRF: лише ECDSA, ML-DSA-65 тут немає
+    return _dev_proof()
+
+
+@app.get("/random_dual_full")
+def random_dual_full(sig: str = Query("dual")):
+    proof = _dev_proof()
+    proof.update({"sig_pq": None, "pq_pubkey": None, "source": "core-dev"})
+    return proof
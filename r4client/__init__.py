@@ -0,0 +1,15 @@
+"""
+Python-клієнт RE4CTOR gateway.
+
+    from r4client import AsyncClient
+
+    async with AsyncClient("http://127.0.0.1:8082", api_key="demo", prefetch=16384) as r4:
+        key = await r4.random(32)
+        proof = await r4.vrf()                 # fmt=abi, без копій тіла
+        ok = await r4.verify_proof(proof)      # match / signer з реєстру gateway
+"""
+
+from .client import AsyncClient, Client
+from .models import R4Error, VerifyResult, VrfProof
+
+__all__ = ["AsyncClient", "Client", "R4Error", "VerifyResult", "VrfProof"]
@@ -0,0 +1,115 @@
+"""
+Злиття дрібних паралельних викликів у batch-запити.
+
+Поки в польоті нічого немає, call() шле запит одразу, без черги. Інакше
+виклик кладе елемент у чергу й чекає на свій future; відправка — на
+наступній ітерації event loop (call_soon), тож усе, що викликали в одному
+"тіку", їде одним запитом. Одночасно в польоті не більше max_inflight
+batch-запитів: поки вони йдуть, нові виклики накопичуються й поїдуть
+наступним batch. Під малим навантаженням затримки на очікування сусідів
+немає, під великим batch росте сам.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+# flush(items) -> результат або виняток для кожного елемента, у тому ж порядку
+Flush = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class Coalescer:
+    def __init__(
+        self,
+        flush: Flush,
+        max_items: int = 256,
+        max_weight: Optional[int] = None,
+        max_inflight: int = 4,
+    ):
+        self.flush = flush
+        self.max_items = max_items
+        self.max_weight = max_weight
+        self.max_inflight = max_inflight
+        self._pending: List[Tuple[Any, int, asyncio.Future]] = []
+        self._scheduled = False
+        self._inflight = 0
+        self._tasks: set = set()
+
+    async def call(self, item: Any, weight: int = 1) -> Any:
+        if self._inflight or self._pending:
+            return await self.submit(item, weight)
+        # простій: нема з ким зливати — запит іде одразу з задачі виклику
+        self._inflight += 1
+        try:
+            (res,) = await self.flush([item])
+        finally:
+            self._inflight -= 1
+            self._schedule()
+        if isinstance(res, BaseException):
+            raise res
+        return res
+
+    def submit(self, item: Any, weight: int = 1) -> "asyncio.Future":
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((item, weight, fut))
+        self._schedule()
+        return fut
+
+    def _schedule(self) -> None:
+        if self._pending and not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._drain)
+
+    def _take(self) -> List[Tuple[Any, int, asyncio.Future]]:
+        pending = self._pending
+        total = 0
+        i = 0
+        while i < len(pending) and i < self.max_items:
+            w = pending[i][1]
+            if self.max_weight is not None and i and total + w > self.max_weight:
+                break
+            total += w
+            i += 1
+        batch, self._pending = pending[:i], pending[i:]
+        return batch
+
+    def _drain(self) -> None:
+        self._scheduled = False
+        # клієнти, що вже пішли (таймаут / cancel), не потрапляють у запит
+        self._pending = [p for p in self._pending if not p[2].done()]
+        while self._pending and self._inflight < self.max_inflight:
+            batch = self._take()
+            self._inflight += 1
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, int, asyncio.Future]]) -> None:
+        try:
+            results = await self.flush([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"flush returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            results = [e] * len(batch)
+        except BaseException:
+            for _, _, fut in batch:
+                fut.cancel()
+            raise
+        finally:
+            self._inflight -= 1
+            self._schedule()
+        for (_, _, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        for _, _, fut in self._pending:
+            fut.cancel()
+        self._pending = []
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
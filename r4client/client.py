@@ -0,0 +1,289 @@
+"""
+AsyncClient / Client для RE4CTOR gateway.
+
+- Один пул з'єднань httpx на клієнт (HTTP/2, якщо встановлено h2 і сервер /
+  проксі його говорить; uvicorn gateway сам — HTTP/1.1 keep-alive).
+- Дрібні паралельні random() зливаються в один /v1/random?n=<сума> і
+  ріжуться назад по викликах; паралельні verify() — в один
+  /v1/verify_stream (NDJSON). Лише якщо gateway оголошує це в
+  /v1/meta → "batch"; старий gateway — запит на кожен виклик.
+- prefetch=N — локальний буфер ентропії на N байтів (r4client/prefetch.py).
+- vrf() за замовчуванням бере fmt=abi (192 байти) і декодує без копій
+  (r4client/models.py).
+
+Client — синхронна обгортка: AsyncClient у власному event loop у фоновому
+потоці, тож виклики з різних потоків теж зливаються в batch.
+"""
+
+import asyncio
+import importlib.util
+import json
+import threading
+import time
+from typing import Optional, Union
+
+import httpx
+
+from .batching import Coalescer
+from .models import BytesLike, R4Error, VerifyResult, VrfProof
+from .prefetch import EntropyBuffer
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+
+DEFAULT_RANDOM_MAX_N = 4096
+FEATURES_RETRY_S = 30.0
+
+_PROOF_ROUTES = {False: "/v1/vrf", True: "/v1/random_dual_full"}
+
+
+def _hex(value: Union[str, BytesLike]) -> str:
+    # 32-байтові поля /v1/verify: рівно 64 hex-символи, ведучі нулі — доповнюємо
+    if isinstance(value, str):
+        return (value[2:] if value[:2] in ("0x", "0X") else value).rjust(64, "0")
+    return bytes(value).hex().rjust(64, "0")
+
+
+def _raise_for_status(r: httpx.Response) -> None:
+    if r.status_code == 200:
+        return
+    try:
+        detail = r.json().get("detail", r.text)
+    except ValueError:
+        detail = r.text[:200]
+    raise R4Error(r.status_code, detail)
+
+
+def _decode_proof(fmt: str, body: bytes) -> VrfProof:
+    if fmt == "abi":
+        return VrfProof.from_abi(body)
+    if fmt == "json":
+        return VrfProof.from_fields(_loads(body))
+    if fmt == "msgpack":
+        import msgpack
+
+        return VrfProof.from_fields(msgpack.unpackb(body))
+    if fmt == "cbor":
+        import cbor2
+
+        return VrfProof.from_fields(cbor2.loads(body))
+    raise ValueError(f"unsupported fmt: {fmt}")
+
+
+class AsyncClient:
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:8082",
+        api_key: Optional[str] = None,
+        *,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        http2: Optional[bool] = None,
+        batch: bool = True,
+        batch_inflight: int = 4,
+        prefetch: int = 0,
+        prefetch_chunk: int = DEFAULT_RANDOM_MAX_N,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        self.api_key = api_key
+        self.batch = batch
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"X-API-Key": api_key} if api_key else None,
+            http2=http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+        self._batch_info: Optional[dict] = None
+        self._batch_retry_at = 0.0
+        self._batch_lock = asyncio.Lock()
+        self._random_batch = Coalescer(self._flush_random, max_weight=DEFAULT_RANDOM_MAX_N, max_inflight=batch_inflight)
+        self._verify_batch = Coalescer(self._flush_verify, max_items=256, max_inflight=batch_inflight)
+        self.prefetch: Optional[EntropyBuffer] = None
+        if prefetch > 0:
+            self.prefetch = EntropyBuffer(self._fetch_random, prefetch, chunk=min(prefetch_chunk, DEFAULT_RANDOM_MAX_N))
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._random_batch.aclose()
+        await self._verify_batch.aclose()
+        if self.prefetch is not None:
+            await self.prefetch.aclose()
+        await self._http.aclose()
+
+    # ---- можливості сервера ----
+
+    async def meta(self) -> dict:
+        r = await self._http.get("/v1/meta")
+        _raise_for_status(r)
+        return r.json()
+
+    async def _batch_features(self) -> dict:
+        if self._batch_info is not None and (self._batch_info or time.monotonic() < self._batch_retry_at):
+            return self._batch_info
+        # перший виклик — один /v1/meta на всіх, хто прийшов одночасно
+        async with self._batch_lock:
+            if self._batch_info is not None and (self._batch_info or time.monotonic() < self._batch_retry_at):
+                return self._batch_info
+            try:
+                info = (await self.meta()).get("batch") or {}
+            except (httpx.HTTPError, R4Error, ValueError):
+                info = {}
+            if not info:
+                # старий gateway або /v1/meta недоступний — перепитаємо пізніше
+                self._batch_retry_at = time.monotonic() + FEATURES_RETRY_S
+            self._batch_info = info
+            self._random_batch.max_weight = int(info.get("random_max_n") or DEFAULT_RANDOM_MAX_N)
+        return self._batch_info
+
+    # ---- /v1/random ----
+
+    async def _fetch_random(self, n: int) -> bytes:
+        r = await self._http.get("/v1/random", params={"n": n, "fmt": "hex"})
+        _raise_for_status(r)
+        return bytes.fromhex(r.content.decode("ascii"))
+
+    async def _flush_random(self, sizes: list) -> list:
+        if len(sizes) == 1:
+            return [await self._fetch_random(sizes[0])]
+        raw = await self._fetch_random(sum(sizes))
+        out = []
+        pos = 0
+        for n in sizes:
+            out.append(raw[pos: pos + n])
+            pos += n
+        return out
+
+    async def random(self, n: int) -> bytes:
+        if n < 1:
+            raise ValueError("n must be >= 1")
+        if self.prefetch is not None and n <= self.prefetch.capacity:
+            out = self.prefetch.take(n)
+            if out is not None:
+                return out
+        if self.batch:
+            limit = (await self._batch_features()).get("random_max_n")
+            if limit and n < limit:
+                return await self._random_batch.call(n, weight=n)
+        return await self._fetch_random(n)
+
+    # ---- /v1/vrf ----
+
+    async def vrf(
+        self,
+        sig: str = "ecdsa",
+        fmt: str = "abi",
+        *,
+        full: bool = False,
+        idempotency_key: Optional[str] = None,
+    ) -> VrfProof:
+        """
+        full=True — /v1/random_dual_full (з PQ-полями в proof.extra; потрібен
+        fmt json / msgpack / cbor — abi несе лише ECDSA-частину).
+        """
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        r = await self._http.get(_PROOF_ROUTES[full], params={"sig": sig, "fmt": fmt}, headers=headers)
+        _raise_for_status(r)
+        return _decode_proof(fmt, r.content)
+
+    # ---- /v1/verify ----
+
+    async def _verify_one(self, body: dict) -> VerifyResult:
+        r = await self._http.post("/v1/verify", json=body)
+        _raise_for_status(r)
+        return VerifyResult.from_dict(r.json())
+
+    async def _flush_verify(self, bodies: list) -> list:
+        if len(bodies) == 1:
+            return [await self._verify_one(bodies[0])]
+        payload = "\n".join(json.dumps(b, separators=(",", ":")) for b in bodies).encode()
+        r = await self._http.post(
+            "/v1/verify_stream", content=payload, headers={"Content-Type": "application/x-ndjson"}
+        )
+        _raise_for_status(r)
+        out: list = [R4Error(502, "missing result in verify_stream")] * len(bodies)
+        for line in r.content.splitlines():
+            rec = _loads(line)
+            i = rec.get("line")
+            if i is None:
+                continue  # підсумок
+            out[i - 1] = VerifyResult.from_dict(rec) if rec["ok"] else R4Error(400, rec["error"])
+        return out
+
+    async def verify(
+        self,
+        msg_hash: Union[str, BytesLike],
+        r: Union[str, BytesLike],
+        s: Union[str, BytesLike],
+        v: int,
+        expected_signer: Optional[str] = None,
+    ) -> VerifyResult:
+        """
+        Без expected_signer match = "підписав довірений підписант gateway"
+        (TRUSTED_SIGNERS); result.signer — його ім'я.
+        """
+        body = {"msg_hash": _hex(msg_hash), "r": _hex(r), "s": _hex(s), "v": int(v)}
+        if expected_signer:
+            body["expected_signer"] = expected_signer
+        # /v1/verify_stream вимагає ключ; без нього — по запиту на виклик
+        if self.batch and self.api_key and (await self._batch_features()).get("verify_stream"):
+            return await self._verify_batch.call(body)
+        return await self._verify_one(body)
+
+    async def verify_proof(self, proof: VrfProof, expected_signer: Optional[str] = None) -> VerifyResult:
+        return await self.verify(proof.msg_hash, proof.r, proof.s, proof.v, expected_signer)
+
+
+class Client:
+    """Синхронний клієнт: ті самі методи, що й в AsyncClient."""
+
+    def __init__(self, *args, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="r4client-loop", daemon=True)
+        self._thread.start()
+        self._client = AsyncClient(*args, **kwargs)
+        self._closed = False
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._call(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def meta(self) -> dict:
+        return self._call(self._client.meta())
+
+    def random(self, n: int) -> bytes:
+        return self._call(self._client.random(n))
+
+    def vrf(self, sig: str = "ecdsa", fmt: str = "abi", *, full: bool = False, idempotency_key: Optional[str] = None) -> VrfProof:
+        return self._call(self._client.vrf(sig, fmt, full=full, idempotency_key=idempotency_key))
+
+    def verify(self, msg_hash, r, s, v: int, expected_signer: Optional[str] = None) -> VerifyResult:
+        return self._call(self._client.verify(msg_hash, r, s, v, expected_signer))
+
+    def verify_proof(self, proof: VrfProof, expected_signer: Optional[str] = None) -> VerifyResult:
+        return self._call(self._client.verify_proof(proof, expected_signer))
@@ -0,0 +1,124 @@
+"""
+Типізовані відповіді gateway.
+
+VrfProof.from_abi не копіює тіло відповіді: msg_hash / r / s / signer —
+memoryview-зрізи того самого буфера (192 байти fmt=abi), randomness і v
+читаються прямо з нього. bytes(proof.r) — якщо потрібна окрема копія.
+"""
+
+import base64
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+ABI_PROOF_SIZE = 192
+
+# поля, що в JSON ідуть як 0x-hex / base64 (див. app/proofcodec.py); hex — розмір у байтах
+_HEX_FIELDS = {"msg_hash": 32, "r": 32, "s": 32, "signer_addr": 20}
+_B64_FIELDS = ("sig_pq", "pq_pubkey")
+
+
+class R4Error(Exception):
+    """Відповідь gateway не 200 (або рядок bulk-перевірки з помилкою)."""
+
+    def __init__(self, status_code: int, detail):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _hex(value: str, size: int) -> bytes:
+    # нода віддає числа без ведучих нулів — доповнюємо до розміру поля
+    raw = value[2:] if value[:2] in ("0x", "0X") else value
+    return bytes.fromhex(raw.rjust(size * 2, "0"))
+
+
+class VrfProof:
+    __slots__ = ("randomness", "msg_hash", "v", "r", "s", "signer", "extra")
+
+    def __init__(
+        self,
+        randomness: int,
+        msg_hash: BytesLike,
+        v: int,
+        r: BytesLike,
+        s: BytesLike,
+        signer: BytesLike,
+        extra: Optional[dict] = None,
+    ):
+        self.randomness = randomness
+        self.msg_hash = msg_hash
+        self.v = v
+        self.r = r
+        self.s = s
+        self.signer = signer
+        # решта полів JSON / msgpack (timestamp, sig_pq, pq_pubkey, ...); для abi — {}
+        self.extra = extra or {}
+
+    @property
+    def signer_address(self) -> str:
+        return "0x" + bytes(self.signer).hex()
+
+    @classmethod
+    def from_abi(cls, body: BytesLike) -> "VrfProof":
+        mv = memoryview(body)
+        if len(mv) != ABI_PROOF_SIZE:
+            raise ValueError(f"abi proof must be {ABI_PROOF_SIZE} bytes, got {len(mv)}")
+        return cls(
+            randomness=int.from_bytes(mv[0:32], "big"),
+            msg_hash=mv[32:64],
+            v=mv[95],
+            r=mv[96:128],
+            s=mv[128:160],
+            # address — праві 20 байтів слова
+            signer=mv[172:192],
+        )
+
+    @classmethod
+    def from_fields(cls, proof: dict) -> "VrfProof":
+        """JSON-доказ VRF ноди або його msgpack / cbor варіант (байти замість hex)."""
+        rest = dict(proof)
+        fields = {}
+        for name, size in _HEX_FIELDS.items():
+            value = rest.pop(name)
+            fields[name] = _hex(value, size) if isinstance(value, str) else value
+        for name in _B64_FIELDS:
+            if isinstance(rest.get(name), str):
+                rest[name] = base64.b64decode(rest[name])
+        randomness = rest.pop("random")
+        if isinstance(randomness, str):
+            randomness = int(randomness, 16) if randomness[:2] in ("0x", "0X") else int(randomness)
+        return cls(
+            randomness=randomness,
+            msg_hash=fields["msg_hash"],
+            v=int(rest.pop("v")),
+            r=fields["r"],
+            s=fields["s"],
+            signer=fields["signer_addr"],
+            extra=rest,
+        )
+
+    def __repr__(self) -> str:
+        return f"VrfProof(randomness={self.randomness}, signer={self.signer_address}, v={self.v})"
+
+
+class VerifyResult:
+    __slots__ = ("match", "recovered", "expected", "signer", "v_used")
+
+    def __init__(self, match: bool, recovered: str, expected: Optional[str], signer: Optional[str], v_used: int):
+        self.match = match
+        self.recovered = recovered
+        self.expected = expected
+        # ім'я довіреного підписанта з реєстру gateway (TRUSTED_SIGNERS) або None
+        self.signer = signer
+        self.v_used = v_used
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "VerifyResult":
+        return cls(d["match"], d["recovered"], d.get("expected"), d.get("signer"), d["v_used"])
+
+    def __bool__(self) -> bool:
+        return bool(self.match)
+
+    def __repr__(self) -> str:
+        return f"VerifyResult(match={self.match}, recovered={self.recovered}, signer={self.signer!r})"
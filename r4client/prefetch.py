@@ -0,0 +1,93 @@
+"""
+Клієнтський буфер ентропії (prefetch).
+
+random(n) бере байти з локального буфера без мережевого запиту; коли
+заповнення падає нижче low_watermark, фонова задача дотягує його великими
+порціями з /v1/random. Кожен байт видається рівно один раз (після видачі він
+видаляється з буфера). Якщо байтів не вистачає — None, і виклик іде в мережу
+як без буфера.
+
+Буфер — секретний матеріал у пам'яті процесу: не вмикайте prefetch там, де
+дамп пам'яті клієнта — частина моделі загроз. aclose() затирає залишок.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+
+log = logging.getLogger("r4client.prefetch")
+
+
+class EntropyBuffer:
+    def __init__(
+        self,
+        fetch: Callable[[int], Awaitable[bytes]],
+        capacity: int,
+        chunk: int = 4096,
+        low_watermark: float = 0.5,
+        retry_after: float = 1.0,
+    ):
+        self.fetch = fetch
+        self.capacity = capacity
+        self.chunk = max(1, min(chunk, capacity))
+        self.low = int(capacity * low_watermark)
+        self.retry_after = retry_after
+        self._buf = bytearray()
+        self._task: Optional[asyncio.Task] = None
+        self._failed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def take(self, n: int) -> Optional[bytes]:
+        buf = self._buf
+        if len(buf) >= n:
+            out = bytes(buf[:n])
+            # del з початку bytearray — зсув вказівника, без копіювання решти
+            del buf[:n]
+            self.hits += 1
+        else:
+            out = None
+            self.misses += 1
+        if len(buf) < self.low:
+            self._refill_soon()
+        return out
+
+    def _refill_soon(self) -> None:
+        if self._task is not None or time.monotonic() - self._failed_at < self.retry_after:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._refill())
+
+    async def _refill(self) -> None:
+        try:
+            while len(self._buf) < self.capacity:
+                self._buf += await self.fetch(min(self.chunk, self.capacity - len(self._buf)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # gateway недоступний — не довбаємо його; take() тим часом повертає None
+            self._failed_at = time.monotonic()
+            log.warning("entropy prefetch failed: %s", e)
+        finally:
+            self._task = None
+
+    async def fill(self) -> None:
+        """Заповнити буфер зараз (напр. на старті сервісу)."""
+        self._refill_soon()
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def aclose(self) -> None:
+        task = self._task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._buf[:] = bytes(len(self._buf))
+        self._buf.clear()
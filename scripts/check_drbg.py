@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Known-answer тест HmacDrbg (app/entropy.py, ENTROPY_SOURCE=drbg).
+
+- NIST CAVP HMAC_DRBG.rsp, [SHA-256], PredictionResistance = False, без
+  personalization / additional input, COUNT = 0: instantiate, два generate
+  по 1024 біти — другий має збігтися з ReturnedBits;
+- fork: дочірній процес із тим самим станом отримує інший потік
+  (reseed після fork), а не копію батьківського.
+
+    python scripts/check_drbg.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.entropy import HmacDrbg  # noqa: E402
+
+
+ENTROPY = bytes.fromhex("ca851911349384bffe89de1cbdc46e6831e44d34a4fb935ee285dd14b71a7488")
+NONCE = bytes.fromhex("659ba96c601dc69fc902940805ec0ca8")
+RETURNED = bytes.fromhex(
+    "e528e9abf2dece54d47c7e75e5fe302149f817ea9fb4bee6f4199697d04d5b89"
+    "d54fbb978a15b5c443c9ec21036d2460b6f73ebad0dc2aba6e624abf07745bc1"
+    "07694bb7547bb0995f70de25d6b29e2d3011bb19d27676c07162c8b5ccde0668"
+    "961df86803482cb37ed6d5c0bb8d50cf1f50d476aa0458bdaba806f48be9dcb8"
+)
+
+
+def main() -> int:
+    ok = True
+
+    drbg = HmacDrbg(personalization=b"")
+    drbg.instantiate(ENTROPY, NONCE)
+    drbg.generate(128)
+    got = drbg.generate(128)
+    print(got.hex())
+    if got != RETURNED:
+        print(f"FAIL: CAVP vector mismatch, expected {RETURNED.hex()}")
+        ok = False
+
+    if hasattr(os, "fork"):
+        drbg = HmacDrbg()
+        drbg.generate(32)
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(w, drbg.generate(32))
+            os._exit(0)
+        os.close(w)
+        child = os.read(r, 32)
+        os.close(r)
+        os.waitpid(pid, 0)
+        if child == drbg.generate(32):
+            print("FAIL: child process repeated the parent's output after fork")
+            ok = False
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Перевірка Idempotency-Key кешу (app/idempotency.py) без gateway й upstream.
+
+- single-flight: 20 одночасних запитів з одним ключем — один виклик
+  upstream, усі отримують ту саму відповідь; повтор після — "hit";
+- mismatch: той самий ключ з іншими параметрами — IdempotencyKeyReused;
+- cross-worker: два IdempotencyCache на одному SharedStore (як два воркери
+  app.serve): поки лідер у першому «воркері» тримає оренду, другий не
+  кличе upstream, а отримує його відповідь з replayed=True;
+- failed leader: виклик упав — оренда звільнена, наступний запит (в іншому
+  «воркері») кличе upstream сам;
+- L1 bytes: заміна запису не роздуває лічильник байтів.
+
+    python scripts/check_idempotency.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.idempotency import IdempotencyCache, IdempotencyKeyReused, SharedStore, StoredResponse  # noqa: E402
+
+
+class Response:
+    def __init__(self, content: bytes):
+        self.status_code = 200
+        self.content = content
+        self.headers = {"content-type": "application/json"}
+
+
+class Upstream:
+    """Замість upstream.get: рахує виклики, відповідає через delay секунд."""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        n = self.calls
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return Response(b'{"call":%d}' % n)
+
+
+async def single_flight(errors: list) -> None:
+    cache = IdempotencyCache()
+    up = Upstream()
+    key = ("acme", "/v1/vrf", "k1")
+    started = [cache.begin(key, (("sig", "ecdsa"),), up) for _ in range(20)]
+    outcomes = [o for _, o in started]
+    bodies = {r.content for r in await asyncio.gather(*(w for w, _ in started))}
+    if up.calls != 1 or len(bodies) != 1:
+        errors.append(f"single-flight: {up.calls} upstream calls, {len(bodies)} distinct bodies")
+    if outcomes.count("miss") != 1 or outcomes.count("joined") != 19:
+        errors.append(f"single-flight: outcomes {outcomes}")
+    _, outcome = cache.begin(key, (("sig", "ecdsa"),), up)
+    if outcome != "hit" or up.calls != 1:
+        errors.append(f"single-flight: retry after completion was {outcome!r}, calls={up.calls}")
+    try:
+        cache.begin(key, (("sig", "pq"),), up)
+        errors.append("mismatch: same key with other params was accepted")
+    except IdempotencyKeyReused:
+        pass
+
+
+async def cross_worker(errors: list, path: str) -> None:
+    a = IdempotencyCache(shared=SharedStore(path))
+    b = IdempotencyCache(shared=SharedStore(path, poll_interval=0.005))
+    up = Upstream(delay=0.2)
+    key = ("acme", "/v1/vrf", "k2")
+    fp = (("sig", "ecdsa"),)
+
+    lead, _ = a.begin(key, fp, up)
+    await asyncio.sleep(0.05)  # лідер уже взяв оренду
+    join, outcome = b.begin(key, fp, up)
+    r1, r2 = await asyncio.gather(lead, join)
+    if up.calls != 1 or r1.content != r2.content:
+        errors.append(f"cross-worker: {up.calls} upstream calls, bodies {r1.content!r} / {r2.content!r}")
+    # задачу в другому воркері запущено ("miss"), але upstream вона не кликала
+    if outcome != "miss" or not r2.replayed or r1.replayed:
+        errors.append(f"cross-worker: outcome={outcome!r}, replayed {r1.replayed}/{r2.replayed}")
+
+    # завершений запис: третій «воркер» бере його з SQLite без виклику
+    c = IdempotencyCache(shared=SharedStore(path))
+    w, outcome = c.begin(key, fp, up)
+    r3 = await w
+    if outcome != "hit" or r3.content != r1.content or up.calls != 1:
+        errors.append(f"cross-worker: shared hit was {outcome!r}, calls={up.calls}")
+    for cache in (a, b, c):
+        cache.shared.close()
+
+
+async def failed_leader(errors: list, path: str) -> None:
+    a = IdempotencyCache(shared=SharedStore(path))
+    b = IdempotencyCache(shared=SharedStore(path))
+    key = ("acme", "/v1/vrf", "k3")
+    fp = (("sig", "ecdsa"),)
+    down = Upstream(fail=True)
+    w, _ = a.begin(key, fp, down)
+    try:
+        await w
+        errors.append("failed leader: error was swallowed")
+    except ConnectionError:
+        pass
+    up = Upstream()
+    w, outcome = b.begin(key, fp, up)
+    await w
+    if outcome != "miss" or up.calls != 1:
+        errors.append(f"failed leader: next request was {outcome!r} with {up.calls} calls (lease not released)")
+    a.shared.close()
+    b.shared.close()
+
+
+def l1_bytes(errors: list) -> None:
+    cache = IdempotencyCache()
+    for _ in range(5):
+        cache._store("k", StoredResponse(200, b"x" * 100, "application/json", None))
+    one = StoredResponse(200, b"x" * 100, "application/json", None).size
+    if len(cache) != 1 or cache._bytes != one:
+        errors.append(f"L1 bytes: {len(cache)} entries, {cache._bytes} bytes after replacing (expected {one})")
+
+
+async def run() -> list:
+    errors: list = []
+    await single_flight(errors)
+    with tempfile.TemporaryDirectory() as d:
+        await cross_worker(errors, os.path.join(d, "idem.db"))
+        await failed_leader(errors, os.path.join(d, "idem.db"))
+    l1_bytes(errors)
+    return errors
+
+
+def main() -> int:
+    errors = asyncio.run(run())
+    for e in errors:
+        print(f"FAIL: {e}")
+    print("OK" if not errors else "FAILED")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Регресійна перевірка холодного старту: час `import app.main` у свіжому
+інтерпретаторі має вкладатися в бюджет, а крипто-стек не повинен
+імпортуватися під час старту (лише ліниво / у фоні).
+
+Бере мінімум з кількох запусків (менше шуму від кешу ФС / сусідів по CPU)
+і при перевищенні друкує найдорожчі модулі з `python -X importtime`.
+
+    python scripts/check_import_time.py [--budget-ms 800] [--runs 5]
+
+Код виходу 1 — бюджет перевищено або eth_keys / eth_account / eth_utils
+імпортувалися на старті.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("eth_keys", "eth_account", "eth_utils")
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import app.main
+dt = (time.perf_counter() - t0) * 1000.0
+eager = [m for m in {lazy!r} if m in sys.modules]
+print(f"{{dt:.3f}} {{','.join(eager)}}")
+"""
+
+
+def run_probe() -> "tuple[float, list]":
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(lazy=LAZY_MODULES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return float(out[0]), (out[1].split(",") if len(out) > 1 else [])
+
+
+def top_imports(limit: int = 15) -> str:
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(cumulative), name.rstrip()))
+        except ValueError:
+            continue
+    rows.sort(reverse=True)
+    return "\n".join(f"  {us / 1000.0:8.1f} ms  {name}" for us, name in rows[:limit])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "800")))
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    results = [run_probe() for _ in range(args.runs)]
+    best = min(ms for ms, _ in results)
+    eager = sorted({m for _, mods in results for m in mods})
+
+    print(f"import app.main: best {best:.1f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if best > args.budget_ms:
+        print("FAIL: import time over budget; most expensive imports (cumulative):")
+        print(top_imports())
+        failed = True
+    if eager:
+        print(f"FAIL: imported at startup, must stay lazy: {', '.join(eager)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
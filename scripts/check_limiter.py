@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Перевірка AdaptiveLimiter (app/limiter.py) на змодельованому бекенді.
+
+- healthy:    бекенд без обмеження потужності, латентність із нормальним
+              джитером (lognormal, σ=0.3, медіана 5 ms), 100 клієнтів —
+              жодного 503, ліміт не падає до мінімуму;
+- overloaded: першу секунду — бекенд з медіаною 20 ms без обмеження, далі
+              він деградує до 20 паралельних запитів (латентність росте
+              лінійно з чергою) — ліміт має помітно зменшитись;
+- burst:      60 миттєвих відповідей підряд — обірваних самим gateway
+              (семпл пропущено) або 5xx від upstream за ~0 ms — не мають
+              обвалити ліміт: зменшення не частіше, ніж раз на baseline.
+
+    python scripts/check_limiter.py [--duration 3]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.limiter import AdaptiveLimiter, Overloaded  # noqa: E402
+
+
+async def simulate(latency, clients: int, duration: float) -> dict:
+    # latency(active, elapsed_s) -> секунди обслуговування
+    limiter = AdaptiveLimiter("sim", initial=64, min_limit=4, max_limit=1024)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    stop_at = start + duration
+    served = shed = 0
+    active = 0
+    min_limit = limiter.limit
+
+    async def client():
+        nonlocal served, shed, active, min_limit
+        while loop.time() < stop_at:
+            try:
+                await limiter.acquire()
+            except Overloaded:
+                shed += 1
+                await asyncio.sleep(0.005)
+                continue
+            t0 = loop.time()
+            active += 1
+            try:
+                await asyncio.sleep(latency(active, t0 - start))
+            finally:
+                active -= 1
+            limiter.release((loop.time() - t0) * 1000.0)
+            min_limit = min(min_limit, limiter.limit)
+            served += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return {"served": served, "shed": shed, "limit": int(limiter.limit), "min_limit": int(min_limit)}
+
+
+def healthy(active: int, elapsed: float) -> float:
+    return random.lognormvariate(0.0, 0.3) * 0.005
+
+
+def overloaded(active: int, elapsed: float, degrade_at: float = 1.0) -> float:
+    # база 20 ms: власні накладні event loop на 100 клієнтів не маскують деградацію
+    base = random.lognormvariate(0.0, 0.3) * 0.020
+    if elapsed < degrade_at:
+        return base
+    return base * max(1.0, active / 20.0)
+
+
+def burst() -> dict:
+    limiter = AdaptiveLimiter("sim", initial=64, min_limit=4, max_limit=1024)
+    for _ in range(200):
+        limiter.inflight += 1
+        limiter.release(5.0)
+    warm = int(limiter.limit)
+    for _ in range(60):
+        limiter.inflight += 1
+        limiter.release(None)
+    skipped = int(limiter.limit)
+    for _ in range(60):
+        limiter.inflight += 1
+        limiter.release(0.05, congested=True)
+    return {"warm": warm, "skipped": skipped, "congested": int(limiter.limit)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--duration", type=float, default=3.0)
+    args = ap.parse_args(argv)
+    random.seed(1)
+
+    ok = True
+    res = asyncio.run(simulate(healthy, 100, args.duration))
+    print(f"healthy:    {res}")
+    if res["shed"] or res["min_limit"] < 32:
+        print("FAIL: a backend that is not overloaded must never be shed")
+        ok = False
+
+    res = asyncio.run(simulate(overloaded, 100, args.duration))
+    print(f"overloaded: {res}")
+    if res["min_limit"] >= 40:
+        print("FAIL: the limit must shrink when latency grows with concurrency")
+        ok = False
+
+    res = burst()
+    print(f"burst:      {res}")
+    if res["skipped"] != res["warm"] or res["congested"] < res["warm"] * 0.9 - 1:
+        print("FAIL: instant failures must not collapse the limit")
+        ok = False
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
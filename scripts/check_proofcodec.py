@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Перевірка app/proofcodec.py на доказах, де hex-поля втратили ведучі нулі.
+
+VRF нода віддає msg_hash / r / s як числа: значення з ведучим нульовим
+байтом (~1 доказ з 256) приходить коротшим за 64 hex-символи, інколи й з
+непарною довжиною. abi / msgpack / cbor мають доповнити його зліва, а не
+віддати 502.
+
+    python scripts/check_proofcodec.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.proofcodec import CodecError, abi_encode, compact  # noqa: E402
+
+
+R = bytes.fromhex("00" + "7a" * 31)       # ведучий нульовий байт
+S = bytes.fromhex("000" + "5" * 61)       # 1.5 нульових байта: непарна довжина без нулів
+MSG_HASH = bytes.fromhex("ab" * 32)
+SIGNER = bytes.fromhex("0d" + "11" * 19)
+
+
+def proof() -> dict:
+    return {
+        "random": 12345,
+        "msg_hash": "0x" + MSG_HASH.hex(),
+        "v": 28,
+        # так їх віддає нода: hex(int) без ведучих нулів
+        "r": hex(int.from_bytes(R, "big")),
+        "s": hex(int.from_bytes(S, "big")),
+        "signer_addr": hex(int.from_bytes(SIGNER, "big")),
+    }
+
+
+def main() -> int:
+    p = proof()
+    assert len(p["r"]) - 2 == 62 and len(p["s"]) - 2 == 61, (p["r"], p["s"])
+    ok = True
+
+    try:
+        data = abi_encode(p)
+    except CodecError as e:
+        print(f"FAIL: abi_encode rejected short hex: {e}")
+        return 1
+    expect = (
+        (12345).to_bytes(32, "big") + MSG_HASH + (28).to_bytes(32, "big") + R + S + SIGNER.rjust(32, b"\0")
+    )
+    if data != expect:
+        print("FAIL: abi_encode did not left-pad short hex fields")
+        ok = False
+
+    out = compact(p)
+    if (out["r"], out["s"], out["signer_addr"]) != (R, S, SIGNER):
+        print("FAIL: compact did not left-pad short hex fields")
+        ok = False
+
+    try:
+        abi_encode(dict(p, r="0x" + "7a" * 33))
+        print("FAIL: abi_encode accepted a 33-byte r")
+        ok = False
+    except CodecError:
+        pass
+
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
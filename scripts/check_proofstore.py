@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Перевірка сховища доказів (app/proofstore.py) на тимчасовій SQLite.
+
+- paging: 1000 доказів tenant-а по 4 на один ts (плюс чужі між ними),
+  сторінки по 7 за курсором (ts, msg_hash), як у GET /v1/proofs, — кожен
+  доказ рівно один раз, у порядку, межа сторінки посеред однакового ts
+  нічого не губить;
+- isolation: get і range чужого tenant-а — порожньо;
+- migration: база без колонки tenant відкривається, старі докази
+  лишаються нікому не видимими, нові пишуться.
+
+    python scripts/check_proofstore.py
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.proofstore import ProofStore  # noqa: E402
+
+
+PAGE = 7
+
+
+def body(i: int, tenant: str) -> bytes:
+    h = (b"%s-%d" % (tenant.encode(), i)).hex().rjust(64, "0")
+    return json.dumps({"msg_hash": "0x" + h, "random": i}).encode()
+
+
+async def pages(store: ProofStore, tenant: str, since: int, until: int) -> list:
+    out, after = [], (since, b"")
+    while True:
+        rows = await store.range(tenant, after, until, PAGE)
+        out.extend(rows)
+        if len(rows) < PAGE:
+            return out
+        after = (rows[-1][0], rows[-1][1])
+
+
+async def paging(errors: list, path: str) -> None:
+    store = ProofStore(path)
+    await store.start()
+    now = int(time.time() * 1000)
+    rows = []
+    for i in range(1000):
+        rows.append((now + i // 4, "/v1/vrf", "ecdsa", body(i, "acme"), "acme"))
+        if i % 5 == 0:
+            rows.append((now + i // 4, "/v1/vrf", "ecdsa", body(i, "other"), "other"))
+    store._write_batch(rows)
+
+    got = await pages(store, "acme", now - 1, now + 10_000)
+    bodies = [r[3] for r in got]
+    keys = [(r[0], r[1]) for r in got]
+    if sorted(bodies) != sorted(body(i, "acme") for i in range(1000)) or len(set(keys)) != len(keys):
+        errors.append(f"paging: {len(got)} rows, {len(set(keys))} distinct, expected 1000")
+    if keys != sorted(keys):
+        errors.append("paging: rows are not in (ts, msg_hash) order")
+
+    other = await pages(store, "other", now - 1, now + 10_000)
+    if len(other) != 200 or any(b"acme" in bytes.fromhex(json.loads(r[3])["msg_hash"][2:]) for r in other):
+        errors.append(f"isolation: tenant 'other' sees {len(other)} rows")
+    h = got[0][1]
+    if store.get(h, "acme") is None or store.get(h, "other") is not None:
+        errors.append("isolation: get ignores the tenant")
+    await store.stop()
+
+
+async def migration(errors: list, path: str) -> None:
+    now = int(time.time() * 1000)
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE proofs (msg_hash BLOB PRIMARY KEY, ts INTEGER NOT NULL, route TEXT NOT NULL,"
+            " sig TEXT NOT NULL, body BLOB NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("INSERT INTO proofs VALUES (?, ?, '/v1/vrf', 'ecdsa', ?)", (b"\x01" * 32, now, body(0, "old")))
+    store = ProofStore(path)
+    try:
+        await store.start()
+    except sqlite3.Error as e:
+        errors.append(f"migration: old schema rejected: {e}")
+        return
+    store._write_batch([(now, "/v1/vrf", "ecdsa", body(1, "acme"), "acme")])
+    if store.get(b"\x01" * 32, "acme") is not None or store.get(b"\x01" * 32, "") is None:
+        errors.append("migration: pre-tenant proof is visible to a tenant or lost")
+    if len(await store.range("acme", (now - 1, b""), now + 1, 10)) != 1:
+        errors.append("migration: new proof not found after upgrade")
+    await store.stop()
+
+
+async def run() -> list:
+    errors: list = []
+    with tempfile.TemporaryDirectory() as d:
+        await paging(errors, os.path.join(d, "paging.db"))
+        await migration(errors, os.path.join(d, "old.db"))
+    return errors
+
+
+def main() -> int:
+    errors = asyncio.run(run())
+    for e in errors:
+        print(f"FAIL: {e}")
+    print("OK" if not errors else "FAILED")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Перевірка SPSC-кілець резервуару ентропії (app/reservoir.py) між процесами.
+
+Як під app.serve: майстер створює сегмент, refiller (воркер 0, lane.put)
+наповнює всі lanes детермінованим потоком байтів, а кожна lane має свого
+consumer-процес (take_hex). Усі підключаються через EntropyReservoir.from_env.
+Lanes маленькі, порції довільні — курсори тисячі разів обертаються по кільцю.
+
+Кожен consumer має отримати рівно той самий потік: жодного байта двічі,
+жодного пропущеного чи переставленого, у межах таймауту.
+
+    python scripts/check_reservoir.py
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.reservoir import EntropyReservoir  # noqa: E402
+
+
+LANES = 3
+CAPACITY = EntropyReservoir.capacity_from_kb(0.25)   # 256 байтів: ~4000 обертів на lane
+TOTAL = 1 << 20                                      # байтів на lane
+TIMEOUT = 60.0
+
+
+def stream(lane: int) -> bytes:
+    return hashlib.shake_128(b"lane-%d" % lane).digest(TOTAL)
+
+
+def attach(name: str, index: int) -> EntropyReservoir:
+    os.environ.update(R4_RESERVOIR_NAME=name, R4_WORKERS=str(LANES), R4_WORKER_INDEX=str(index))
+    return EntropyReservoir.from_env(CAPACITY)
+
+
+def produce(name: str) -> None:
+    rsv = attach(name, 0)
+    rng = random.Random(0)
+    data = [stream(i) for i in range(LANES)]
+    sent = [0] * LANES
+    deadline = time.monotonic() + TIMEOUT
+    while min(sent) < TOTAL and time.monotonic() < deadline:
+        progress = 0
+        for i, lane in enumerate(rsv.lanes):
+            if sent[i] < TOTAL:
+                n = lane.put(data[i][sent[i]: sent[i] + rng.randint(1, 96)])
+                sent[i] += n
+                progress += n
+        if not progress:
+            time.sleep(0)
+    asyncio.run(rsv.stop())
+
+
+def consume(name: str, index: int, results) -> None:
+    rsv = attach(name, index)
+    rng = random.Random(index + 1)
+    got = []
+    received = misses = 0
+    deadline = time.monotonic() + TIMEOUT
+    while received < TOTAL and time.monotonic() < deadline:
+        n = min(rng.randint(1, 64), TOTAL - received)
+        out = rsv.lane.take_hex(n)
+        if out is None:
+            misses += 1
+            time.sleep(0)
+            continue
+        got.append(out)
+        received += n
+    left = rsv.lane.available()
+    asyncio.run(rsv.stop())
+    results.put((index, bytes.fromhex("".join(got)), misses, left))
+
+
+def main() -> int:
+    shm = EntropyReservoir.create_segment(LANES, CAPACITY)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=produce, args=(shm.name,))]
+    procs += [multiprocessing.Process(target=consume, args=(shm.name, i, results)) for i in range(LANES)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    try:
+        out = [results.get(timeout=TIMEOUT + 10) for _ in range(LANES)]
+    finally:
+        for p in procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+        shm.close()
+        shm.unlink()
+    elapsed = time.perf_counter() - t0
+
+    ok = True
+    for index, got, misses, left in sorted(out):
+        expect = stream(index)
+        if got != expect:
+            at = next((i for i, (a, b) in enumerate(zip(got, expect)) if a != b), min(len(got), len(expect)))
+            print(f"FAIL: lane {index}: {len(got)}/{TOTAL} bytes, first mismatch at offset {at}")
+            ok = False
+        elif left:
+            print(f"FAIL: lane {index}: {left} extra bytes left after the full stream")
+            ok = False
+        else:
+            print(f"lane {index}: {TOTAL} bytes exactly once, {misses} empty takes")
+    if any(p.exitcode for p in procs):
+        print(f"FAIL: exit codes {[p.exitcode for p in procs]}")
+        ok = False
+    print(f"{LANES} lanes x {CAPACITY} B ring, {TOTAL >> 10} KiB each in {elapsed:.1f}s")
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
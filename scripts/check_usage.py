@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Перевірка обліку використання (app/usage.py) з SQLite sink.
+
+- bucket: запит о 10:59:59, скинутий після 11:00, лягає в bucket 10:00, а
+  не в годину flush;
+- in-flight: поки дельти пишуться в sink, /v1/usage їх не втрачає й не
+  рахує двічі;
+- requeue: запис у sink упав — дельти повертаються в чергу, разом з новими
+  записами йдуть наступним flush і потрапляють у таблицю рівно один раз.
+
+    python scripts/check_usage.py
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.usage as U  # noqa: E402
+from app.usage import UsageMeter  # noqa: E402
+
+
+HOUR = 3600
+T0 = 1_700_000_000 - 1_700_000_000 % HOUR  # початок години
+
+
+class Clock:
+    """Замість модуля time в app.usage: лише time()."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def rows(path: str) -> list:
+    with sqlite3.connect(path) as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'usage'").fetchone():
+            return []
+        return conn.execute(
+            "SELECT bucket, tenant, key_id, route, requests, errors, bytes_out, entropy_bytes"
+            " FROM usage ORDER BY bucket, route"
+        ).fetchall()
+
+
+async def bucketing(errors: list, path: str) -> None:
+    meter = UsageMeter(path, bucket_seconds=HOUR)
+    U.time.now = T0 + HOUR - 1
+    meter.record("acme", "k1", "/v1/random", False, 100, 32)
+    U.time.now = T0 + HOUR + 5
+    meter.record("acme", "k1", "/v1/random", True, 10, 0)
+    U.time.now = T0 + HOUR + 30
+    await meter.flush()
+    got = rows(path)
+    expect = [
+        (T0, "acme", "k1", "/v1/random", 1, 0, 100, 32),
+        (T0 + HOUR, "acme", "k1", "/v1/random", 1, 1, 10, 0),
+    ]
+    if got != expect:
+        errors.append(f"bucket: rows {got}, expected {expect}")
+    await meter.stop()
+
+
+async def requeue(errors: list, path: str) -> None:
+    meter = UsageMeter(path, bucket_seconds=HOUR)
+    U.time.now = T0 + 10
+    for _ in range(3):
+        meter.record("acme", "k1", "/v1/vrf", False, 200, 64)
+
+    # 1) запис висить у потоці — usage бачить дельти рівно один раз
+    gate, entered = threading.Event(), threading.Event()
+    write = meter._write
+
+    def slow_write(delta):
+        entered.set()
+        gate.wait(5)
+        raise sqlite3.OperationalError("database is locked")
+
+    meter._write = slow_write
+    flush = asyncio.ensure_future(meter.flush())
+    await asyncio.to_thread(entered.wait, 5)
+    meter.record("acme", "k1", "/v1/vrf", False, 200, 64)
+    n = meter.usage("acme")["total"]["requests"]
+    if n != 4:
+        errors.append(f"in-flight: usage shows {n} requests during flush, expected 4")
+
+    # 2) запис упав — дельти повернулися в чергу
+    gate.set()
+    await flush
+    n = meter.usage("acme")["total"]["requests"]
+    if n != 4 or rows(path):
+        errors.append(f"requeue: after failed flush usage={n}, table={rows(path)}")
+
+    # 3) наступний flush пише все рівно один раз
+    meter._write = write
+    await meter.flush()
+    await meter.flush()
+    got = rows(path)
+    expect = [(T0, "acme", "k1", "/v1/vrf", 4, 0, 800, 256)]
+    if got != expect:
+        errors.append(f"requeue: rows {got}, expected {expect}")
+    n = meter.usage("acme")["total"]["requests"]
+    if n != 4:
+        errors.append(f"requeue: usage shows {n} requests after retry, expected 4")
+    await meter.stop()
+
+
+async def run() -> list:
+    errors: list = []
+    logging.getLogger("r4.usage").setLevel(logging.CRITICAL)  # очікуваний збій flush — без traceback
+    real, U.time = U.time, Clock(T0)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            await bucketing(errors, os.path.join(d, "bucket.db"))
+            await requeue(errors, os.path.join(d, "requeue.db"))
+    finally:
+        U.time = real
+    return errors
+
+
+def main() -> int:
+    errors = asyncio.run(run())
+    for e in errors:
+        print(f"FAIL: {e}")
+    print("OK" if not errors else "FAILED")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
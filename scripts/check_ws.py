@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Перевірка /v1/ws сесії (app/ws.py) на фейковому WebSocket, без мережі.
+
+- flow control: клієнт шле 10 кадрів, op висять; сесія бере в роботу
+  рівно max_inflight і не читає наступний кадр, поки вікно повне; кожна
+  завершена відповідь відкриває рівно один слот; відповідь — на кожен id;
+- 403: op, чий HTTP-роут ключу не дозволений (vrf з full -> /v1/random_dual_full),
+  відповідає route_not_allowed з тим самим id, дозволені — працюють;
+- 500: виняток в op — internal_error з тим самим id, сесія живе далі;
+- 400: не-JSON кадр.
+
+    python scripts/check_ws.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.apikeys import ApiKey  # noqa: E402
+from app.ws import WsSession  # noqa: E402
+
+
+class FakeWebSocket:
+    """receive() віддає заготовлені кадри, далі — disconnect, коли закриють."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.receives = 0
+        self.sent = []
+        self.closed = asyncio.Event()
+
+    async def receive(self) -> dict:
+        self.receives += 1
+        if self.frames:
+            return {"type": "websocket.receive", "text": self.frames.pop(0)}
+        await self.closed.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+
+async def settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+async def flow_control(errors: list) -> None:
+    gates = []
+    active = peak = 0
+
+    async def slow(msg, key):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        gate = asyncio.Event()
+        gates.append(gate)
+        await gate.wait()
+        active -= 1
+        return '{"n":%d}' % msg["id"], 0
+
+    ws = FakeWebSocket([json.dumps({"id": i, "op": "random"}) for i in range(10)])
+    session = asyncio.ensure_future(WsSession(ws, ApiKey("k1", "acme"), {"random": slow}, max_inflight=4).run())
+    await settle()
+    if (ws.receives, active) != (4, 4):
+        errors.append(f"flow: window full but receives={ws.receives}, active={active} (expected 4/4)")
+
+    gates[0].set()
+    await settle()
+    if (ws.receives, active, len(ws.sent)) != (5, 4, 1):
+        errors.append(f"flow: after one reply receives={ws.receives}, active={active}, sent={len(ws.sent)}")
+
+    while len(ws.sent) < 10:
+        for gate in gates:
+            gate.set()
+        await settle()
+    ws.closed.set()
+    await asyncio.wait_for(session, 1)
+    ids = sorted(f["id"] for f in ws.sent)
+    if ids != list(range(10)) or not all(f["ok"] for f in ws.sent) or peak != 4:
+        errors.append(f"flow: ids={ids}, peak={peak}")
+
+
+async def errors_keep_ids(errors: list) -> None:
+    async def ok(msg, key):
+        return '"ok"', 0
+
+    async def broken(msg, key):
+        raise RuntimeError("boom")
+
+    ops = {"random": ok, "vrf": ok, "verify": broken}
+    routes = {
+        "random": lambda msg: "/v1/random",
+        "vrf": lambda msg: "/v1/random_dual_full" if msg.get("full") else "/v1/vrf",
+        "verify": lambda msg: "/v1/verify",
+    }
+    key = ApiKey("k1", "acme", routes=frozenset({"/v1/random", "/v1/vrf", "/v1/verify"}))
+    ws = FakeWebSocket([
+        json.dumps({"id": 1, "op": "random"}),
+        json.dumps({"id": 2, "op": "vrf", "full": True}),
+        json.dumps({"id": 3, "op": "vrf"}),
+        json.dumps({"id": 4, "op": "verify"}),
+        "not json",
+        json.dumps({"id": 6, "op": "random"}),
+    ])
+    session = asyncio.ensure_future(WsSession(ws, key, ops, routes=routes).run())
+    await settle()
+    ws.closed.set()
+    await asyncio.wait_for(session, 1)
+    got = {f.get("id"): (f["ok"], f.get("status"), f.get("error")) for f in ws.sent}
+    expect = {
+        1: (True, None, None),
+        2: (False, 403, "route_not_allowed"),
+        3: (True, None, None),
+        4: (False, 500, "internal_error"),
+        None: (False, 400, "invalid_json_object"),
+        6: (True, None, None),
+    }
+    if got != expect or len(ws.sent) != 6:
+        errors.append(f"errors: replies {got}")
+
+
+async def run() -> list:
+    errors: list = []
+    logging.getLogger("r4.ws").setLevel(logging.CRITICAL)  # очікуваний виняток в op — без traceback
+    await flow_control(errors)
+    await errors_keep_ids(errors)
+    return errors
+
+
+def main() -> int:
+    errors = asyncio.run(run())
+    for e in errors:
+        print(f"FAIL: {e}")
+    print("OK" if not errors else "FAILED")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())